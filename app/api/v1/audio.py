@@ -1,5 +1,6 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Body, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from app.services.audio_service import audio_service
 from app.services.advanced_audio_service import AdvancedAudioService
 from app.utils.logger import logger
@@ -10,6 +11,7 @@ from pydantic import BaseModel
 import shutil
 import os
 import uuid
+import json
 from pathlib import Path
 
 router = APIRouter()
@@ -75,7 +77,7 @@ async def transcribe_audio(
             shutil.copyfileobj(file.file, buffer)
             
         # Process
-        result = audio_service.transcribe(str(temp_path))
+        result = await audio_service.transcribe_async(str(temp_path))
         
         # Cleanup
         background_tasks.add_task(cleanup_files, [str(temp_path)])
@@ -89,6 +91,30 @@ async def transcribe_audio(
         logger.error(f"STT Endpoint Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/audio/transcribe/stream", summary="语音转文字 (流式 STT)")
+async def transcribe_audio_stream(
+    file: UploadFile = File(...),
+):
+    """
+    上传音频文件, 以 NDJSON 流式返回识别结果:
+    每识别出一段即推送 {"type": "segment", ...}, 最后推送 {"type": "final", ...} (情感/特征/说话人)。
+    """
+    file_ext = Path(file.filename).suffix or ".wav"
+    temp_path = audio_service.audio_dir / f"upload_{uuid.uuid4()}{file_ext}"
+    with open(temp_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    async def event_generator():
+        async for event in audio_service.transcribe_stream(str(temp_path)):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    # Cleanup runs after the stream has been fully sent
+    return StreamingResponse(
+        event_generator(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(cleanup_files, [str(temp_path)])
+    )
+
 @router.post("/audio/diarization", summary="语音转文字+角色区分")
 async def transcribe_with_diarization(
     background_tasks: BackgroundTasks,
@@ -160,3 +186,13 @@ async def synthesize_text(
     except Exception as e:
         logger.error(f"TTS Endpoint Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/audio/synthesize/stream", summary="文字转语音 (流式 TTS)")
+async def synthesize_text_stream(
+    text: str = Form(...),
+    voice: str = Form(None)
+):
+    """
+    流式返回 MP3 音频块, 客户端收到首个数据块即可开始播放。
+    """
+    return StreamingResponse(audio_service.synthesize_stream(text, voice=voice), media_type="audio/mpeg")
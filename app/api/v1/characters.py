@@ -6,7 +6,7 @@ from app.models.domain_schemas import (
     CharacterCreate, CharacterUpdate, CharacterResponse,
     RelationshipCreate, RelationshipUpdate, RelationshipResponse
 )
-from app.services.character_service import character_service
+from app.services.character_service import character_service, CharacterVersionConflict
 
 router = APIRouter()
 
@@ -27,7 +27,10 @@ def read_character(character_id: int, db: Session = Depends(get_db)):
 
 @router.put("/{character_id}", response_model=CharacterResponse)
 def update_character(character_id: int, character: CharacterUpdate, db: Session = Depends(get_db)):
-    db_character = character_service.update_character(db, character_id=character_id, character=character)
+    try:
+        db_character = character_service.update_character(db, character_id=character_id, character=character)
+    except CharacterVersionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if db_character is None:
         raise HTTPException(status_code=404, detail="Character not found")
     return db_character
@@ -26,7 +26,9 @@ from app.services.dialogue import dialogue_service
 from app.services.extraction_service import extraction_service
 from app.services.scenario_service import scenario_service
 from app.services.character_service import character_service
+from app.services.character_cache import character_cache
 from app.services.context_manager import context_manager
+from app.services.stats_service import stats_service
 from app.models.domain_schemas import CharacterUpdate
 from app.utils.logger import logger
 import json
@@ -65,7 +67,7 @@ def create_session(
         user_id=user_id,
         character_id=character_id,
         scenario_id=scenario_id,
-        is_active=1
+        is_active=True
     )
     db.add(new_session)
     db.commit()
@@ -158,17 +160,21 @@ async def chat(
         if session_obj:
             session_obj.updated_at = func.now()
             # 如果输入数据中缺少 character_id/scenario_id，则从 Session 中回填
+            # (DialogueInput 为不可变模型，通过 model_copy 派生新对象)
+            backfill = {}
             if not input_data.character_id and session_obj.character_id:
-                input_data.character_id = session_obj.character_id
+                backfill["character_id"] = session_obj.character_id
             if not input_data.scenario_id and session_obj.scenario_id:
-                input_data.scenario_id = session_obj.scenario_id
+                backfill["scenario_id"] = session_obj.scenario_id
+            if backfill:
+                input_data = input_data.model_copy(update=backfill)
             db.commit()
     
     # 预取角色名称，辅助 NLU 分析
     if input_data.character_id:
-        char_obj = character_service.get_character(db, input_data.character_id)
+        char_obj = character_cache.get(db, input_data.character_id)
         if char_obj:
-            input_data.character_name = char_obj.name
+            input_data = input_data.model_copy(update={"character_name": char_obj.name})
 
     # --- 1. NLU Analysis (快速意图分析) ---
     logger.info(f"正在分析输入: {input_data.text} (Character: {input_data.character_name})")
@@ -362,7 +368,7 @@ async def chat(
 @router.post("/chat/{log_id}/rate", summary="评价对话质量")
 async def rate_dialogue(
     log_id: int, 
-    rating: int = Body(..., embed=True), 
+    rating: int = Body(..., embed=True, ge=1, le=5), 
     feedback: str = Body(None, embed=True),
     db: Session = Depends(get_db)
 ):
@@ -383,7 +389,7 @@ async def rate_dialogue(
         log_entry.feedback_text = feedback[:2000] # Limit length
         
     if rating <= 2:
-        log_entry.is_archived_for_tuning = 1
+        log_entry.is_archived_for_tuning = True
         
     db.commit()
     return {"status": "success", "log_id": log_id}
@@ -414,6 +420,14 @@ async def get_logs(
     logs = query.all()
     return logs
 
+@router.get("/stats/characters", summary="角色/场景对话统计")
+async def get_character_stats(db: Session = Depends(get_db)):
+    """
+    按角色与场景聚合的对话统计 (轮次、平均评分、平均延迟、Token 总量).
+    PostgreSQL 下读取物化视图 mv_character_stats，staleness_seconds 表示数据距上次刷新的秒数。
+    """
+    return stats_service.get_character_stats(db)
+
 async def update_character_profile(db: Session, char_name: str, text: str):
     """
     后台任务：更新角色档案 (Deprecated).
@@ -714,7 +728,8 @@ async def analyze_conversation_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 from fastapi import Query
-from sqlalchemy import or_, cast, String
+from sqlalchemy import or_, cast, String, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 
 @router.get("/analysis/history", summary="获取长对话历史分析记录")
 def get_analysis_history(
@@ -733,13 +748,18 @@ def get_analysis_history(
     
     if character_names:
         # 使用数据库级筛选优化性能 (Database-level filtering)
-        # 针对 JSON 类型的兼容性处理: 将 JSON 字段转换为字符串进行模糊匹配
-        # 假设存储格式为 ["Name1", "Name2"]，匹配 "Name1"
         conditions = []
-        for name in character_names:
-            # 注意: 简单的 LIKE 匹配可能会有误判 (e.g. "Ann" matches "Anna")
-            # 但在大多数情况下对于全名匹配是足够的，且比全表扫描+内存过滤高效得多
-            conditions.append(cast(AnalysisLog.character_names, String).like(f'%"{name}"%'))
+        if db.get_bind().dialect.name == "postgresql":
+            # PostgreSQL: JSONB 包含查询 (@>)，可命中 GIN 索引 ix_analysis_logs_character_names_gin
+            for name in character_names:
+                conditions.append(type_coerce(AnalysisLog.character_names, JSONB).contains([name]))
+        else:
+            # 针对 JSON 类型的兼容性处理: 将 JSON 字段转换为字符串进行模糊匹配
+            # 假设存储格式为 ["Name1", "Name2"]，匹配 "Name1"
+            for name in character_names:
+                # 注意: 简单的 LIKE 匹配可能会有误判 (e.g. "Ann" matches "Anna")
+                # 但在大多数情况下对于全名匹配是足够的，且比全表扫描+内存过滤高效得多
+                conditions.append(cast(AnalysisLog.character_names, String).like(f'%"{name}"%'))
         
         if conditions:
             query = query.filter(or_(*conditions))
@@ -830,6 +850,28 @@ def approve_observation(
         raise HTTPException(status_code=400, detail="Approval failed")
     return {"status": "approved"}
 
+class ObservationBatchRequest(BaseModel):
+    observation_ids: List[int]
+
+@router.post("/observations/approve", summary="批量批准观察建议")
+def approve_observations(
+    request: ObservationBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    批量批准观察建议并合并到角色档案 (Bulk Approve & Merge).
+    
+    与单条批准的合并逻辑相同，但所有观察建议通过一次查询加载，
+    每个角色只执行一次 SQL 端追加更新，整批在同一事务中提交。
+    
+    Args:
+        request (ObservationBatchRequest): 观察建议ID列表
+        
+    Returns:
+        dict: { "approved": [...], "skipped": [...] }，skipped 为不存在或角色缺失的ID
+    """
+    return character_observation_service.approve_observations(db, request.observation_ids)
+
 @router.post("/observations/{observation_id}/reject", summary="拒绝观察建议")
 def reject_observation(
     observation_id: int,
@@ -877,7 +919,7 @@ def submit_character_feedback(
         character_id=character_id,
         session_id=feedback_data.session_id,
         log_id=feedback_data.log_id,
-        is_accurate=1 if feedback_data.is_accurate else 0,
+        is_accurate=feedback_data.is_accurate,
         reason_category=feedback_data.reason_category,
         comment=feedback_data.comment,
         context_data=feedback_data.context_data
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from app.core.database import get_db
 from app.services.feedback_service import feedback_service
 from app.utils.logger import logger
@@ -12,7 +13,7 @@ class FeedbackCreate(BaseModel):
     session_id: str
     user_input: str
     model_output: str
-    rating: int # 1-5
+    rating: int = Field(..., ge=1, le=5) # 1-5
     comment: Optional[str] = None
 
 class CharacterEventCreate(BaseModel):
@@ -74,7 +75,10 @@ def add_event(
 def get_timeline(
     character_id: int,
     limit: int = 50,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
-    events = feedback_service.get_character_timeline(db, character_id, limit)
+    """可选 start/end (ISO 日期或时间) 限定时间范围 [start, end)。"""
+    events = feedback_service.get_character_timeline(db, character_id, limit, start=start, end=end)
     return events
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Body, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer_group
 from app.core.database import get_db
 from app.models.sql_models import ConversationSegment
 from app.services.realtime_audio_service import RealtimeAudioService
@@ -71,7 +71,7 @@ async def update_speaker(segment_id: int, speaker_name: str = Body(..., embed=Tr
 @router.post("/segments/{segment_id}/rate")
 async def rate_segment(
     segment_id: int, 
-    rating: int = Body(..., embed=True), 
+    rating: int = Body(..., embed=True, ge=1, le=5), 
     feedback: str = Body(None, embed=True),
     db: Session = Depends(get_db)
 ):
@@ -95,7 +95,8 @@ def get_segments(
     session_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(ConversationSegment)
+    # Clients render emotion/analysis per segment, so load the deferred payload columns in the same SELECT
+    query = db.query(ConversationSegment).options(undefer_group("payload"))
     if session_id:
         query = query.filter(ConversationSegment.session_id == session_id)
         
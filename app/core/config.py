@@ -24,6 +24,9 @@ class Settings:
         self.APP_MODE = system_config.get("mode", "production")
         self.LOG_LEVEL = system_config.get("log_level", "INFO")
         self.DEBUG = self.LOG_LEVEL.upper() == "DEBUG"
+        # Official/containerized deployment: skips dev-machine workarounds (Anaconda ffmpeg search, MKL fix)
+        is_production = os.getenv("BTB_PRODUCTION", system_config.get("is_production", False))
+        self.IS_PRODUCTION = str(is_production).lower() in ("1", "true", "yes")
         
         # Audio
         audio_config = self._config.get("audio") or {}
@@ -36,9 +39,19 @@ class Settings:
         self.AUDIO_INITIAL_PROMPT = audio_config.get("initial_prompt", "以下是简体中文的对话。")
         self.AUDIO_TTS_DEFAULT_VOICE = audio_config.get("default_voice", "zh-CN-XiaoxiaoNeural")
         self.AUDIO_TTS_VOICES = audio_config.get("available_voices", [])
+        # Max concurrent edge-tts synthesis connections (cache hits are not limited)
+        self.AUDIO_TTS_CONCURRENCY = int(audio_config.get("tts_concurrency", 4) or 4)
         
         self.AUDIO_SER_ENABLED = audio_config.get("ser_enabled", True)
         self.AUDIO_SER_MODEL = audio_config.get("ser_model", "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition")
+        # int8 SER on CPU: ONNX Runtime export when optimum is installed, else torch dynamic quantization
+        self.AUDIO_SER_QUANTIZE = audio_config.get("ser_quantize", True)
+        # CPU SER intra-op threads, applied once at load (0 = runtime default). ONNX Runtime caps only its
+        # own session; the torch backend sets torch's process-wide pool, which other CPU torch work shares
+        self.AUDIO_SER_CPU_THREADS = int(audio_config.get("ser_cpu_threads", 0) or 0)
+        # Pyannote submodel JIT: "none" | "script" (TorchScript segmentation, verified against eager at load)
+        # | "compile" (torch.compile segmentation + embedding, PyTorch 2.x; falls back to eager on failure)
+        self.AUDIO_PYANNOTE_JIT = str(audio_config.get("pyannote_jit", "script")).lower()
         
         # Models - ASR
         models_config = self._config.get("models") or {}
@@ -49,7 +62,17 @@ class Settings:
         
         asr_config = models_config.get("asr") or {}
         self.AUDIO_STT_MODEL_SIZE = asr_config.get("model_size") or audio_config.get("stt_model_size", "base")
-        self.AUDIO_STT_COMPUTE_TYPE = asr_config.get("compute_type") or audio_config.get("stt_compute_type", "int8")
+        # "auto" -> int8_float16 on CUDA, AUDIO_STT_COMPUTE_TYPE_CPU on CPU
+        self.AUDIO_STT_COMPUTE_TYPE = asr_config.get("compute_type") or audio_config.get("stt_compute_type", "auto")
+        self.AUDIO_STT_COMPUTE_TYPE_CPU = asr_config.get("compute_type_cpu") or audio_config.get("stt_compute_type_cpu", "int8")
+        # CTranslate2 intra-op threads on CPU (0 = all cores); also pins OMP_NUM_THREADS when set
+        self.AUDIO_STT_CPU_THREADS = int(asr_config.get("cpu_threads") or audio_config.get("stt_cpu_threads", 0) or 0)
+        # Load and warm up Whisper + SER in the background at startup instead of on the first request
+        self.AUDIO_STT_PRELOAD = audio_config.get("stt_preload", True)
+        # Segments per encoder batch in BatchedInferencePipeline (lower on small-VRAM GPUs)
+        self.AUDIO_STT_BATCH_SIZE = int(audio_config.get("stt_batch_size", 8) or 8)
+        # Max concurrent STT jobs dispatched from async code (bounds Whisper memory/CPU thrash)
+        self.AUDIO_STT_CONCURRENCY = int(audio_config.get("stt_concurrency", 2) or 2)
         
         # Model Paths (Centralized)
         self.AUDIO_STT_MODEL_PATH = self.MODEL_DIR / f"faster-whisper-{self.AUDIO_STT_MODEL_SIZE}"
@@ -100,6 +123,8 @@ class Settings:
         self.DATA_DIR.mkdir(parents=True, exist_ok=True)
         
         self.DATABASE_URL = storage_config.get("database_url") or db_config.get("url") or f"sqlite:///{default_db_path.as_posix()}"
+        # Refresh period (seconds) for the mv_character_stats materialized view (PostgreSQL)
+        self.STATS_REFRESH_INTERVAL = db_config.get("stats_refresh_interval", 300)
 
         # Ensure database directory exists if using sqlite
         if self.DATABASE_URL.startswith("sqlite:///"):
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine, event
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -9,8 +10,15 @@ SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 # Check if SQLite to add check_same_thread
 connect_args = {"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 
+# Batched executemany: multi-row INSERT ... VALUES for inserts (all drivers), and for psycopg2
+# also execute_batch for UPDATE/DELETE executemany (e.g. CharacterService.import_data).
+# psycopg (v3) batches natively and rejects the psycopg2-only options.
+engine_kwargs = {"insertmanyvalues_page_size": 1000}
+if SQLALCHEMY_DATABASE_URL.startswith(("postgresql://", "postgresql+psycopg2://")):
+    engine_kwargs.update(executemany_mode="values_plus_batch", executemany_batch_page_size=500)
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **engine_kwargs
 )
 
 # Enable WAL mode for SQLite
@@ -31,3 +39,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@contextmanager
+def dependent_views_dropped(conn, table: str):
+    """
+    PostgreSQL: drop the views / materialized views that read `table` (e.g. mv_character_stats),
+    run the body, then recreate them and their indexes from the saved definitions. PG refuses to
+    DROP a table or ALTER a column type under a dependent view. Use inside one transaction: if the
+    body fails nothing is recreated and the rollback restores the originals.
+    Grants on the views are not carried over.
+    """
+    views = conn.execute(text(
+        "SELECT DISTINCT v.oid, CAST(v.oid AS regclass)::text, v.relkind, pg_get_viewdef(v.oid) "
+        "FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class v ON v.oid = r.ev_class "
+        "WHERE d.classid = CAST('pg_rewrite' AS regclass) AND d.refobjid = CAST(:t AS regclass) "
+        "AND v.oid <> d.refobjid"
+    ), {"t": table}).all()
+    saved = []
+    for oid, name, relkind, definition in views:
+        kind = "MATERIALIZED VIEW" if relkind == "m" else "VIEW"
+        indexes = conn.execute(
+            text("SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = :oid"), {"oid": oid}
+        ).scalars().all()
+        saved.append((kind, name, definition.strip().rstrip(";"), indexes))
+        # No CASCADE: anything built on top of the view makes this fail loudly instead of vanishing
+        conn.execute(text(f"DROP {kind} {name}"))
+
+    yield
+
+    for kind, name, definition, indexes in saved:
+        conn.execute(text(f"CREATE {kind} {name} AS {definition}"))
+        for index in indexes:
+            conn.execute(text(index))
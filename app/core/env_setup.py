@@ -1,9 +1,17 @@
 import os
 import sys
-import glob
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from app.core.config import settings
 from app.utils.logger import logger
 
+# Resolved once at import; setup_* may run repeatedly (e.g. from tests)
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+_CONDA_LIB_BIN = Path(sys.prefix) / "Library" / "bin"
+_CUDA_ROOT = Path("C:/Program Files/NVIDIA GPU Computing Toolkit/CUDA")
+
 def setup_environment():
     """
     Setup environment variables and paths before application startup.
@@ -24,56 +32,114 @@ def setup_environment():
     # 3. Fix Intel MKL / libifcoremd.dll issues
     # "OMP: Error #15: Initializing libiomp5md.dll, but found libiomp5md.dll already initialized."
     # or general DLL conflicts with numpy/torch
-    os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
-    logger.info("Set KMP_DUPLICATE_LIB_OK=TRUE to prevent MKL conflicts.")
+    # Only dev machines (Anaconda DLL mix) need this; official images ship a single OpenMP runtime.
+    if not settings.IS_PRODUCTION:
+        os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+        logger.info("Set KMP_DUPLICATE_LIB_OK=TRUE to prevent MKL conflicts.")
+
+    # 4. Pin OpenMP threads (CTranslate2 / torch CPU kernels read it at init)
+    if settings.AUDIO_STT_CPU_THREADS:
+        os.environ.setdefault("OMP_NUM_THREADS", str(settings.AUDIO_STT_CPU_THREADS))
 
-    # 4. Set Hugging Face Mirror
+    # 5. Set Hugging Face Mirror
     if "HF_ENDPOINT" not in os.environ:
         os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
         logger.info("Set HF_ENDPOINT=https://hf-mirror.com for faster downloads in China.")
 
+async def _spawn_probe(exe):
+    """Start `<exe> -version` without waiting for it; None if it can't be started."""
+    try:
+        return await asyncio.create_subprocess_exec(
+            str(exe), "-version", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+async def _first_working(candidates):
+    # Launch every probe at once, but honour the caller's preference order
+    procs = [await _spawn_probe(c) for c in candidates]
+    try:
+        for candidate, proc in zip(candidates, procs):
+            if proc is not None and await proc.wait() == 0:
+                return candidate
+        return None
+    finally:
+        # Probes whose answer is no longer needed: kill and reap them (no orphaned children)
+        for proc in procs:
+            if proc is not None and proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+
+def _find_working_executable(candidates):
+    """
+    Probe all candidate executables in parallel and return the first (by order) that runs.
+    Wall time is that of a single probe instead of the sum of all of them.
+    """
+    if not candidates:
+        return None
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_first_working(candidates))
+    # Imported from inside a running loop (e.g. uvicorn): probe on a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _first_working(candidates)).result()
+
 def setup_ffmpeg():
     import shutil
-    import subprocess
     
     # Check if current ffmpeg works
     ffmpeg_cmd = shutil.which("ffmpeg")
     is_working = False
 
+    # Production images provide ffmpeg on PATH; skip the local/conda/pkgs fallback chain entirely
+    if settings.IS_PRODUCTION:
+        if not ffmpeg_cmd:
+            logger.warning("ffmpeg not found on PATH.")
+            return
+        try:
+            subprocess.run([ffmpeg_cmd, "-version"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+            logger.info("ffmpeg found and working: {}", ffmpeg_cmd)
+        except Exception as e:
+            logger.warning("ffmpeg found at {} but failed to run: {}", ffmpeg_cmd, e)
+        return
+
     # 0. Check project-local tools/ffmpeg.exe (Priority)
-    project_root = Path(__file__).resolve().parent.parent.parent
-    local_ffmpeg = project_root / "tools" / "ffmpeg.exe"
+    local_ffmpeg = _PROJECT_ROOT / "tools" / "ffmpeg.exe"
     if local_ffmpeg.exists():
         try:
             subprocess.run([str(local_ffmpeg), "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logger.info(f"Found working local ffmpeg: {local_ffmpeg}")
+            logger.info("Found working local ffmpeg: {}", local_ffmpeg)
             os.environ["PATH"] = str(local_ffmpeg.parent) + os.pathsep + os.environ["PATH"]
             return
         except Exception as e:
-            logger.warning(f"Local ffmpeg at {local_ffmpeg} failed: {e}")
+            logger.warning("Local ffmpeg at {} failed: {}", local_ffmpeg, e)
     
     if ffmpeg_cmd:
         try:
             # Try running ffmpeg -version
             subprocess.run([ffmpeg_cmd, "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logger.info(f"ffmpeg found and working: {ffmpeg_cmd}")
+            logger.info("ffmpeg found and working: {}", ffmpeg_cmd)
             is_working = True
             return
         except Exception as e:
-            logger.warning(f"ffmpeg found at {ffmpeg_cmd} but failed to run: {e}")
+            logger.warning("ffmpeg found at {} but failed to run: {}", ffmpeg_cmd, e)
             is_working = False
 
     # Check current environment's Library/bin (Standard Conda)
-    env_lib_bin = Path(sys.prefix) / "Library" / "bin"
+    env_lib_bin = _CONDA_LIB_BIN
     ffmpeg_in_env = env_lib_bin / "ffmpeg.exe"
     if ffmpeg_in_env.exists():
         try:
             subprocess.run([str(ffmpeg_in_env), "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            logger.info(f"Found working ffmpeg in current env: {ffmpeg_in_env}")
+            logger.info("Found working ffmpeg in current env: {}", ffmpeg_in_env)
             os.environ["PATH"] = str(env_lib_bin) + os.pathsep + os.environ["PATH"]
             return
         except Exception as e:
-            logger.warning(f"ffmpeg in env failed: {e}")
+            logger.warning("ffmpeg in env failed: {}", e)
 
     if not is_working:
         logger.info("Attempting to find alternative ffmpeg in anaconda pkgs...")
@@ -107,28 +173,23 @@ def setup_ffmpeg():
         
         if anaconda_base and (anaconda_base / "pkgs").exists():
             pkgs_dir = anaconda_base / "pkgs"
-            # Find ffmpeg packages
-            ffmpeg_dirs = list(pkgs_dir.glob("ffmpeg-*/Library/bin"))
-            if ffmpeg_dirs:
-                # Sort by name (version) descending to get latest
-                ffmpeg_dirs.sort(key=lambda p: str(p), reverse=True)
-                
-                # Try each found ffmpeg
-                found_working = False
-                for f_dir in ffmpeg_dirs:
-                    f_path = f_dir / "ffmpeg.exe"
-                    if f_path.exists():
-                        try:
-                            subprocess.run([str(f_path), "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                            logger.info(f"Found working ffmpeg in pkgs: {f_path}")
-                            # Prepend to PATH
-                            os.environ["PATH"] = str(f_dir) + os.pathsep + os.environ["PATH"]
-                            found_working = True
-                            break
-                        except Exception:
-                            continue
+            # Find ffmpeg packages (shallow scan + direct exe check instead of a two-level glob)
+            ffmpeg_pkgs = [
+                p for p in pkgs_dir.iterdir()
+                if p.name.startswith("ffmpeg-") and (p / "Library" / "bin" / "ffmpeg.exe").exists()
+            ]
+            if ffmpeg_pkgs:
+                # Prefer the most recently installed package
+                ffmpeg_pkgs.sort(key=lambda p: p.stat().st_mtime, reverse=True)
                 
-                if not found_working:
+                # Probe all found ffmpeg builds concurrently, keep the newest that works
+                candidates = [p / "Library" / "bin" / "ffmpeg.exe" for p in ffmpeg_pkgs]
+                f_path = _find_working_executable(candidates)
+                if f_path:
+                    logger.info("Found working ffmpeg in pkgs: {}", f_path)
+                    # Prepend to PATH
+                    os.environ["PATH"] = str(f_path.parent) + os.pathsep + os.environ["PATH"]
+                else:
                     logger.warning("Found ffmpeg packages but none worked.")
             else:
                 logger.warning("Could not find ffmpeg in anaconda pkgs.")
@@ -138,31 +199,30 @@ def setup_cuda():
     # The app requires cublas64_11.dll (CUDA 11) or cublas64_12.dll (CUDA 12).
     
     # Look for system CUDA
-    cuda_path_root = Path("C:/Program Files/NVIDIA GPU Computing Toolkit/CUDA")
+    cuda_path_root = _CUDA_ROOT
     if cuda_path_root.exists():
-        versions = list(cuda_path_root.glob("v*"))
+        versions = [p for p in cuda_path_root.iterdir() if p.name.startswith("v") and (p / "bin").is_dir()]
         versions.sort(reverse=True) # Try latest first
         
         for v in versions:
             bin_dir = v / "bin"
-            if bin_dir.exists():
-                path_str = str(bin_dir)
-                # Add to PATH if not already there
-                if path_str not in os.environ["PATH"]:
-                    os.environ["PATH"] = path_str + os.pathsep + os.environ["PATH"]
-                    logger.info(f"Added CUDA {v.name} bin to PATH: {path_str}")
-                
-                # Check for key DLLs to verify
-                if (bin_dir / "cublas64_11.dll").exists():
-                    logger.info(f"Found cublas64_11.dll in {v.name}")
-                elif (bin_dir / "cublas64_12.dll").exists():
-                    logger.info(f"Found cublas64_12.dll in {v.name}")
+            path_str = str(bin_dir)
+            # Add to PATH if not already there
+            if path_str not in os.environ["PATH"]:
+                os.environ["PATH"] = path_str + os.pathsep + os.environ["PATH"]
+                logger.info("Added CUDA {} bin to PATH: {}", v.name, path_str)
+            
+            # Check for key DLLs to verify
+            if (bin_dir / "cublas64_11.dll").exists():
+                logger.info("Found cublas64_11.dll in {}", v.name)
+            elif (bin_dir / "cublas64_12.dll").exists():
+                logger.info("Found cublas64_12.dll in {}", v.name)
 
     # Also check Conda Library/bin (where cudatoolkit might be)
     # usually in sys.prefix/Library/bin
-    conda_lib_bin = Path(sys.prefix) / "Library" / "bin"
+    conda_lib_bin = _CONDA_LIB_BIN
     if conda_lib_bin.exists():
          path_str = str(conda_lib_bin)
          if path_str not in os.environ["PATH"]:
              os.environ["PATH"] = path_str + os.pathsep + os.environ["PATH"]
-             logger.info(f"Added Conda Library/bin to PATH: {path_str}")
+             logger.info("Added Conda Library/bin to PATH: {}", path_str)
@@ -3,17 +3,20 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from app.utils.logger import logger
 
+# Requests slower than this (seconds) are logged as warnings
+SLOW_REQUEST_THRESHOLD = 0.5
+
 class ProcessTimeMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        start_time = time.perf_counter()
         response = await call_next(request)
-        process_time = time.time() - start_time
+        process_time = time.perf_counter() - start_time
         
         # Add Header
         response.headers["X-Process-Time"] = str(process_time)
         
-        # Log slow requests (>500ms)
-        if process_time > 0.5:
-             logger.warning(f"Slow Request: {request.url.path} took {process_time:.4f}s")
+        # Log slow requests (>500ms); args are formatted lazily by the logger
+        if process_time > SLOW_REQUEST_THRESHOLD:
+             logger.warning("Slow Request: {} took {:.4f}s", request.url.path, process_time)
              
         return response
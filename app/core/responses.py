@@ -0,0 +1,20 @@
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson's C encoder (3-10x faster than stdlib json).
+    Falls back to the standard JSONResponse rendering if orjson is not installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if not HAS_ORJSON:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
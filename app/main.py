@@ -4,12 +4,14 @@ from app.core.env_setup import setup_environment
 # MUST be called before importing other app modules to ensure PATH and env vars are set
 setup_environment()
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from app.core.config import settings
 from app.utils.logger import logger
 from app.core.database import engine, Base, SessionLocal
 from app.core.middleware import ProcessTimeMiddleware
+from app.core.responses import ORJSONResponse
 from app.core.cache import cache_service
 from app.api.v1.endpoints import router as api_v1_router
 from app.api.v1.scenarios import router as scenarios_router
@@ -18,11 +20,13 @@ from app.api.v1.feedback import router as feedback_router
 from app.api.v1.audio import router as audio_router
 from app.api.v1.stream import router as stream_router
 from app.services.scenario_service import scenario_service
+from app.services.stats_service import stats_service
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
+    default_response_class=ORJSONResponse,
     openapi_tags=[
         {"name": "Chat", "description": "核心对话与知识库接口"},
         {"name": "Scenarios", "description": "场景管理接口"},
@@ -56,6 +60,10 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to sync scenarios: {e}")
 
+    # Periodic refresh of the character stats materialized view (PostgreSQL only)
+    if engine.dialect.name == "postgresql":
+        asyncio.create_task(stats_service.refresh_loop(settings.STATS_REFRESH_INTERVAL))
+
 @app.get("/", include_in_schema=False)
 async def root():
     """根路径重定向到 API 文档"""
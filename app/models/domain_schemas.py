@@ -63,8 +63,8 @@ class RelationshipBase(BaseModel):
     target_id: int
     relation_type: str
     details: Dict[str, Any] = {}
-    strength: Optional[int] = 5
-    sentiment: Optional[int] = 0
+    strength: Optional[int] = Field(5, ge=1, le=10)
+    sentiment: Optional[int] = Field(0, ge=-5, le=5)
 
 class RelationshipCreate(RelationshipBase):
     pass
@@ -72,8 +72,8 @@ class RelationshipCreate(RelationshipBase):
 class RelationshipUpdate(BaseModel):
     relation_type: Optional[str] = None
     details: Optional[Dict[str, Any]] = None
-    strength: Optional[int] = None
-    sentiment: Optional[int] = None
+    strength: Optional[int] = Field(None, ge=1, le=10)
+    sentiment: Optional[int] = Field(None, ge=-5, le=5)
 
 class RelationshipResponse(RelationshipBase):
     id: int
@@ -1,7 +1,13 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# Request/response models are built once per chat turn and never mutated afterwards.
+# Freezing them skips per-attribute assignment validation; use model_copy(update=...) to derive a variant.
+FROZEN_MODEL_CONFIG = ConfigDict(extra="ignore", frozen=True, validate_default=False)
 
 class DialogueInput(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     text: str = Field(..., description="用户当前输入的文本")
     history: List[Dict[str, str]] = Field(default=[], description="对话历史记录 (List of {role, content})")
     user_id: str = Field(default="guest", description="用户唯一标识符")
@@ -12,6 +18,8 @@ class DialogueInput(BaseModel):
     participants: List[str] = Field(default=["我"], description="对话参与者列表")
 
 class NLUOutput(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     intent: str = Field(..., description="用户的主要意图")
     sub_intent: Optional[str] = Field(None, description="更具体的子意图")
     emotion: str = Field(..., description="检测到的情感状态")
@@ -23,11 +31,15 @@ class NLUOutput(BaseModel):
     reasoning: str = Field(..., description="做出上述判断的推理依据")
 
 class GenerationOutput(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     content: str = Field(..., description="生成的回复内容")
     format_type: str = Field(..., description="回复的格式类型 (text/json/markdown)")
     references: List[str] = Field(default=[], description="参考的文档或知识来源")
 
 class CharacterFeedbackInput(BaseModel):
+    model_config = FROZEN_MODEL_CONFIG
+
     session_id: str = Field(..., description="相关的会话ID")
     log_id: Optional[int] = Field(None, description="关联的对话日志ID")
     is_accurate: bool = Field(..., description="角色画像是否准确")
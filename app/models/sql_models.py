@@ -1,8 +1,73 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, ForeignKey, DateTime, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, SmallInteger, CheckConstraint, String, Text, JSON, ForeignKey, DateTime, Float, Boolean, Index, MetaData, Table, bindparam, insert, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+import json
+import re
+import uuid
+import hashlib
 from app.core.database import Base
 
+# JSON on SQLite, binary JSONB on PostgreSQL (enables @> containment served by GIN indexes)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# Canonical dashed 8-4-4-4-12 form only. uuid.UUID() also parses undashed / {braced} / urn:uuid: ids,
+# but scripts/migrate_v15.py md5-mapped those, so the binder must treat them as free-form too.
+SESSION_UUID_PATTERN = "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+_SESSION_UUID_RE = re.compile(SESSION_UUID_PATTERN)
+
+class SessionIdType(TypeDecorator):
+    """
+    Session id: native 16-byte UUID on PostgreSQL, plain string elsewhere; always a str in Python.
+    Legacy/free-form ids (e.g. "session_unknown") map deterministically to md5(id)::uuid,
+    the same mapping scripts/migrate_v15.py applies to existing rows.
+    """
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(UUID(as_uuid=False))
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "postgresql":
+            return value
+        value = str(value)
+        if _SESSION_UUID_RE.fullmatch(value):
+            return value.lower()
+        return str(uuid.UUID(hashlib.md5(value.encode("utf-8")).hexdigest()))
+
+def gin_index(table: str, column: str) -> Index:
+    """PostgreSQL-only GIN index (jsonb_path_ops) for @> containment lookups on a JSONB column."""
+    return Index(
+        f"ix_{table}_{column}_gin", column,
+        postgresql_using="gin",
+        postgresql_ops={column: "jsonb_path_ops"},
+    ).ddl_if(dialect="postgresql")
+
+def brin_index(table: str, column: str = "created_at") -> Index:
+    """PostgreSQL-only BRIN index for append-only, insertion-ordered columns (kilobytes instead of a full btree)."""
+    return Index(
+        f"ix_{table}_{column}_brin", column,
+        postgresql_using="brin",
+        postgresql_with={"pages_per_range": 32},
+    ).ddl_if(dialect="postgresql")
+
+class BulkCreateMixin:
+    """Single-statement bulk inserts for write-heavy log/event tables."""
+
+    @classmethod
+    def bulk_create(cls, session, rows: list[dict]) -> list[int]:
+        """
+        Insert many rows with one executemany INSERT ... RETURNING (batched by insertmanyvalues)
+        instead of a session.add() per row. Returns the new primary keys in input order.
+        """
+        if not rows:
+            return []
+        return list(session.scalars(insert(cls).returning(cls.id, sort_by_parameter_order=True), rows))
+
 class Scenario(Base):
     __tablename__ = "scenarios"
 
@@ -10,26 +75,30 @@ class Scenario(Base):
     name = Column(String, unique=True, index=True)
     description = Column(Text, nullable=True)
     domain = Column(String, index=True) # e.g., "Medical", "CustomerService"
-    rules = Column(JSON, default={}) # Dialogue flow rules
+    rules = Column(JSON, server_default="{}") # Dialogue flow rules
     
     # Advanced LLM Config
     system_role = Column(Text, nullable=True) # "Who am I"
-    processing_steps = Column(JSON, default={}) # "How to think" (CoT steps)
+    processing_steps = Column(JSON, server_default="{}") # "How to think" (CoT steps)
     prompt_template = Column(Text, nullable=True) # Full prompt template
     
-    eval_criteria = Column(JSON, default={}) # Scoring criteria
+    eval_criteria = Column(JSON, server_default="{}") # Scoring criteria
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class ConversationSession(Base):
     __tablename__ = "conversation_sessions"
+    __table_args__ = (
+        # Partial index: "list active sessions" only touches active rows
+        Index("ix_sessions_active", "user_id", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+    )
 
-    id = Column(String, primary_key=True, index=True) # UUID
+    id = Column(SessionIdType, primary_key=True, index=True) # UUID
     user_id = Column(String, index=True)
     character_id = Column(Integer, ForeignKey("characters.id"), nullable=True)
     scenario_id = Column(Integer, ForeignKey("scenarios.id"), nullable=True)
     
     # Session state/context
-    is_active = Column(Integer, default=1)
+    is_active = Column(Boolean, default=True)
     summary = Column(Text, nullable=True) # Running summary of conversation
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -39,15 +108,24 @@ class ConversationSession(Base):
     character = relationship("Character")
     scenario = relationship("Scenario")
 
-class DialogueLog(Base):
+class DialogueLog(BulkCreateMixin, Base):
     """
     Log for every dialogue turn, used for evaluation and analytics.
+    On PostgreSQL the table is range-partitioned by month on created_at (scripts/migrate_v13.py).
     """
     __tablename__ = "dialogue_logs"
+    __table_args__ = (
+        # Session timelines / per-user history: one range scan, ORDER BY created_at served by the index
+        Index("ix_dlg_session_created", "session_id", "created_at", postgresql_include=["rating", "tokens_used"]),
+        Index("ix_dlg_user_created", "user_id", "created_at"),
+        Index("ix_dlg_archived", "id", postgresql_where=text("is_archived_for_tuning"), sqlite_where=text("is_archived_for_tuning")),
+        gin_index("dialogue_logs", "nlu_result"),
+        brin_index("dialogue_logs"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, index=True)
-    user_id = Column(String, index=True)
+    session_id = Column(SessionIdType) # Indexed via ix_dlg_session_created
+    user_id = Column(String) # Indexed via ix_dlg_user_created
     
     # Inputs
     user_input = Column(Text)
@@ -56,7 +134,7 @@ class DialogueLog(Base):
     
     # Outputs
     bot_response = Column(Text)
-    nlu_result = Column(JSON) # Intent, etc.
+    nlu_result = Column(JSONType) # Intent, etc.
     reasoning_content = Column(Text, nullable=True) # CoT content
     
     # Metrics
@@ -64,9 +142,9 @@ class DialogueLog(Base):
     latency_ms = Column(Float, default=0.0)
     
     # Evaluation (Human or Auto)
-    rating = Column(Integer, nullable=True) # 1-5
+    rating = Column(SmallInteger, CheckConstraint("rating BETWEEN 1 AND 5", name="ck_dialogue_logs_rating"), nullable=True) # 1-5
     feedback_text = Column(Text, nullable=True)
-    is_archived_for_tuning = Column(Integer, default=0) # 0=No, 1=Yes
+    is_archived_for_tuning = Column(Boolean, default=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -75,100 +153,169 @@ class AnalysisLog(Base):
     Log for Long Conversation Analysis (replacing local JSON file).
     """
     __tablename__ = "analysis_logs"
+    __table_args__ = (
+        gin_index("analysis_logs", "character_names"),
+        gin_index("analysis_logs", "structured_data"),
+        brin_index("analysis_logs"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, index=True, nullable=True) # Optional link to a session
     
     # Content
     text_content = Column(Text) # The raw input text
-    character_names = Column(JSON, default=[]) # List of involved characters
+    character_names = Column(JSONType, server_default="[]") # List of involved characters
     
     # Results
     summary = Column(Text, nullable=True) # Short summary
     markdown_report = Column(Text, nullable=True) # Full Markdown report
-    structured_data = Column(JSON, default={}) # The JSON output from LLM
+    structured_data = Column(JSONType, server_default="{}") # The JSON output from LLM
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-class ConversationSegment(Base):
+class ConversationSegment(BulkCreateMixin, Base):
     """
     Real-time conversation segments.
+    On PostgreSQL the table is range-partitioned by month on created_at (scripts/migrate_v13.py).
     """
     __tablename__ = "conversation_segments"
+    __table_args__ = (
+        Index("ix_seg_session_time", "session_id", "start_time"),
+        gin_index("conversation_segments", "emotion"),
+        gin_index("conversation_segments", "metrics"),
+        gin_index("conversation_segments", "analysis"),
+        brin_index("conversation_segments"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, index=True) # Group segments into a session
+    session_id = Column(SessionIdType) # Group segments into a session (indexed via ix_seg_session_time)
     
     text = Column(Text)
     speaker_id = Column(String, index=True) # Voice Profile ID
     speaker_name = Column(String) # Display Name
     character_id = Column(Integer, ForeignKey("characters.id"), nullable=True) # Mapped Character
     
-    emotion = Column(JSON, default={}) # {label: score}
-    metrics = Column(JSON, default={}) # Pitch, energy, etc.
-    analysis = Column(JSON, default={}) # Deep analysis (Inner OS, Subtext)
+    # Bulky payload columns are deferred (group "payload"): timeline scans only read the hot columns,
+    # detail views opt in with .options(undefer_group("payload"))
+    emotion = deferred(Column(JSONType, server_default="{}"), group="payload") # {label: score}
+    metrics = deferred(Column(JSONType, server_default="{}"), group="payload") # Pitch, energy, etc.
+    analysis = deferred(Column(JSONType, server_default="{}"), group="payload") # Deep analysis (Inner OS, Subtext)
     
     # Rating & Feedback
-    rating = Column(Integer, default=0) # 1-5
-    feedback = Column(Text, nullable=True)
+    rating = Column(SmallInteger, CheckConstraint("rating BETWEEN 0 AND 5", name="ck_conversation_segments_rating"), default=0) # 1-5 (0 = unrated)
+    feedback = deferred(Column(Text, nullable=True), group="payload")
     
     start_time = Column(Float, nullable=True) # Relative time in session
     end_time = Column(Float, nullable=True)
     
-    audio_path = Column(String, nullable=True) # Path to saved wav segment
+    audio_path = deferred(Column(String, nullable=True), group="payload") # Path to saved wav segment
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Character(Base):
     __tablename__ = "characters"
+    __table_args__ = (
+        gin_index("characters", "attributes"),
+        gin_index("characters", "traits"),
+        gin_index("characters", "dynamic_profile"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     # Basic attributes: age, gender, occupation, etc.
-    attributes = Column(JSON, default={}) 
+    attributes = Column(JSONType, server_default="{}") 
     # Behavioral traits: personality, speaking style, etc.
-    traits = Column(JSON, default={})
+    traits = Column(JSONType, server_default="{}")
     # Dynamic profile: System's core memory of the character, updated by analysis engine
-    dynamic_profile = Column(JSON, default={})
+    dynamic_profile = Column(JSONType, server_default="{}")
     version = Column(Integer, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    # Relationships
+    # Relationships (lazy by default; bulk readers opt in via selectinload, see CharacterService.get_characters)
     relationships_as_source = relationship("Relationship", foreign_keys="[Relationship.source_id]", back_populates="source")
     relationships_as_target = relationship("Relationship", foreign_keys="[Relationship.target_id]", back_populates="target")
     events = relationship("CharacterEvent", back_populates="character", order_by="desc(CharacterEvent.event_date)")
 
+    @classmethod
+    def append_profile_items(cls, session, char_id: int, key: str, items: list) -> bool:
+        """
+        Append `items` to the JSON list dynamic_profile[key] (created if missing) and bump version,
+        entirely SQL-side: concurrent appends cannot drop each other's entries and the profile
+        is never read into Python. A NULL / JSON null profile counts as {}.
+        Returns False if the character does not exist.
+        """
+        if not items:
+            return False
+        table = cls.__table__
+        profile = table.c.dynamic_profile
+        if session.bind.dialect.name == "postgresql":
+            # jsonb_set(profile, '{key}', coalesce(profile -> key, '[]') || items)
+            base = func.coalesce(func.nullif(profile, text("'null'::jsonb")), text("'{}'::jsonb"))
+            current = func.coalesce(base.op("->")(key), text("'[]'::jsonb"))
+            merged = func.jsonb_set(
+                base, bindparam("path", [key], type_=ARRAY(Text)),
+                current.op("||")(bindparam("items", items, type_=JSONB)),
+            )
+        else:
+            # SQLite: json_insert(list, '$[#]', json(v1), '$[#]', json(v2), ...) appends in order
+            if '"' in key:
+                # JSON paths have no escape for '"'; SQLite would silently write nothing
+                raise ValueError(f"Unsupported dynamic_profile key: {key!r}")
+            path = f'$."{key}"'
+            args = []
+            for item in items:
+                args += ["$[#]", func.json(json.dumps(item, ensure_ascii=False))]
+            base = func.coalesce(func.nullif(profile, "null"), "{}")
+            current = func.coalesce(func.json_extract(base, path), "[]")
+            merged = func.json_set(base, path, func.json_insert(current, *args))
+        result = session.execute(
+            update(table).where(table.c.id == char_id).values(dynamic_profile=merged, version=table.c.version + 1)
+        )
+        from app.services.character_cache import character_cache
+        character_cache.invalidate_on_commit(session, char_id)
+        return result.rowcount > 0
+
 class Relationship(Base):
     __tablename__ = "relationships"
+    __table_args__ = (
+        # One index per endpoint so "source = x" and "target = x" lookups (UNION ALL halves) are both seeks;
+        # (source_id, target_id) also serves the exact-pair lookup
+        Index("ix_rel_source_target", "source_id", "target_id"),
+        Index("ix_rel_target", "target_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     source_id = Column(Integer, ForeignKey("characters.id"))
     target_id = Column(Integer, ForeignKey("characters.id"))
     relation_type = Column(String, index=True) # e.g., "Friend", "Doctor-Patient"
-    details = Column(JSON, default={}) # Interaction history summary or specific notes
+    details = Column(JSON, server_default="{}") # Interaction history summary or specific notes
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     source = relationship("Character", foreign_keys=[source_id], back_populates="relationships_as_source")
     target = relationship("Character", foreign_keys=[target_id], back_populates="relationships_as_target")
 
     # New fields for Dynamic Relationships
-    strength = Column(Integer, default=5) # 1-10
-    sentiment = Column(Integer, default=0) # -5 to +5
+    strength = Column(SmallInteger, CheckConstraint("strength BETWEEN 1 AND 10", name="ck_relationships_strength"), default=5) # 1-10
+    sentiment = Column(SmallInteger, CheckConstraint("sentiment BETWEEN -5 AND 5", name="ck_relationships_sentiment"), default=0) # -5 to +5
     last_updated = Column(DateTime(timezone=True), onupdate=func.now())
 
-class CharacterObservation(Base):
+class CharacterObservation(BulkCreateMixin, Base):
     """
     Stores pending observations extracted from dialogue analysis.
     Needs user approval to be merged into Character.dynamic_profile.
     """
     __tablename__ = "character_observations"
+    __table_args__ = (
+        Index("ix_obs_char_status", "character_id", "status"),
+        gin_index("character_observations", "content"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     character_id = Column(Integer, ForeignKey("characters.id"))
     session_id = Column(String, index=True)
     
-    content = Column(JSON) # The observation content (e.g., {"trait": "Impatient", "evidence": "..."})
+    content = Column(JSONType) # The observation content (e.g., {"trait": "Impatient", "evidence": "..."})
     confidence = Column(Float, default=0.0)
     
     status = Column(String, default="pending") # pending, approved, rejected, merged
@@ -188,7 +335,7 @@ class CharacterFeedback(Base):
     session_id = Column(String, index=True)
     log_id = Column(Integer, nullable=True)
     
-    is_accurate = Column(Integer) # 1=Yes, 0=No
+    is_accurate = Column(Boolean)
     reason_category = Column(String, nullable=True) # e.g., "Wrong Emotion", "Missed Intent"
     comment = Column(Text, nullable=True)
     context_data = Column(JSON, nullable=True) # Snapshot of context & analysis
@@ -216,6 +363,9 @@ class FeedbackLog(Base):
     Used for RLHF/SFT data collection.
     """
     __tablename__ = "feedback_logs"
+    __table_args__ = (
+        brin_index("feedback_logs"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, index=True)
@@ -225,7 +375,7 @@ class FeedbackLog(Base):
     model_output = Column(Text) # The report generated
     
     # Feedback
-    rating = Column(Integer) # 1=ThumbDown, 5=ThumbUp (or 1-5 scale)
+    rating = Column(SmallInteger, CheckConstraint("rating BETWEEN 1 AND 5", name="ck_feedback_logs_rating")) # 1=ThumbDown, 5=ThumbUp (or 1-5 scale)
     comment = Column(Text, nullable=True) # User's specific complaint
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -246,11 +396,16 @@ class EvolutionCase(Base):
     diagnosis = Column(Text) # LLM's explanation of what went wrong
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-class CharacterEvent(Base):
+class CharacterEvent(BulkCreateMixin, Base):
     """
     Auto-generated events from analysis for timeline.
     """
     __tablename__ = "character_events"
+    __table_args__ = (
+        # Matches the Character.events order_by (per-character timeline)
+        Index("ix_evt_char_date", "character_id", "event_date"),
+        brin_index("character_events"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     character_id = Column(Integer, ForeignKey("characters.id"))
@@ -264,3 +419,21 @@ class CharacterEvent(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     character = relationship("Character", back_populates="events")
+
+# Read-only Core table for the mv_character_stats materialized view (PostgreSQL, see scripts/migrate_v10.py).
+# Deliberately not an ORM class: character_id / scenario_id are nullable GROUP BY keys, so they cannot be
+# an identity (logs without a scenario would come back as identity None and be dropped or merged).
+# Kept on its own MetaData so create_all() never emits it as a plain table.
+character_stats_view = Table(
+    "mv_character_stats", MetaData(),
+    Column("character_id", Integer),
+    Column("scenario_id", Integer),
+    Column("n", Integer),
+    Column("avg_rating", Float),
+    Column("avg_latency", Float),
+    Column("tokens", Integer),
+    Column("refreshed_at", DateTime(timezone=True)),
+)
+
+# Configure all mappers once, eagerly at import, instead of lazily on the first query
+Base.registry.configure()
@@ -1,30 +1,55 @@
 import os
+import bisect
 import shutil
 import logging
-import uuid
+import tempfile
 import json
+import hashlib
+import contextlib
+import queue
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import scipy.io.wavfile as wavfile
+import soundfile as sf
 import scipy.signal
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from app.core.config import settings
-from app.services.audio_service import audio_service
+from app.services.audio_service import audio_service, _mfcc_stats
 from app.services.voice_profile import VoiceProfileService
 
 logger = logging.getLogger(__name__)
 
-# Lazy import for noisereduce
+# Optional torch for GPU preprocessing (independent of pyannote/torchaudio)
 try:
-    import noisereduce as nr
-    HAS_NR = True
+    import torch
+    HAS_TORCH = True
 except ImportError:
-    HAS_NR = False
-    logger.warning("noisereduce not installed. Denoising will be skipped.")
+    HAS_TORCH = False
 
-# Lazy import for pyannote.audio
+# Optional numba for fused, multi-threaded peak normalization (pulled in by librosa)
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_MAX_CLIP_S = 30.0 # Whisper encoder window; longer turns are split into several clips
+TRANSCRIBE_MINI_BATCH = 16 # diarization turns handed to Whisper per call
+CLEAN_SNR_DB = 25.0 # above this estimated SNR, denoising is skipped
+MERGE_MAX_GAP_S = 0.5 # consecutive same-speaker turns closer than this are merged
+FINGERPRINT_HOP = 512 # MFCC hop for per-speaker fingerprints (same as AudioService.transcribe_with_diarization)
+PROCESSED_CACHE_SIZE = 16 # processed_<hash>_<path>.wav files kept in temp_dir (LRU by mtime)
+# Spectral gate, shared by the CPU (_spectral_gate) and GPU (_preprocess_torch) paths
+GATE_NPERSEG, GATE_HOP = 1024, 256
+GATE_NOISE_WINDOW_S = 0.5 # noise profile = leading half second
+GATE_NOISE_PERCENTILE = 25
+GATE_N_STD = 1.5
+
+# Lazy import for pyannote.audio (torch itself is guarded above)
 try:
-    import torch
     import torchaudio
     from pyannote.audio import Pipeline
     HAS_PYANNOTE = True
@@ -45,6 +70,56 @@ except ImportError:
     HAS_PYANNOTE = False
     logger.warning("pyannote.audio not installed. Diarization will fallback to simple VAD+Clustering.")
 
+@lru_cache(maxsize=8)
+def _bandpass_sos(rate: int, low_hz: int = 80, high_hz: int = 7000, order: int = 4) -> np.ndarray:
+    """Butterworth bandpass in SOS form; inputs share a handful of sample rates, so design once per rate."""
+    nyquist = 0.5 * rate
+    return scipy.signal.butter(order, [low_hz / nyquist, min(high_hz, nyquist - 1) / nyquist], btype='band', output='sos')
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _peak_normalize_kernel(flat, target):
+        peak = 0.0
+        for i in prange(flat.size):
+            peak = max(peak, abs(flat[i]))
+        if peak > 0:
+            scale = target / peak
+            for i in prange(flat.size):
+                flat[i] *= scale
+
+def _peak_normalize(data: np.ndarray, target: float = 0.95) -> np.ndarray:
+    """In-place peak normalization without the |x| temporary array."""
+    data = np.ascontiguousarray(data)
+    if HAS_NUMBA:
+        _peak_normalize_kernel(data.reshape(-1), target)
+    else:
+        peak = max(float(data.max()), -float(data.min())) if data.size else 0.0
+        if peak > 0:
+            data *= target / peak
+    return data
+
+def _spectral_gate(data: np.ndarray, rate: int) -> np.ndarray:
+    """
+    Stationary noise reduction in one STFT/ISTFT pass.
+    Noise magnitude per bin = GATE_NOISE_PERCENTILE over the leading GATE_NOISE_WINDOW_S; bins are
+    attenuated with a soft subtraction mask max(|X| - GATE_N_STD*noise, 0) / |X|.
+    """
+    noverlap = GATE_NPERSEG - GATE_HOP
+    x = data.T # (C, N) or (N,), time on the last axis
+    _, _, spec = scipy.signal.stft(x, rate, nperseg=GATE_NPERSEG, noverlap=noverlap)
+    mag = np.abs(spec)
+    noise = np.percentile(mag[..., :_gate_noise_frames(rate)], GATE_NOISE_PERCENTILE, axis=-1, keepdims=True)
+    spec *= np.maximum(mag - GATE_N_STD * noise, 0) / (mag + 1e-9)
+    _, out = scipy.signal.istft(spec, rate, nperseg=GATE_NPERSEG, noverlap=noverlap)
+    return out[..., :x.shape[-1]].T.astype(np.float32, copy=False)
+
+def _gate_noise_frames(rate: int) -> int:
+    return max(1, int(GATE_NOISE_WINDOW_S * rate / GATE_HOP))
+
+def _needs_bandpass(is_clean: bool, rate: int, ndim: int) -> bool:
+    # Clean 16 kHz mono is already speech-band (Nyquist 8 kHz); the filter would barely change it
+    return not (is_clean and rate <= 16000 and ndim == 1)
+
 class AdvancedAudioService:
     """
     Advanced Audio Service implementing the Multi-task Audio Recognition Optimization Scheme.
@@ -53,92 +128,280 @@ class AdvancedAudioService:
     3. Transcription & Alignment
     """
 
-    def __init__(self):
+    def __init__(self, warmup: bool = True):
         self.audio_service = audio_service
         self.voice_profile_service = VoiceProfileService()
         self.temp_dir = settings.DATA_DIR / "temp_advanced_processing"
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         
         self._pyannote_pipeline = None
+        self._pipeline_lock = threading.Lock() # warmup thread and requests may race to load
+
+        # Load + warm Pyannote off the request path
+        self._warmup_thread = None
+        if warmup and HAS_PYANNOTE:
+            self._warmup_thread = threading.Thread(target=self._warmup, name="pyannote-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def _warmup(self):
+        """Load the pipeline and run it once on 1 s of silence (cuDNN autotune, CUDA context, lazy inits)."""
+        try:
+            if torch.cuda.is_available():
+                # Cache the fastest conv kernels for the fixed-size segmentation windows
+                torch.backends.cudnn.benchmark = True
+            pipeline = self._load_pyannote_pipeline()
+            if pipeline is None:
+                return
+            device = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+            with torch.inference_mode():
+                pipeline({"waveform": torch.zeros(1, 16000, device=device), "sample_rate": 16000})
+            logger.info("Pyannote pipeline warmed up.")
+        except Exception as e:
+            logger.warning(f"Pyannote warmup failed: {e}")
 
     def _load_pyannote_pipeline(self):
         if not HAS_PYANNOTE:
             return None
         
         if self._pyannote_pipeline is None:
-            try:
-                logger.info("Loading Pyannote Diarization Pipeline...")
+            with self._pipeline_lock:
+                if self._pyannote_pipeline is None:
+                    try:
+                        logger.info("Loading Pyannote Diarization Pipeline...")
                 
-                # Check for local offline model
-                local_config = settings.PYANNOTE_CONFIG_PATH
+                        # Check for local offline model
+                        local_config = settings.PYANNOTE_CONFIG_PATH
                 
-                if local_config.exists():
-                    logger.info(f"Loading local model from: {local_config}")
-                    self._pyannote_pipeline = Pipeline.from_pretrained(str(local_config))
-                else:
-                    logger.info("Local model config not found. Attempting to download/load from HuggingFace...")
-                    # Use HF Token if available, or try local/cache
-                    use_auth_token = os.environ.get("HF_TOKEN") or True 
-                    self._pyannote_pipeline = Pipeline.from_pretrained(
-                        "pyannote/speaker-diarization-3.1",
-                        use_auth_token=use_auth_token
-                    )
+                        if local_config.exists():
+                            logger.info(f"Loading local model from: {local_config}")
+                            pipeline = Pipeline.from_pretrained(str(local_config))
+                        else:
+                            logger.info("Local model config not found. Attempting to download/load from HuggingFace...")
+                            # Use HF Token if available, or try local/cache
+                            use_auth_token = os.environ.get("HF_TOKEN") or True 
+                            pipeline = Pipeline.from_pretrained(
+                                "pyannote/speaker-diarization-3.1",
+                                use_auth_token=use_auth_token
+                            )
                 
-                if self._pyannote_pipeline and torch.cuda.is_available():
-                    self._pyannote_pipeline.to(torch.device("cuda"))
+                        if pipeline and torch.cuda.is_available():
+                            pipeline.to(torch.device("cuda"))
+                            # Let Ampere+/Turing tensor cores run the FP32 matmuls/convs
+                            torch.backends.cuda.matmul.allow_tf32 = True
+                            torch.backends.cudnn.allow_tf32 = True
+                            self._tune_pyannote_batch_sizes(pipeline)
+
+                        # After the device move: freezing folds weights into the graph as constants
+                        if pipeline and settings.AUDIO_PYANNOTE_JIT == "script":
+                            self._script_segmentation(pipeline)
+                        elif pipeline and settings.AUDIO_PYANNOTE_JIT == "compile":
+                            self._compile_submodels(pipeline)
                 
-                logger.info("Pyannote Pipeline loaded successfully.")
-            except Exception as e:
-                logger.error(f"Failed to load Pyannote Pipeline: {e}")
-                self._pyannote_pipeline = None
+                        # Publish only once fully configured (other threads read it without the lock)
+                        self._pyannote_pipeline = pipeline
+                        logger.info("Pyannote Pipeline loaded successfully.")
+                    except Exception as e:
+                        logger.error(f"Failed to load Pyannote Pipeline: {e}")
+                        self._pyannote_pipeline = None
         
         return self._pyannote_pipeline
 
+    @staticmethod
+    def _estimate_snr_db(data: np.ndarray, frame: int = 1024) -> float:
+        """Rough SNR: loud (95th pct) vs quiet (5th pct) frame RMS."""
+        mono = data.mean(axis=1) if data.ndim > 1 else data
+        n = len(mono) // frame * frame
+        if n == 0:
+            return 0.0
+        rms = np.sqrt(np.square(mono[:n].reshape(-1, frame)).mean(axis=1))
+        loud, quiet = np.percentile(rms, [95, 5])
+        return float(20 * np.log10(max(loud, 1e-9) / max(quiet, 1e-6)))
+
+    def _preprocess_torch(self, data: np.ndarray, rate: int, device: str = "cuda",
+                          denoise: bool = True, bandpass: bool = True) -> np.ndarray:
+        """
+        GPU version of the CPU path (_spectral_gate + bandpass + normalize) on a single STFT.
+        - Spectral gate: same STFT, noise estimate and soft subtraction mask as _spectral_gate
+        - Bandpass: the 4th-order Butterworth magnitude response (80-7000Hz) applied to the same bins
+        Returns float32 array in the input layout.
+        """
+        wav = torch.from_numpy(np.ascontiguousarray(data.T)).to(device) # (C, N) or (N,)
+        length = wav.shape[-1]
+        window = torch.hann_window(GATE_NPERSEG, device=device)
+        # Zero-padded centering plus a zero tail up to a whole hop, like scipy.signal.stft (boundary="zeros", padded=True)
+        wav = torch.nn.functional.pad(wav, (0, -length % GATE_HOP))
+        spec = torch.stft(wav, GATE_NPERSEG, hop_length=GATE_HOP, window=window, pad_mode="constant", return_complex=True)
+
+        # 1. Denoise (stationary spectral gating, soft mask to avoid musical noise)
+        if denoise:
+            mag = spec.abs()
+            noise = torch.quantile(
+                mag[..., :_gate_noise_frames(rate)], GATE_NOISE_PERCENTILE / 100, dim=-1, keepdim=True
+            )
+            spec = spec * ((mag - GATE_N_STD * noise).clamp_min(0) / (mag + 1e-9))
+
+        # 2. Bandpass (80-7000Hz)
+        if bandpass:
+            _, h = scipy.signal.sosfreqz(_bandpass_sos(rate), worN=GATE_NPERSEG // 2 + 1)
+            spec = spec * torch.from_numpy(np.abs(h).astype(np.float32)).to(device).unsqueeze(-1)
+
+        wav = torch.istft(spec, GATE_NPERSEG, hop_length=GATE_HOP, window=window, length=wav.shape[-1])[..., :length]
+
+        # 3. Normalize
+        wav = wav / wav.abs().amax().clamp_min(1e-9) * 0.95
+        return wav.cpu().numpy().T
+
+    @staticmethod
+    def _script_segmentation(pipeline) -> bool:
+        """
+        TorchScript + optimize_for_inference the segmentation model.
+        Only forward() is swapped, so pyannote still sees its Model (specifications, device, ...);
+        the scripted graph must match eager on the example input or the model stays eager.
+        """
+        model = getattr(getattr(pipeline, "_segmentation", None), "model", None)
+        if model is None:
+            return False
+        try:
+            model.eval()
+            example = model.example_input_array.to(next(model.parameters()).device)
+            with torch.inference_mode():
+                expected = model(example)
+                scripted = torch.jit.optimize_for_inference(torch.jit.script(model))
+                if not torch.allclose(scripted(example), expected, atol=1e-4):
+                    raise ValueError("scripted output differs from eager")
+            model.forward = scripted.forward
+            logger.info("Pyannote segmentation model scripted (TorchScript).")
+            return True
+        except Exception as e:
+            logger.warning(f"TorchScript for segmentation model unavailable, keeping eager: {e}")
+            return False
+
+    @staticmethod
+    def _compile_forward(module, name: str):
+        """torch.compile module.forward in place; the first failing call reverts it to eager."""
+        eager = module.forward
+        compiled = torch.compile(eager, mode="reduce-overhead")
+
+        def forward(*args, **kwargs):
+            try:
+                return compiled(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"torch.compile failed for {name}, reverting to eager: {e}")
+                module.forward = eager
+                return eager(*args, **kwargs)
+
+        module.forward = forward
+
+    def _compile_submodels(self, pipeline) -> bool:
+        """torch.compile the segmentation and embedding subnets (PyTorch 2.x)."""
+        if not hasattr(torch, "compile"):
+            logger.warning("torch.compile requires PyTorch 2.x, keeping eager Pyannote models.")
+            return False
+        embedding = getattr(pipeline, "_embedding", None)
+        targets = {
+            "segmentation": getattr(getattr(pipeline, "_segmentation", None), "model", None),
+            # PretrainedSpeakerEmbedding wrappers keep the torch module in model_
+            "embedding": getattr(embedding, "model_", None) or getattr(embedding, "model", None),
+        }
+        compiled = False
+        for name, module in targets.items():
+            if isinstance(module, torch.nn.Module):
+                module.eval()
+                self._compile_forward(module, name)
+                compiled = True
+        if compiled:
+            logger.info("Pyannote submodels wrapped with torch.compile.")
+        return compiled
+
+    @staticmethod
+    def _tune_pyannote_batch_sizes(pipeline):
+        """
+        Size the segmentation/embedding batches to the card: large batches keep big GPUs busy,
+        small ones keep long recordings from OOMing on 8-12 GB cards (T4 etc).
+        """
+        total_memory = torch.cuda.get_device_properties(0).total_memory
+        batch_size = 32 if total_memory > 12e9 else 4
+        for attr in ("embedding_batch_size", "segmentation_batch_size"):
+            if hasattr(pipeline, attr):
+                setattr(pipeline, attr, batch_size)
+        logger.info(f"Pyannote batch size set to {batch_size} ({total_memory / 1e9:.1f} GB VRAM)")
+
+    @staticmethod
+    def _content_key(path: str, block: int = 4 * 1024 * 1024) -> str:
+        """Cheap content fingerprint: blake2b over size + first/last 4 MB."""
+        size = os.path.getsize(path)
+        h = hashlib.blake2b(str(size).encode(), digest_size=8)
+        with open(path, "rb") as f:
+            h.update(f.read(block))
+            if size > block:
+                f.seek(max(size - block, block))
+                h.update(f.read())
+        return h.hexdigest()
+
+    def _prune_processed(self, keep: int = PROCESSED_CACHE_SIZE):
+        """Bound the processed-audio cache: drop the least recently used files beyond `keep`."""
+        files = sorted(self.temp_dir.glob("processed_*.wav"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in files[keep:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
     def preprocess_audio(self, input_path: str) -> str:
         """
         Step 1: Audio Preprocessing
-        - Denoise (noisereduce)
+        - Denoise (spectral gate)
         - Normalize
         Returns path to processed wav file.
         """
         logger.info(f"Preprocessing audio: {input_path}")
         try:
-            # Load audio
-            rate, data = wavfile.read(input_path)
-            
-            # Convert to float32
-            if data.dtype != np.float32:
-                data = data.astype(np.float32) / 32768.0 if data.dtype == np.int16 else data.astype(np.float32)
-
-            # 1. Denoise
-            if HAS_NR:
-                # Assume noise is stationary? Or use non-stationary?
-                # Stationary is faster and safer for general background noise.
-                logger.info("Applying Noisereduce...")
-                data = nr.reduce_noise(y=data, sr=rate, stationary=True)
-            
-            # 2. Bandpass Filter (80-7000Hz)
-            nyquist = 0.5 * rate
-            low = 80 / nyquist
-            high = min(7000, rate/2 - 1) / nyquist
-            b, a = scipy.signal.butter(4, [low, high], btype='band')
-            if len(data.shape) > 1: # Stereo
-                 data = np.array([scipy.signal.lfilter(b, a, ch) for ch in data.T]).T
-            else:
-                 data = scipy.signal.lfilter(b, a, data)
+            # Same content + same path (GPU STFT vs. scipy CPU) -> same processed file; skip denoise/filter/write on re-runs
+            use_gpu = HAS_TORCH and torch.cuda.is_available()
+            output_path = self.temp_dir / f"processed_{self._content_key(input_path)}_{'cuda' if use_gpu else 'cpu'}.wav"
+            if output_path.exists():
+                logger.info(f"Reusing preprocessed audio: {output_path}")
+                os.utime(output_path) # mark as recently used
+                return str(output_path)
+
+            # Load audio (decoded straight to float32, no int16 round-trip)
+            data, rate = sf.read(input_path, dtype='float32', always_2d=False)
 
-            # 3. Normalize
-            max_val = np.max(np.abs(data))
-            if max_val > 0:
-                data = data / max_val * 0.95
+            # Clean recordings (high SNR) skip denoising entirely
+            snr_db = self._estimate_snr_db(data)
+            is_clean = snr_db > CLEAN_SNR_DB
+            logger.info(f"Estimated SNR {snr_db:.1f} dB -> {'clean, skipping denoise' if is_clean else 'denoising'}")
+
+            bandpass = _needs_bandpass(is_clean, rate, data.ndim)
+            if use_gpu:
+                logger.info("Preprocessing on GPU...")
+                data = self._preprocess_torch(data, rate, denoise=not is_clean, bandpass=bandpass)
+            else:
+                # 1. Denoise
+                if not is_clean:
+                    # Stationary gate: faster and safer for general background noise.
+                    logger.info("Applying spectral gate...")
+                    data = _spectral_gate(data, rate)
             
-            # Save processed file
-            processed_filename = f"processed_{uuid.uuid4()}.wav"
-            output_path = self.temp_dir / processed_filename
+                # 2. Bandpass Filter (80-7000Hz)
+                if bandpass:
+                    # Second-order sections: numerically stable, and filters all channels in one C call
+                    data = scipy.signal.sosfilt(_bandpass_sos(rate), data, axis=0)
+
+                # 3. Normalize
+                data = _peak_normalize(data)
             
-            # Convert back to int16
-            data_int16 = (data * 32767).astype(np.int16)
-            wavfile.write(output_path, rate, data_int16)
+            # Save processed file (write aside + rename so a half-written file is never picked up by the cache)
+            with tempfile.NamedTemporaryFile(dir=self.temp_dir, prefix="partial_", suffix=".wav", delete=False) as tf:
+                partial_path = tf.name
+            try:
+                # Keep float32 end-to-end; every downstream reader (librosa / soundfile / pyannote) handles FLOAT wav
+                sf.write(partial_path, data.astype(np.float32, copy=False), rate, subtype='FLOAT')
+                os.replace(partial_path, output_path)
+            except Exception:
+                os.unlink(partial_path)
+                raise
+            self._prune_processed()
             
             logger.info(f"Preprocessing complete: {output_path}")
             return str(output_path)
@@ -147,35 +410,192 @@ class AdvancedAudioService:
             logger.error(f"Preprocessing failed: {e}")
             return input_path # Fallback to original
 
+    def _get_batched_whisper(self):
+        """The shared AudioService BatchedInferencePipeline (same Whisper weights, tracks CPU-fallback reloads)."""
+        return self.audio_service._load_batched_pipeline()
+
+    @staticmethod
+    def _to_whisper_audio(data: np.ndarray, rate: int) -> np.ndarray:
+        """float32 mono @16 kHz, the layout faster-whisper expects for in-memory arrays."""
+        if data.dtype == np.int16:
+            data = data.astype(np.float32) / 32768.0
+        else:
+            data = data.astype(np.float32, copy=False)
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        if rate != WHISPER_SAMPLE_RATE:
+            data = scipy.signal.resample_poly(data, WHISPER_SAMPLE_RATE, rate).astype(np.float32, copy=False)
+        # C-contiguous so per-turn slices are zero-copy views
+        return np.ascontiguousarray(data)
+
+    @staticmethod
+    def _transcribe_chunk(model, chunk: np.ndarray) -> str:
+        try:
+            # Use faster-whisper (accepts ndarray directly); decoding happens while the generator is consumed
+            segments_gen, _ = model.transcribe(
+                chunk, 
+                beam_size=5, 
+                language="zh",
+                initial_prompt="以下是简体中文的对话。"
+            )
+            return "".join([s.text for s in segments_gen]).strip()
+        except Exception as e:
+            logger.error(f"Transcription failed for chunk: {e}")
+            return ""
+
+    def _transcribe_turns_batched(self, batched, audio: np.ndarray, turns: List[Dict]) -> List[str]:
+        """
+        Transcribe all diarization turns in batched GPU calls straight from the in-memory array.
+        Each turn becomes one or more <=30s clips; decoded segments are mapped back to their turn by start time.
+        """
+        clips, clip_turn = [], []
+        for idx, turn in enumerate(turns):
+            start = turn["start"]
+            while start < turn["end"]:
+                end = min(turn["end"], start + WHISPER_MAX_CLIP_S)
+                clips.append({"start": start, "end": end})
+                clip_turn.append(idx)
+                start = end
+
+        if not clips:
+            return ["" for _ in turns]
+
+        texts = [[] for _ in turns]
+        clip_starts = [c["start"] for c in clips]
+        segments_gen, _ = batched.transcribe(
+            audio,
+            clip_timestamps=clips,
+            batch_size=16,
+            beam_size=5,
+            language="zh",
+            initial_prompt="以下是简体中文的对话。"
+        )
+        for s in segments_gen:
+            clip_idx = max(0, bisect.bisect_right(clip_starts, s.start + 1e-3) - 1)
+            texts[clip_turn[clip_idx]].append(s.text)
+        return ["".join(t).strip() for t in texts]
+
+    @staticmethod
+    def _load_waveform(audio_path: str) -> Dict[str, Any]:
+        """
+        Decode once and hand Pyannote an in-memory {"waveform", "sample_rate"} dict already on the
+        pipeline device, so it skips its own CPU load/resample and host->device copy.
+        """
+        data, sr = sf.read(audio_path, dtype='float32', always_2d=True) # (time, channel)
+        device = torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
+        wav = torch.from_numpy(np.ascontiguousarray(data.T)).to(device) # (channel, time)
+        if sr != 16000:
+            wav = torchaudio.functional.resample(wav, sr, 16000)
+        return {"waveform": wav, "sample_rate": 16000}
+
+    @staticmethod
+    def _merge_turns(turns, max_gap: float = MERGE_MAX_GAP_S, max_len: float = WHISPER_MAX_CLIP_S) -> Iterator[Dict]:
+        """
+        Coalesce consecutive turns of the same speaker separated by < max_gap seconds,
+        never growing a turn past max_len (one Whisper window). Streams: holds at most one turn.
+        """
+        current = None
+        for turn in turns:
+            if (current is not None
+                    and turn["speaker"] == current["speaker"]
+                    and turn["start"] - current["end"] < max_gap
+                    and turn["end"] - current["start"] <= max_len):
+                current["end"] = max(current["end"], turn["end"])
+                continue
+            if current is not None:
+                yield current
+            current = dict(turn)
+        if current is not None:
+            yield current
+
+    def iter_diarize(self, audio_path: str, num_speakers: int = None) -> Iterator[Dict]:
+        """
+        Step 2: Speaker Diarization, yielding turns one by one:
+        {"start": 0.0, "end": 1.0, "speaker": "SPEAKER_00"}
+        Turns whose speaker matches a voice profile also carry "speaker_id" / "speaker_name".
+        Yields nothing if Pyannote is unavailable or fails.
+        """
+        pipeline = self._load_pyannote_pipeline()
+        if not pipeline:
+            return
+
+        try:
+            logger.info("Running Pyannote Diarization...")
+            # Apply pipeline (fp16 autocast on GPU; weights stay fp32 so clustering precision is unaffected)
+            amp = torch.autocast('cuda', dtype=torch.float16) if torch.cuda.is_available() else contextlib.nullcontext()
+            waveform = self._load_waveform(audio_path)
+            with torch.inference_mode(), amp:
+                diarization = pipeline(waveform, num_speakers=num_speakers)
+        except Exception as e:
+            logger.error(f"Pyannote diarization failed: {e}. Falling back to simple VAD.")
+            return
+
+        speaker_map = self._match_speakers(waveform, diarization)
+
+        # Short same-speaker turns merged -> fewer, fuller Whisper windows
+        for seg in self._merge_turns(
+            {"start": turn.start, "end": turn.end, "speaker": speaker}
+            for turn, _, speaker in diarization.itertracks(yield_label=True)
+        ):
+            if seg["speaker"] in speaker_map:
+                seg["speaker_id"], seg["speaker_name"] = speaker_map[seg["speaker"]]
+            yield seg
+
+    @staticmethod
+    def _speaker_fingerprints(waveform: Dict[str, Any], diarization) -> Tuple[List[str], np.ndarray]:
+        """
+        Per-speaker voice fingerprints in the voice-profile space (39-dim MFCC stats, see _mfcc_stats),
+        not Pyannote's own speaker embeddings, which live in a different space than the stored profiles.
+        One clip-wide MFCC; each speaker's fingerprint is the frame-weighted mean over its turns.
+        Speakers without a long enough turn get a NaN row (never matched).
+        """
+        import librosa
+
+        wav = waveform["waveform"]
+        if hasattr(wav, "cpu"):
+            wav = wav.float().cpu().numpy()
+        y = np.asarray(wav, dtype=np.float32).mean(axis=0) # (channel, time) -> mono
+        sr = waveform["sample_rate"]
+        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13, hop_length=FINGERPRINT_HOP) # (13, T)
+        min_frames = 2048 // FINGERPRINT_HOP # same minimum length as AudioService.get_voice_fingerprint
+
+        sums: Dict[str, np.ndarray] = {}
+        frames: Dict[str, int] = {}
+        for turn, _, speaker in diarization.itertracks(yield_label=True):
+            f0 = int(turn.start * sr / FINGERPRINT_HOP)
+            f1 = min(int(turn.end * sr / FINGERPRINT_HOP), mfcc.shape[1])
+            n = f1 - f0
+            if n < min_frames:
+                continue
+            sums[speaker] = sums.get(speaker, 0.0) + n * _mfcc_stats(mfcc, f0, f1)
+            frames[speaker] = frames.get(speaker, 0) + n
+
+        labels = list(diarization.labels())
+        fingerprints = np.full((len(labels), 3 * mfcc.shape[0]), np.nan, dtype=np.float32)
+        for i, label in enumerate(labels):
+            if label in frames:
+                fingerprints[i] = sums[label] / frames[label]
+        return labels, fingerprints
+
+    def _match_speakers(self, waveform: Dict[str, Any], diarization) -> Dict[str, Tuple[str, str]]:
+        """Map this file's SPEAKER_XX labels to known voice profiles (one GEMM for all speakers)."""
+        try:
+            labels, fingerprints = self._speaker_fingerprints(waveform, diarization)
+            if not labels:
+                return {}
+            matches = self.voice_profile_service.match_embeddings(fingerprints)
+        except Exception as e:
+            logger.warning(f"Voice profile matching failed: {e}")
+            return {}
+        return {label: match[:2] for label, match in zip(labels, matches) if match}
+
     def diarize_audio(self, audio_path: str, num_speakers: int = None) -> List[Dict]:
         """
         Step 2: Speaker Diarization
         Returns list of segments: [{"start": 0.0, "end": 1.0, "speaker": "SPEAKER_00"}]
         """
-        pipeline = self._load_pyannote_pipeline()
-        
-        if pipeline:
-            try:
-                logger.info("Running Pyannote Diarization...")
-                # Apply pipeline
-                diarization = pipeline(audio_path, num_speakers=num_speakers)
-                
-                segments = []
-                for turn, _, speaker in diarization.itertracks(yield_label=True):
-                    segments.append({
-                        "start": turn.start,
-                        "end": turn.end,
-                        "speaker": speaker
-                    })
-                return segments
-            except Exception as e:
-                logger.error(f"Pyannote diarization failed: {e}. Falling back to simple VAD.")
-        
-        # Fallback: Use AudioService's simple VAD + Diarization (reusing existing logic but simulating segments)
-        # Actually, AudioService.transcribe_with_diarization does everything (STT+Diarization).
-        # But here we want Diarization ONLY first?
-        # No, simpler to just use the existing method if Pyannote is missing.
-        return []
+        # Empty list -> caller falls back to AudioService.transcribe_with_diarization (STT + simple diarization)
+        return list(self.iter_diarize(audio_path, num_speakers))
 
     def process_full_pipeline(self, input_path: str, character_names: List[str] = None) -> Dict:
         """
@@ -185,90 +605,103 @@ class AdvancedAudioService:
         3. Transcribe & Align
         """
         import time
-        import librosa
         
         start_time = time.time()
         
         # 1. Preprocess
         clean_audio_path = self.preprocess_audio(input_path)
         
-        # Get duration
+        # Get duration (header read only, no decode)
         try:
-            duration = librosa.get_duration(path=clean_audio_path)
+            info = sf.info(clean_audio_path)
+            duration = info.frames / info.samplerate
         except:
             duration = 0.0
             
-        # 2. Diarize
-        segments = self.diarize_audio(clean_audio_path)
+        # 2. Diarize on a producer thread; turns are streamed through a bounded queue
+        turn_queue = queue.Queue(maxsize=32)
+
+        def _produce():
+            try:
+                for seg in self.iter_diarize(clean_audio_path):
+                    turn_queue.put(seg)
+            finally:
+                turn_queue.put(None)
+
+        producer = threading.Thread(target=_produce, name="diarize", daemon=True)
+        producer.start()
         
         # 3. Transcribe & Align
-        # If we have segments from Pyannote, we transcribe each segment
+        # If we have segments from Pyannote, we transcribe them in mini-batches as they arrive
         final_segments = []
-        full_text_parts = []
-        detected_speakers = set()
-        
-        if segments:
-            logger.info(f"Pyannote found {len(segments)} segments. Transcribing...")
-            # Load Whisper model once
+        # Labels/texts are buffered and formatted once after the loop
+        label_buf: List[str] = []
+        text_buf: List[str] = []
+        detected_speakers: Dict[str, str] = {} # id -> name
+        n_segments = 0
+
+        try:
+            # Overlaps with diarization: load Whisper model once and decode audio
             model = self.audio_service._load_stt_model()
-            
-            rate, data = wavfile.read(clean_audio_path)
-            
-            for seg in segments:
-                start_sample = int(seg["start"] * rate)
-                end_sample = int(seg["end"] * rate)
-                
-                if end_sample - start_sample < rate * 0.5: # Skip < 0.5s
-                    continue
-                    
-                chunk_data = data[start_sample:end_sample]
-                
-                # Save temp chunk
-                chunk_path = self.temp_dir / f"chunk_{uuid.uuid4()}.wav"
-                wavfile.write(chunk_path, rate, chunk_data)
-                
-                # Transcribe
-                text = ""
-                try:
-                    # Use faster-whisper
-                    segments_gen, _ = model.transcribe(
-                        str(chunk_path), 
-                        beam_size=5, 
-                        language="zh",
-                        initial_prompt="以下是简体中文的对话。"
-                    )
-                    text = "".join([s.text for s in segments_gen]).strip()
-                except Exception as e:
-                    logger.error(f"Transcription failed for chunk: {e}")
-                
-                # Cleanup chunk
+            batched = self._get_batched_whisper()
+            data, rate = sf.read(clean_audio_path, dtype='float32', always_2d=False)
+            # Decode once into the float32/16kHz layout Whisper wants; segments are sliced from memory
+            audio = self._to_whisper_audio(data, rate)
+
+            # CTranslate2 releases the GIL; run as many calls as the model has workers
+            max_workers = max(1, getattr(getattr(model, "model", None), "num_workers", 1))
+            with ThreadPoolExecutor(max_workers=max_workers) as ex:
+                def _transcribe(turns: List[Dict]) -> List[str]:
+                    nonlocal batched
+                    if batched is not None:
+                        try:
+                            return self._transcribe_turns_batched(batched, audio, turns)
+                        except Exception as e:
+                            logger.error(f"Batched transcription failed: {e}. Falling back to per-segment transcription.")
+                            batched = None
+                    ranges = [(int(seg["start"] * WHISPER_SAMPLE_RATE), int(seg["end"] * WHISPER_SAMPLE_RATE)) for seg in turns]
+                    # slices are views, no copy / temp file
+                    return list(ex.map(lambda r: self._transcribe_chunk(model, audio[r[0]:r[1]]), ranges))
+
+                pending = []
+                while True:
+                    seg = turn_queue.get()
+                    done = seg is None
+                    if not done:
+                        n_segments += 1
+                        if seg["end"] - seg["start"] >= 0.5: # Skip < 0.5s
+                            pending.append(seg)
+                    if pending and (done or len(pending) >= TRANSCRIBE_MINI_BATCH):
+                        for turn, text in zip(pending, _transcribe(pending)):
+                            if text:
+                                # Pyannote returns SPEAKER_00, SPEAKER_01 for the FILE;
+                                # turns matched to a known voice profile carry its id/name instead.
+                                speaker_id = turn.get("speaker_id", turn["speaker"])
+                                speaker_name = turn.get("speaker_name", turn["speaker"])
+                                
+                                final_segments.append({
+                                    "start": turn["start"],
+                                    "end": turn["end"],
+                                    "speaker_id": speaker_id,
+                                    "speaker_name": speaker_name,
+                                    "text": text
+                                })
+                                label_buf.append(speaker_name)
+                                text_buf.append(text)
+                                detected_speakers[speaker_id] = speaker_name
+                        pending = []
+                    if done:
+                        break
+        finally:
+            # Never leave the producer blocked on a full queue
+            while producer.is_alive():
                 try:
-                    os.remove(chunk_path)
-                except:
+                    turn_queue.get(timeout=0.1)
+                except queue.Empty:
                     pass
-                
-                if text:
-                    # Map Pyannote speaker to a persistent one?
-                    # Pyannote returns SPEAKER_00, SPEAKER_01 for the FILE.
-                    # We might want to match these to known profiles?
-                    # Ideally, extract embedding for this segment and match.
-                    # For now, just pass SPEAKER_XX as name.
-                    
-                    speaker_label = seg["speaker"]
-                    
-                    # TODO: Implement Matching against VoiceProfileService DB using embedding
-                    # But Pyannote pipeline doesn't easily expose embedding per segment unless we run the embedding model separately.
-                    # For now, just use the label.
-                    
-                    final_segments.append({
-                        "start": seg["start"],
-                        "end": seg["end"],
-                        "speaker_id": speaker_label,
-                        "speaker_name": speaker_label,
-                        "text": text
-                    })
-                    full_text_parts.append(f"【{speaker_label}】: {text}")
-                    detected_speakers.add((speaker_label, speaker_label))
+
+        if n_segments:
+            logger.info(f"Pyannote found {n_segments} segments.")
         else:
             # Fallback to existing AudioService logic (Whisper Native Diarization / Simple VAD)
             logger.warning("Using fallback simple diarization pipeline.")
@@ -281,9 +714,9 @@ class AdvancedAudioService:
         # os.remove(clean_audio_path) 
         
         return {
-            "text": "\n".join(full_text_parts),
+            "text": "\n".join(f"【{lbl}】: {t}" for lbl, t in zip(label_buf, text_buf)),
             "raw_segments": final_segments,
-            "detected_speakers": [{"id": s[0], "name": s[1]} for s in list(detected_speakers)],
+            "detected_speakers": [{"id": sid, "name": name} for sid, name in detected_speakers.items()],
             "language": "zh",
             "duration": duration
         }
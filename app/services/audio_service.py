@@ -1,7 +1,18 @@
 import os
+import re
+import json
+import asyncio
 import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import queue
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+from cachetools import LRUCache
 from app.utils.logger import logger
 from app.core.config import settings
 from app.services.voice_profile import VoiceProfileService
@@ -13,9 +24,15 @@ except ImportError:
     HAS_WHISPER = False
     logger.warning("faster-whisper not installed. STT will be disabled.")
 
+# Batched (multi-segment per GPU call) inference, faster-whisper >= 1.1
+try:
+    from faster_whisper import BatchedInferencePipeline
+    HAS_BATCHED_WHISPER = True
+except ImportError:
+    HAS_BATCHED_WHISPER = False
+
 try:
     import edge_tts
-    import asyncio
     HAS_TTS = True
 except ImportError:
     HAS_TTS = False
@@ -28,6 +45,176 @@ except ImportError:
     HAS_SER = False
     logger.warning("transformers not installed. SER will be disabled.")
 
+# ONNX Runtime backend for SER on CPU (int8 static graph instead of eager torch)
+try:
+    from optimum.onnxruntime import ORTModelForAudioClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    HAS_ORT = True
+except ImportError:
+    HAS_ORT = False
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+TTS_CACHE_SIZE = 256 # tts_cache/<hash>.mp3 files kept (LRU by mtime)
+STT_CACHE_SIZE = 512 # stt_cache/<hash>_<model>_<compute>.json results kept on disk (LRU by mtime)
+STT_MEMORY_CACHE_SIZE = 64
+
+# Below either bound a clip carries no emotion/prosody signal: skip SER and pitch/onset analysis
+SILENCE_MIN_DURATION = 0.5 # seconds
+SILENCE_MIN_RMS = 1e-3
+SER_SILENT_RESULT = {"neutral": 1.0}
+
+# Known Whisper hallucination phrases (subtitle credits / video outros) to filter from transcripts
+HALLUCINATION_PHRASES = ["请不吝点赞", "订阅", "转发", "打赏支持", "明镜与点点", "字幕", "Amara.org"]
+
+# Single O(len(text)) scan per segment however many phrases there are
+if HAS_AHOCORASICK:
+    _HALLU_AC = ahocorasick.Automaton()
+    for _phrase in HALLUCINATION_PHRASES:
+        _HALLU_AC.add_word(_phrase, _phrase)
+    _HALLU_AC.make_automaton()
+
+    def _is_hallucination(text: str) -> bool:
+        return next(_HALLU_AC.iter(text), None) is not None
+else:
+    _HALLU_RE = re.compile("|".join(map(re.escape, HALLUCINATION_PHRASES)))
+
+    def _is_hallucination(text: str) -> bool:
+        return _HALLU_RE.search(text) is not None
+
+@lru_cache(maxsize=4)
+def _get_whisper(model_path_or_size: str, device: str, compute_type: str, num_workers: int = 1, cpu_threads: int = 0):
+    """Process-wide Whisper cache: every AudioService (tests, workers, preload scripts) shares one load."""
+    return WhisperModel(
+        model_path_or_size, 
+        device=device, 
+        compute_type=compute_type,
+        num_workers=num_workers,
+        cpu_threads=cpu_threads
+    )
+
+def _stt_cpu_threads(num_workers: int) -> int:
+    """Configured thread count, else split the cores across workers (workers * threads <= cores)."""
+    return settings.AUDIO_STT_CPU_THREADS or max(1, (os.cpu_count() or 1) // num_workers)
+
+def _load_ser_ort(model_to_load: str, cpu_threads: int = 0):
+    """
+    wav2vec2 exported to ONNX and int8-quantized once into model/ser/<name>_ort_int8/,
+    then served by onnxruntime on CPU. Later loads only read the cached artifact.
+    """
+    from transformers import AutoFeatureExtractor
+    ort_dir = settings.MODEL_DIR / "ser" / f"{Path(model_to_load).name}_ort_int8"
+    quantized = "model_quantized.onnx"
+    if not (ort_dir / quantized).exists():
+        logger.info(f"Exporting SER model to ONNX int8 (one-time): {ort_dir}")
+        exported = ORTModelForAudioClassification.from_pretrained(model_to_load, export=True)
+        quantizer = ORTQuantizer.from_pretrained(exported)
+        quantizer.quantize(save_dir=ort_dir, quantization_config=AutoQuantizationConfig.avx2(is_static=False))
+        exported.config.save_pretrained(ort_dir)
+        AutoFeatureExtractor.from_pretrained(model_to_load).save_pretrained(ort_dir)
+
+    session_options = None
+    if cpu_threads:
+        # Per-session intra-op pool: caps SER without touching any other runtime's threads
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = cpu_threads
+    model = ORTModelForAudioClassification.from_pretrained(
+        ort_dir, file_name=quantized, provider="CPUExecutionProvider", session_options=session_options
+    )
+    feature_extractor = AutoFeatureExtractor.from_pretrained(ort_dir)
+    return pipeline("audio-classification", model=model, feature_extractor=feature_extractor, batch_size=8)
+
+@lru_cache(maxsize=2)
+def _get_ser_pipeline(model_to_load: str, device: int, quantize: bool = False, cpu_threads: int = 0):
+    """
+    Process-wide SER pipeline cache, keyed like _get_whisper.
+    cpu_threads (CPU only, 0 = runtime default) is applied once here, never per inference call.
+    """
+    if quantize and device == -1 and HAS_ORT:
+        try:
+            return _load_ser_ort(model_to_load, cpu_threads)
+        except Exception as e:
+            logger.warning(f"SER ONNX Runtime backend unavailable, using torch: {e}")
+
+    # batch_size: list inputs (per-segment SER) go through wav2vec2 8 at a time
+    pipe = pipeline("audio-classification", model=model_to_load, device=device, batch_size=8)
+    if quantize and device == -1:
+        # CPU only: int8 dynamic quantization of the transformer's Linear layers (~4x smaller, faster GEMMs)
+        try:
+            import torch
+            pipe.model = torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+        except Exception as e:
+            logger.warning(f"SER int8 quantization failed, keeping fp32 model: {e}")
+    if cpu_threads and device == -1:
+        # torch's intra-op pool is process-wide: this also bounds other CPU torch work (e.g. pyannote)
+        import torch
+        torch.set_num_threads(cpu_threads)
+        logger.info(f"torch intra-op threads set to {cpu_threads} for CPU SER")
+    return pipe
+
+def _is_silent(y, sr: int) -> bool:
+    """Cheap gate run before any model: too short or too quiet to analyse."""
+    import numpy as np
+    if len(y) < SILENCE_MIN_DURATION * sr:
+        return True
+    y = np.asarray(y, dtype=np.float32)
+    return float(np.sqrt(np.dot(y, y) / len(y))) < SILENCE_MIN_RMS
+
+@lru_cache(maxsize=1)
+def _get_demucs_separator(model: str):
+    """In-process Demucs, loaded once (raises ImportError when demucs.api is unavailable)."""
+    from demucs.api import Separator
+    return Separator(model=model, segment=None)
+
+def _fast_load(path: str, target_sr: Optional[int] = None):
+    """
+    Mono float32 decode via libsndfile, resampled with torchaudio (scipy polyphase if unavailable).
+    Containers libsndfile can't read (m4a, webm...) go through librosa/audioread as before.
+    """
+    import numpy as np
+    import soundfile as sf
+    try:
+        data, sr = sf.read(path, dtype='float32', always_2d=False)
+    except Exception:
+        import librosa
+        return librosa.load(path, sr=target_sr, mono=True)
+    if data.ndim == 2:
+        data = data.mean(axis=1)
+    if target_sr and sr != target_sr:
+        try:
+            import torch
+            import torchaudio
+            data = torchaudio.functional.resample(torch.from_numpy(np.ascontiguousarray(data)), sr, target_sr).numpy()
+        except ImportError:
+            import scipy.signal
+            data = scipy.signal.resample_poly(data, target_sr, sr)
+    return np.ascontiguousarray(data, dtype=np.float32), target_sr or sr
+
+def _mfcc_stats(mfcc, f0: int = 0, f1: Optional[int] = None):
+    """
+    39-dim fingerprint over frames [f0, f1): mean MFCC + mean first and second frame differences.
+    The difference means telescope to edge frames, so no (13, T) delta matrices are built:
+    mean(x[t+1]-x[t]) = (x[-1]-x[0])/(n-1), mean(x[t+2]-2x[t+1]+x[t]) = (x[-1]-x[-2]-x[1]+x[0])/(n-2).
+    """
+    import numpy as np
+    w = mfcc[:, f0:f1]
+    n = w.shape[1]
+    d1 = (w[:, -1] - w[:, 0]) / (n - 1) if n > 1 else np.zeros(len(w))
+    d2 = (w[:, -1] - w[:, -2] - w[:, 1] + w[:, 0]) / (n - 2) if n > 2 else np.zeros(len(w))
+    return np.concatenate([w.mean(axis=1), d1, d2])
+
+@lru_cache(maxsize=4)
+def _decode_audio(audio_path: str, mtime_ns: int, size: int, sr: Optional[int]):
+    """Decoded (y, sr) keyed by (path, mtime, size, sr): the same upload is decoded once for STT/SER/features/fingerprint."""
+    y, sr_out = _fast_load(audio_path, sr)
+    y.setflags(write=False) # shared between callers
+    return y, sr_out
+
 class AudioService:
     """
     Audio Service for Multi-modal Interaction.
@@ -37,18 +224,34 @@ class AudioService:
     3. SER (Speech Emotion Recognition): Using local transformers (wav2vec2).
     """
     
-    def __init__(self):
+    def __init__(self, preload: bool = None):
         # Load config from settings
         self.model_size = settings.AUDIO_STT_MODEL_SIZE
         self.device = settings.AUDIO_STT_DEVICE
         self.compute_type = settings.AUDIO_STT_COMPUTE_TYPE
         
         self._stt_model = None
+        self._batched_pipeline = None # BatchedInferencePipeline over _stt_model
+        self._stt_lock = threading.Lock() # warmup thread vs. first request
         self._ser_pipeline = None
+        self._ser_lock = threading.Lock()
+        # SER / features / fingerprint are independent and release the GIL in their C paths
+        self._post_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="audio-post")
+        # Blocking STT entry points run here when called from async code; bounded so requests queue instead of thrashing
+        self._stt_pool = ThreadPoolExecutor(max_workers=settings.AUDIO_STT_CONCURRENCY, thread_name_prefix="audio-stt")
+        # Open edge-tts WebSockets at once; bursts wait here instead of piling up handshakes
+        self._tts_semaphore = asyncio.Semaphore(settings.AUDIO_TTS_CONCURRENCY)
         
         # Output dirs
         self.audio_dir = settings.DATA_DIR / "audio_cache"
         self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.tts_cache_dir = self.audio_dir / "tts_cache"
+        self.tts_cache_dir.mkdir(exist_ok=True)
+        # transcribe() results by audio content hash: memory LRU in front of JSON files
+        self.stt_cache_dir = self.audio_dir / "stt_cache"
+        self.stt_cache_dir.mkdir(exist_ok=True)
+        self._stt_results: LRUCache = LRUCache(maxsize=STT_MEMORY_CACHE_SIZE)
+        self._stt_results_lock = threading.Lock() # LRUCache is not thread-safe
         
         # Voice Profile Service
         self.voice_profile_service = VoiceProfileService()
@@ -58,74 +261,148 @@ class AudioService:
         if not shutil.which("ffmpeg"):
             logger.warning("ffmpeg not found in system PATH. Audio processing (pydub) may fail or fallback to defaults.")
 
+        # Warm start: load and exercise the models off the request path
+        if preload is None:
+            preload = settings.AUDIO_STT_PRELOAD
+        if preload and (HAS_WHISPER or HAS_SER):
+            threading.Thread(target=self.warmup, name="audio-warmup", daemon=True).start()
+
+    def warmup(self):
+        """
+        Load Whisper and SER and run one second of silence through each, so CTranslate2 kernel
+        selection and the first torch forward happen here instead of on the first request.
+        """
+        import numpy as np
+        silence = np.zeros(16000, dtype=np.float32)
+
+        model = self._load_stt_model() if HAS_WHISPER else None
+        if model is not None:
+            try:
+                # vad_filter=False: VAD would drop pure silence and the decoder would never run
+                segments, _ = model.transcribe(silence, language="zh", beam_size=1, vad_filter=False)
+                for _ in segments:
+                    pass
+            except Exception as e:
+                logger.warning(f"Whisper warmup failed: {e}")
+
+        pipe = self._load_ser_model()
+        if pipe is not None:
+            try:
+                pipe(silence, top_k=1)
+            except Exception as e:
+                logger.warning(f"SER warmup failed: {e}")
+
+    def _resolve_compute_type(self, device: str) -> str:
+        """
+        Device-aware CTranslate2 compute type: int8_float16 on CUDA, int8 (configurable) on CPU.
+        Only explicit int8/float32 variants are honoured as-is; "auto"/"default"/fp16 map to the quantized type.
+        """
+        compute_type = (self.compute_type or "auto").lower()
+        if device == "cuda":
+            return "int8_float16" if compute_type in ("auto", "default", "float16") else compute_type
+        # CPU has no fp16 kernels: anything half-precision falls back to the CPU setting
+        if compute_type in ("auto", "default") or "float16" in compute_type:
+            return settings.AUDIO_STT_COMPUTE_TYPE_CPU
+        return compute_type
+
     def _load_stt_model(self):
         if not HAS_WHISPER:
             logger.warning("Whisper STT not available.")
             return None
         
-        if self._stt_model is None:
-            # Map 'gpu' to 'cuda' for faster-whisper compatibility
-            device = self.device
-            if device.lower() == 'gpu':
-                device = 'cuda'
-
-            # Use local model path if available
-            model_path_or_size = str(settings.AUDIO_STT_MODEL_PATH)
-            if not settings.AUDIO_STT_MODEL_PATH.exists():
-                 logger.warning(f"Local Whisper model not found at {model_path_or_size}, falling back to size '{self.model_size}' (will download)")
-                 model_path_or_size = self.model_size
+        if self._stt_model is not None:
+            return self._stt_model
 
-            try:
-                logger.info(f"Loading Whisper model ({model_path_or_size}) on {device}...")
-                self._stt_model = WhisperModel(
-                    model_path_or_size, 
-                    device=device, 
-                    compute_type=self.compute_type
-                )
-                logger.info("Whisper model loaded successfully.")
-            except Exception as e:
-                logger.warning(f"Failed to load Whisper model on {device}: {e}")
-                if device != 'cpu':
-                    logger.info("Retrying with device='cpu'...")
-                    try:
-                        self._stt_model = WhisperModel(
-                            model_path_or_size, 
-                            device='cpu', 
-                            compute_type="int8"  # Fallback to int8 for CPU
-                        )
-                        logger.info("Whisper model loaded successfully on CPU.")
-                    except Exception as e_cpu:
-                        logger.error(f"Failed to load Whisper model on CPU: {e_cpu}")
+        with self._stt_lock:
+            if self._stt_model is None:
+                # Map 'gpu' to 'cuda' for faster-whisper compatibility
+                device = self.device
+                if device.lower() == 'gpu':
+                    device = 'cuda'
+
+                # Use local model path if available
+                model_path_or_size = str(settings.AUDIO_STT_MODEL_PATH)
+                if not settings.AUDIO_STT_MODEL_PATH.exists():
+                     logger.warning(f"Local Whisper model not found at {model_path_or_size}, falling back to size '{self.model_size}' (will download)")
+                     model_path_or_size = self.model_size
+
+                compute_type = self._resolve_compute_type(device)
+                # CUDA: num_workers=2 lets two transcribe() calls overlap (CTranslate2 releases the GIL).
+                # CPU: one worker owning every core gives the fastest, most predictable single call.
+                num_workers = 2 if device == "cuda" else 1
+                try:
+                    logger.info(f"Loading Whisper model ({model_path_or_size}) on {device} ({compute_type})...")
+                    self._stt_model = _get_whisper(model_path_or_size, device, compute_type, num_workers, _stt_cpu_threads(num_workers))
+                    logger.info("Whisper model loaded successfully.")
+                except Exception as e:
+                    logger.warning(f"Failed to load Whisper model on {device}: {e}")
+                    if device != 'cpu':
+                        logger.info("Retrying with device='cpu'...")
+                        try:
+                            self._stt_model = _get_whisper(
+                                model_path_or_size, 
+                                'cpu', 
+                                settings.AUDIO_STT_COMPUTE_TYPE_CPU,  # Fallback to int8 for CPU
+                                1,
+                                _stt_cpu_threads(1)
+                            )
+                            logger.info("Whisper model loaded successfully on CPU.")
+                        except Exception as e_cpu:
+                            logger.error(f"Failed to load Whisper model on CPU: {e_cpu}")
+                            return None
+                    else:
                         return None
-                else:
-                    return None
-        return self._stt_model
+            return self._stt_model
+
+    def _load_batched_pipeline(self):
+        """BatchedInferencePipeline over the current Whisper model (rebuilt if the model was reloaded, e.g. CPU fallback)."""
+        if not HAS_BATCHED_WHISPER:
+            return None
+        model = self._load_stt_model()
+        if model is None:
+            return None
+        pipe = self._batched_pipeline
+        if pipe is None or pipe.model is not model:
+            pipe = self._batched_pipeline = BatchedInferencePipeline(model=model)
+        return pipe
 
     def _load_ser_model(self):
         if not HAS_SER or not settings.AUDIO_SER_ENABLED:
             return None
             
-        if self._ser_pipeline is None:
-            try:
-                # Use local model path if available
-                model_path = str(settings.AUDIO_SER_MODEL_PATH)
-                if settings.AUDIO_SER_MODEL_PATH.exists():
-                     logger.info(f"Loading SER model from local path: {model_path}")
-                     model_to_load = model_path
-                else:
-                     logger.warning(f"Local SER model not found at {model_path}, falling back to huggingface ID '{settings.AUDIO_SER_MODEL}'")
-                     model_to_load = settings.AUDIO_SER_MODEL
+        if self._ser_pipeline is not None:
+            return self._ser_pipeline
 
-                # Use device=0 for GPU if available and requested
-                device = 0 if settings.AUDIO_STT_DEVICE in ["cuda", "gpu"] else -1
-                self._ser_pipeline = pipeline("audio-classification", model=model_to_load, device=device)
-                logger.info(f"SER model loaded successfully on device {device}.")
-            except Exception as e:
-                logger.error(f"Failed to load SER model: {e}")
-                # Disable SER to prevent future timeouts
-                self._ser_pipeline = None
-                return None
-        return self._ser_pipeline
+        with self._ser_lock: # warmup thread vs. first request
+            if self._ser_pipeline is None:
+                try:
+                    # Use local model path if available
+                    model_path = str(settings.AUDIO_SER_MODEL_PATH)
+                    if settings.AUDIO_SER_MODEL_PATH.exists():
+                         logger.info(f"Loading SER model from local path: {model_path}")
+                         model_to_load = model_path
+                    else:
+                         logger.warning(f"Local SER model not found at {model_path}, falling back to huggingface ID '{settings.AUDIO_SER_MODEL}'")
+                         model_to_load = settings.AUDIO_SER_MODEL
+
+                    # Use device=0 for GPU if available and requested
+                    device = 0 if settings.AUDIO_STT_DEVICE in ["cuda", "gpu"] else -1
+                    self._ser_pipeline = _get_ser_pipeline(
+                        model_to_load, device, settings.AUDIO_SER_QUANTIZE, settings.AUDIO_SER_CPU_THREADS
+                    )
+                    logger.info(f"SER model loaded successfully on device {device}.")
+                except Exception as e:
+                    logger.error(f"Failed to load SER model: {e}")
+                    # Disable SER to prevent future timeouts
+                    self._ser_pipeline = None
+                    return None
+            return self._ser_pipeline
+
+    def _load_audio(self, audio_path: str, sr: Optional[int] = 16000) -> Tuple[Any, int]:
+        """Mono float32 waveform at `sr` (None = native), decoded at most once per file version."""
+        # mtime_ns + size: a file rewritten in place within the same mtime tick still misses the cache
+        st = os.stat(audio_path)
+        return _decode_audio(str(audio_path), st.st_mtime_ns, st.st_size, sr)
 
     def separate_vocals(self, audio_path: str) -> str:
         """
@@ -133,6 +410,35 @@ class AudioService:
         Returns the path to the separated vocals file.
         If separation fails or is skipped, returns the original path.
         """
+        output_dir = self.audio_dir / "separated"
+        output_dir.mkdir(exist_ok=True)
+        model_name = "htdemucs_ft"
+        # Same layout as the CLI: output_dir / model_name / track_name / vocals.wav
+        vocals_path = output_dir / model_name / Path(audio_path).stem / "vocals.wav"
+
+        # 1. In-process separator: no interpreter start-up or model reload per call
+        try:
+            import demucs.api
+            separator = _get_demucs_separator(model_name)
+        except ImportError:
+            separator = None
+        except Exception as e:
+            logger.warning(f"Failed to load Demucs separator, falling back to CLI: {e}")
+            separator = None
+
+        if separator is not None:
+            try:
+                logger.info(f"Starting vocal separation for: {audio_path}")
+                _, separated = separator.separate_audio_file(Path(audio_path))
+                vocals_path.parent.mkdir(parents=True, exist_ok=True)
+                demucs.api.save_audio(separated["vocals"], vocals_path, samplerate=separator.samplerate)
+                logger.info(f"Vocal separation successful: {vocals_path}")
+                return str(vocals_path)
+            except Exception as e:
+                logger.error(f"Error during vocal separation: {e}")
+                return audio_path
+
+        # 2. Fallback: demucs CLI
         try:
             import subprocess
             import shutil
@@ -144,15 +450,12 @@ class AudioService:
             else:
                 cmd_base = ["demucs"]
 
-            output_dir = self.audio_dir / "separated"
-            output_dir.mkdir(exist_ok=True)
-            
             logger.info(f"Starting vocal separation for: {audio_path}")
             
             # Run Demucs
             # -n htdemucs_ft : High quality model
             # --two-stems=vocals : Only separate vocals and others
-            cmd = cmd_base + ["-n", "htdemucs_ft", "--two-stems=vocals", "-o", str(output_dir), audio_path]
+            cmd = cmd_base + ["-n", model_name, "--two-stems=vocals", "-o", str(output_dir), audio_path]
             
             # Use subprocess to run
             process = subprocess.run(cmd, capture_output=True, text=True)
@@ -161,12 +464,6 @@ class AudioService:
                 logger.error(f"Demucs separation failed: {process.stderr}")
                 return audio_path
                 
-            # Construct expected output path
-            # Demucs structure: output_dir / model_name / track_name / vocals.wav
-            filename = Path(audio_path).stem
-            model_name = "htdemucs_ft"
-            vocals_path = output_dir / model_name / filename / "vocals.wav"
-            
             if vocals_path.exists():
                 logger.info(f"Vocal separation successful: {vocals_path}")
                 return str(vocals_path)
@@ -178,31 +475,34 @@ class AudioService:
             logger.error(f"Error during vocal separation: {e}")
             return audio_path
 
-    def detect_emotion(self, audio_path: str) -> Dict[str, float]:
+    def detect_emotion(self, audio_path: str, y: Any = None, sr: int = None) -> Dict[str, float]:
         """
         Detect emotion from audio file using local model.
+        Pass a preloaded 16 kHz waveform as (y, sr) to skip decoding.
         """
-        if not HAS_SER:
+        if not HAS_SER or not settings.AUDIO_SER_ENABLED:
             return {}
-            
+
+        # Force load with librosa/soundfile first to bypass pipeline's internal ffmpeg dependency
+        # This is robust for Windows where ffmpeg binary might not be in PATH for python-ffmpeg
+        if y is None or sr != 16000:
+            try:
+                y, sr = self._load_audio(audio_path, sr=16000)
+            except Exception as load_err:
+                logger.warning(f"Librosa load failed, falling back to path: {load_err}")
+                y = None
+
+        # 静音/过短: 不加载也不运行 wav2vec2
+        if y is not None and _is_silent(y, sr):
+            return dict(SER_SILENT_RESULT)
+
         pipe = self._load_ser_model()
         if not pipe:
             return {}
             
         try:
-            # Force load with librosa/soundfile first to bypass pipeline's internal ffmpeg dependency
-            # This is robust for Windows where ffmpeg binary might not be in PATH for python-ffmpeg
-            try:
-                import librosa
-                # Load as numpy array, sampling rate must match model usually (16k is safe default for most)
-                # But pipeline usually handles resampling. Let's try raw bytes or just ensure soundfile is used.
-                # Actually, transformers pipeline accepts numpy array.
-                y, sr = librosa.load(audio_path, sr=16000)
-                results = pipe(y, top_k=3)
-            except Exception as load_err:
-                logger.warning(f"Librosa load failed, falling back to path: {load_err}")
-                # Fallback to path
-                results = pipe(audio_path, top_k=3)
+            # Fallback to path when the array could not be decoded
+            results = pipe(y if y is not None else audio_path, top_k=3)
             
             # results is like [{'label': 'neutral', 'score': 0.9}, ...]
             # Note: pipeline output format might differ for array input (list of dicts) vs file
@@ -215,39 +515,79 @@ class AudioService:
             logger.error(f"SER error: {e}")
             return {}
 
-    def extract_paralinguistic_features(self, audio_path: str) -> Dict[str, Any]:
+    def detect_emotion_batch(self, audio_arrays: List[Any]) -> List[Dict[str, float]]:
+        """
+        Batched detect_emotion for preloaded 16 kHz waveforms (e.g. one per diarized segment).
+        Returns one {label: score} dict per input; short or silent clips get SER_SILENT_RESULT.
+        """
+        results = [{} for _ in audio_arrays]
+        if not HAS_SER or not settings.AUDIO_SER_ENABLED or not audio_arrays:
+            return results
+
+        keep = []
+        for i, y in enumerate(audio_arrays):
+            if _is_silent(y, 16000):
+                results[i] = dict(SER_SILENT_RESULT)
+            else:
+                keep.append(i)
+        if not keep:
+            return results
+
+        pipe = self._load_ser_model()
+        if not pipe:
+            return results
+        try:
+            outputs = pipe([audio_arrays[i] for i in keep], top_k=3)
+            for i, out in zip(keep, outputs):
+                results[i] = {res['label']: res['score'] for res in out}
+        except Exception as e:
+            logger.error(f"SER batch error: {e}")
+        return results
+
+    def extract_paralinguistic_features(self, audio_path: str = None, y: Any = None, sr: int = None) -> Dict[str, Any]:
         """
         Extract paralinguistic features (Pitch, Energy, Speed).
+        Pass a preloaded waveform as (y, sr) to skip decoding.
         """
         try:
             import librosa
             import numpy as np
             
-            y, sr = librosa.load(audio_path, sr=None)
+            if y is None or sr is None:
+                y, sr = self._load_audio(audio_path, sr=16000)
             
             # 1. Energy (RMS)
             rms = librosa.feature.rms(y=y)
             energy = float(np.mean(rms))
+
+            # Silent tail / near-empty clip: no pitch or syllables to find
+            if _is_silent(y, sr):
+                return {
+                    "energy": energy,
+                    "pitch": 0.0,
+                    "duration": len(y) / sr,
+                    "speed": 0,
+                    "syllable_count": 0
+                }
             
             # 2. Pitch (F0)
-            # Use piptrack or similar
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            # Select pitches with high magnitude
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
-            
-            avg_pitch = float(np.mean(pitch_values)) if pitch_values else 0.0
+            # YIN returns F0 per frame directly (no spectrogram-shaped peak picking); speech range 50-500 Hz
+            f0 = librosa.yin(y, fmin=50, fmax=500, sr=sr)
+            # YIN has no voicing decision: keep frames with real energy (same 2048/512 framing as rms)
+            n = min(len(f0), rms.shape[1])
+            voiced = rms[0, :n] > 0.1 * rms.max() if n else np.zeros(0, dtype=bool)
+            # Masked mean as one dot product (YIN output is always finite, clipped to [fmin, fmax])
+            count = int(voiced.sum())
+            avg_pitch = float(np.dot(f0[:n], voiced) / count) if count else 0.0
             
             # 3. Speed (Syllables estimation)
             duration = librosa.get_duration(y=y, sr=sr)
             # Estimate syllables using peak detection on envelope (approx 4-5Hz for speech)
             # This is a rough heuristic
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            peaks = librosa.util.peak_pick(onset_env, pre_max=3, post_max=3, pre_avg=3, post_avg=5, delta=0.5, wait=10)
+            from scipy.signal import find_peaks
+            onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=512)
+            # Compiled peak search: >= 10 frames (~0.32 s) apart, rising 0.5 above the surrounding envelope
+            peaks, _ = find_peaks(onset_env, distance=10, prominence=0.5)
             syllable_count = len(peaks)
             speed = syllable_count / duration if duration > 0 else 0
             
@@ -265,20 +605,26 @@ class AudioService:
             logger.error(f"Feature extraction error: {e}")
             return {}
 
-    def get_voice_fingerprint(self, audio_path: str = None, y_data: Any = None, sr_rate: int = None) -> Optional[list]:
+    def get_voice_fingerprint(self, audio_path: str = None, y_data: Any = None, sr_rate: int = None,
+                              mfcc_clip: Any = None, mfcc_frames_slice: Tuple[int, int] = None) -> Optional[list]:
         """
         Get voice fingerprint for speaker ID.
-        Uses MFCC + Delta + Delta-Delta (39-dim vector).
+        Uses MFCC + Delta + Delta-Delta means (39-dim vector), see _mfcc_stats.
         Can accept either audio_path or (y_data, sr_rate).
+        Segment path: pass a precomputed clip-wide MFCC and a (f0, f1) frame window;
+        the fingerprint is then one view+mean reduction, no librosa and no per-segment copies.
         """
         try:
             import librosa
-            import numpy as np
             
+            if mfcc_clip is not None and mfcc_frames_slice is not None:
+                f0, f1 = mfcc_frames_slice
+                return _mfcc_stats(mfcc_clip, f0, f1).tolist()
+
             if y_data is not None and sr_rate is not None:
                 y, sr = y_data, sr_rate
             elif audio_path:
-                y, sr = librosa.load(audio_path, sr=None)
+                y, sr = self._load_audio(audio_path, sr=16000)
             else:
                 return None
             
@@ -289,16 +635,8 @@ class AudioService:
             # 1. MFCC
             mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
             
-            # 2. Delta & Delta-Delta
-            mfcc_delta = librosa.feature.delta(mfcc)
-            mfcc_delta2 = librosa.feature.delta(mfcc, order=2)
-            
-            # 3. Stack and Mean
-            # Shape: (39, T)
-            combined = np.vstack([mfcc, mfcc_delta, mfcc_delta2])
-            
-            # Mean across time -> (39,)
-            fingerprint = np.mean(combined, axis=1).tolist()
+            # 2. Mean across time of MFCC / Delta / Delta-Delta -> (39,)
+            fingerprint = _mfcc_stats(mfcc).tolist()
             return fingerprint
         except Exception as e:
             # logger.error(f"Fingerprint error: {e}") # Reduce log spam for short segments
@@ -320,11 +658,11 @@ class AudioService:
         try:
             import librosa
             import numpy as np
-            from sklearn.cluster import AgglomerativeClustering
-            from sklearn.metrics.pairwise import cosine_distances
+            from scipy.cluster.hierarchy import linkage, fcluster
+            from scipy.spatial.distance import squareform
 
-            # Load full audio once for slicing
-            y_full, sr = librosa.load(audio_path, sr=None)
+            # Load full audio once at 16 kHz (shared decode cache): Whisper, fingerprints and SER all use this buffer
+            y_full, sr = self._load_audio(audio_path, sr=16000)
             duration_total = librosa.get_duration(y=y_full, sr=sr)
         except Exception as e:
             return {"text": "", "error": f"Audio load failed: {e}"}
@@ -334,8 +672,9 @@ class AudioService:
             # Force Simplified Chinese output
             # Enable VAD filter to prevent hallucinations on silent audio
             # Disable condition_on_previous_text to prevent repetitive loops
+            # Already-decoded 16 kHz array: no second ffmpeg decode inside faster-whisper
             segments, info = model.transcribe(
-                audio_path, 
+                y_full, 
                 beam_size=settings.AUDIO_BEAM_SIZE, 
                 language="zh", 
                 initial_prompt=settings.AUDIO_INITIAL_PROMPT,
@@ -344,43 +683,63 @@ class AudioService:
                 vad_parameters=dict(min_silence_duration_ms=500)
             )
             
+            # Fingerprints are computed on a worker thread while Whisper is still decoding:
+            # it builds the clip-wide MFCC first, then turns each queued (index, start, end) into a window mean.
+            seg_queue = queue.Queue(maxsize=8)
+            fp_results = [] # (index in temp_segments, fingerprint)
+
+            def _fingerprint_worker():
+                hop_length = 512
+                try:
+                    mfcc = librosa.feature.mfcc(y=y_full, sr=sr, n_mfcc=13, hop_length=hop_length) # (13, T)
+                except Exception as e:
+                    logger.warning(f"MFCC extraction failed: {e}")
+                    mfcc = None
+                min_frames = 2048 // hop_length # same minimum length as get_voice_fingerprint
+                while True:
+                    item = seg_queue.get()
+                    if item is None:
+                        return
+                    if mfcc is None:
+                        continue
+                    idx, start, end = item
+                    # Segment -> MFCC frame window
+                    f0 = int(start * sr / hop_length)
+                    f1 = min(int(end * sr / hop_length), mfcc.shape[1])
+                    # Get Fingerprint (39-dim mean over the window)
+                    fp = self.get_voice_fingerprint(mfcc_clip=mfcc, mfcc_frames_slice=(f0, f1)) if f1 - f0 >= min_frames else None
+                    if fp is not None:
+                        fp_results.append((idx, fp))
+
+            fp_thread = threading.Thread(target=_fingerprint_worker, name="fingerprint", daemon=True)
+            fp_thread.start()
+
             # 1. Collect Segments & Fingerprints
             temp_segments = [] # List of dicts
-            fingerprints = []
-            valid_indices = [] # Indices in temp_segments that have fingerprints
-            
-            # Known Hallucination Phrases to filter
-            HALLUCINATION_PHRASES = ["请不吝点赞", "订阅", "转发", "打赏支持", "明镜与点点", "字幕", "Amara.org"]
-
-            for i, segment in enumerate(segments):
-                # Hallucination Filter
-                if any(phrase in segment.text for phrase in HALLUCINATION_PHRASES):
-                    # logger.warning(f"Filtered hallucination: {segment.text}")
-                    continue
-
-                # Calculate start/end samples
-                start_sample = int(segment.start * sr)
-                end_sample = int(segment.end * sr)
-                
-                # Slice audio
-                y_seg = y_full[start_sample:end_sample]
-                
-                # Get Fingerprint
-                fp = self.get_voice_fingerprint(y_data=y_seg, sr_rate=sr)
-                
-                seg_data = {
-                    "start": segment.start,
-                    "end": segment.end,
-                    "text": segment.text,
-                    "speaker_id": "unknown",
-                    "speaker_name": "Unknown"
-                }
-                
-                temp_segments.append(seg_data)
-                
-                if fp is not None:
-                    fingerprints.append(fp)
-                    valid_indices.append(i)
+
+            try:
+                for segment in segments:
+                    # Hallucination Filter
+                    if _is_hallucination(segment.text):
+                        # logger.warning(f"Filtered hallucination: {segment.text}")
+                        continue
+
+                    seg_data = {
+                        "start": segment.start,
+                        "end": segment.end,
+                        "text": segment.text,
+                        "speaker_id": "unknown",
+                        "speaker_name": "Unknown"
+                    }
+                    
+                    temp_segments.append(seg_data)
+                    seg_queue.put((len(temp_segments) - 1, segment.start, segment.end))
+            finally:
+                seg_queue.put(None)
+                fp_thread.join()
+
+            valid_indices = [idx for idx, _ in fp_results] # Indices in temp_segments that have fingerprints
+            fingerprints = [fp for _, fp in fp_results]
             
             detected_speakers = set()
             
@@ -399,14 +758,12 @@ class AudioService:
                     # VoiceProfile uses 0.85 sim => 0.15 distance.
                     # Let's use a slightly looser clustering threshold (e.g. 0.3) to group same speaker
                     try:
-                        clustering = AgglomerativeClustering(
-                            n_clusters=None,
-                            metric='cosine', 
-                            linkage='average',
-                            distance_threshold=0.3  # Cosine distance
-                        ).fit(X)
-                        labels = clustering.labels_
-                        n_clusters = clustering.n_clusters_
+                        # Pre-normalized rows: cosine distance is 1 - one GEMM, then average linkage on it
+                        Xn = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+                        D = np.clip(1.0 - Xn @ Xn.T, 0.0, 2.0)
+                        Z = linkage(squareform(D, checks=False), method='average')
+                        labels = fcluster(Z, t=0.3, criterion='distance') - 1  # Cosine distance
+                        n_clusters = int(labels.max()) + 1
                     except Exception as cluster_err:
                         logger.warning(f"Clustering failed: {cluster_err}, falling back to single cluster")
                         labels = [0] * len(fingerprints)
@@ -414,18 +771,13 @@ class AudioService:
                 
                 # 3. Process Clusters
                 cluster_map = {} # cluster_id -> (speaker_id, speaker_name)
+                labels = np.asarray(labels)
+
+                # Centroid (mean) per cluster, matched against the DB in one batched query
+                centroids = np.vstack([X[labels == k].mean(axis=0) for k in range(n_clusters)])
+                matches = self.voice_profile_service.match_speakers_batch(centroids, threshold=0.80)
                 
-                for k in range(n_clusters):
-                    # Get all fingerprints in this cluster
-                    cluster_indices = [idx for idx, label in enumerate(labels) if label == k]
-                    cluster_fps = X[cluster_indices]
-                    
-                    # Compute centroid (mean)
-                    centroid = np.mean(cluster_fps, axis=0).tolist()
-                    
-                    # Match against DB
-                    match = self.voice_profile_service.match_speaker(centroid, threshold=0.80)
-                    
+                for k, (centroid, match) in enumerate(zip(centroids.tolist(), matches)):
                     if match:
                         s_id, s_name, _ = match
                     else:
@@ -440,6 +792,12 @@ class AudioService:
                     s_id, s_name = cluster_map[label]
                     temp_segments[idx]["speaker_id"] = s_id
                     temp_segments[idx]["speaker_name"] = s_name
+
+            # 5. Per-segment emotion: every segment through SER in one batched call
+            if settings.AUDIO_SER_ENABLED and temp_segments:
+                clips = [y_full[int(seg["start"] * sr):int(seg["end"] * sr)] for seg in temp_segments]
+                for seg, emotion in zip(temp_segments, self.detect_emotion_batch(clips)):
+                    seg["emotion"] = emotion
             
             # Construct full formatted text
             full_formatted_text = ""
@@ -462,18 +820,94 @@ class AudioService:
             if ("dll" in error_str.lower() or "library" in error_str.lower() or "cuda" in error_str.lower()) and self.device != "cpu":
                 logger.warning(f"CUDA/DLL error detected ({e}). Switching to CPU mode and retrying...")
                 self.device = "cpu"
-                self.compute_type = "int8"
+                self.compute_type = settings.AUDIO_STT_COMPUTE_TYPE_CPU
                 self._stt_model = None # Force reload
+                self._batched_pipeline = None
                 return self.transcribe_with_diarization(audio_path) # Recursive retry
                 
             return {"text": "", "error": str(e)}
 
+    def _whisper_segments(self, model, y16) -> Tuple[Any, Any]:
+        """Start a Whisper pass over a 16 kHz array: (lazy segment generator, TranscriptionInfo)."""
+        # Force Simplified Chinese output with initial_prompt
+        # VAD drops silence; the batched pipeline pushes the remaining speech chunks through the encoder together
+        options = dict(
+            beam_size=settings.AUDIO_BEAM_SIZE, 
+            language="zh", 
+            initial_prompt=settings.AUDIO_INITIAL_PROMPT,
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=500)
+        )
+        batched = self._load_batched_pipeline()
+        if batched is not None:
+            segments, info = batched.transcribe(y16, batch_size=settings.AUDIO_STT_BATCH_SIZE, **options)
+        else:
+            segments, info = model.transcribe(y16, **options)
+        return segments, info
+
+    def _transcribe_once(self, model, y16) -> Tuple[str, Any]:
+        """One Whisper pass over a 16 kHz array: (joined text, TranscriptionInfo)."""
+        segments, info = self._whisper_segments(model, y16)
+        # Decoding happens while the generator is consumed, so CUDA errors surface here
+        return " ".join(segment.text for segment in segments).strip(), info
+
+    def _stt_cache_key(self, audio_path: str) -> str:
+        """blake2b of the audio bytes + model + resolved compute type: same upload, same model -> same result."""
+        with open(audio_path, "rb") as f:
+            digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+        device = "cuda" if self.device.lower() in ("cuda", "gpu") else self.device
+        return f"{digest}_{self.model_size}_{self._resolve_compute_type(device)}"
+
+    def _get_cached_transcription(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._stt_results_lock:
+            result = self._stt_results.get(key)
+        if result is not None:
+            return result
+        path = self.stt_cache_dir / f"{key}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path) # LRU touch
+        with self._stt_results_lock:
+            self._stt_results[key] = result
+        return result
+
+    def _put_cached_transcription(self, key: str, result: Dict[str, Any]):
+        with self._stt_results_lock:
+            self._stt_results[key] = result
+        try:
+            # Write aside and publish atomically, then bound the directory
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.stt_cache_dir, suffix=".part", delete=False) as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(f.name, self.stt_cache_dir / f"{key}.json")
+            files = sorted(self.stt_cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for stale in files[STT_CACHE_SIZE:]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to persist STT cache entry: {e}")
+
     def transcribe(self, audio_path: str) -> Dict[str, Any]:
         """
         Transcribe audio file to text with emotion and feature detection.
+        Results are cached by audio content; speaker identity is re-resolved against the live profiles.
         """
         if not HAS_WHISPER:
             return {"text": "", "error": "STT module not installed"}
+
+        try:
+            cache_key = self._stt_cache_key(audio_path)
+        except OSError as e:
+            logger.error(f"Transcription error: {e}")
+            return {"text": "", "error": str(e)}
+
+        cached = self._get_cached_transcription(cache_key)
+        if cached is not None:
+            speaker_id, speaker_name, is_new = "unknown", "Unknown", False
+            if cached.get("fingerprint"):
+                speaker_id, speaker_name, is_new = self.voice_profile_service.identify_speaker(cached["fingerprint"])
+            return {**cached, "speaker_id": speaker_id, "speaker_name": speaker_name, "is_new_speaker": is_new}
             
         model = self._load_stt_model()
         if not model:
@@ -481,37 +915,53 @@ class AudioService:
 
         try:
             start_time = time.time()
-            # Force Simplified Chinese output with initial_prompt
-            segments, info = model.transcribe(
-                audio_path, 
-                beam_size=5, 
-                language="zh", 
-                initial_prompt="以下是简体中文的对话。"
-            )
-            
-            text_segments = []
-            for segment in segments:
-                text_segments.append(segment.text)
-            
-            full_text = " ".join(text_segments).strip()
+            # Decode once at 16 kHz mono; Whisper, SER, features and fingerprint all reuse it
+            y16, sr16 = self._load_audio(audio_path, sr=16000)
+        except Exception as e:
+            logger.error(f"Transcription error: {e}")
+            return {"text": "", "error": str(e)}
+
+        # Post-STT helpers only need the waveform: start them now so they overlap with decoding.
+        # They don't depend on the STT device, so a CPU retry below reuses them as-is.
+        emotions_f = self._post_pool.submit(self.detect_emotion, audio_path, y=y16, sr=sr16)
+        features_f = self._post_pool.submit(self.extract_paralinguistic_features, audio_path, y=y16, sr=sr16)
+        fingerprint_f = self._post_pool.submit(self.get_voice_fingerprint, y_data=y16, sr_rate=sr16)
+
+        try:
+            try:
+                full_text, info = self._transcribe_once(model, y16)
+            except Exception as e:
+                error_str = str(e)
+                # Automatic Fallback for CUDA/DLL errors: reload on CPU and decode the same array again
+                if not (("dll" in error_str.lower() or "library" in error_str.lower() or "cuda" in error_str.lower()) and self.device != "cpu"):
+                    raise
+                logger.warning(f"CUDA/DLL error detected ({e}). Switching to CPU mode and retrying...")
+                self.device = "cpu"
+                self.compute_type = settings.AUDIO_STT_COMPUTE_TYPE_CPU
+                self._stt_model = None # Force reload
+                self._batched_pipeline = None
+                model = self._load_stt_model()
+                if not model:
+                    return {"text": "", "error": "Model failed to load"}
+                full_text, info = self._transcribe_once(model, y16)
             duration = time.time() - start_time
             
             # Detect emotion
-            emotions = self.detect_emotion(audio_path)
+            emotions = emotions_f.result()
             top_emotion = max(emotions, key=emotions.get) if emotions else "neutral"
             
             # Extract features
-            features = self.extract_paralinguistic_features(audio_path)
+            features = features_f.result()
             
             # Fingerprint
-            fingerprint = self.get_voice_fingerprint(audio_path)
+            fingerprint = fingerprint_f.result()
             
             # Identify Speaker
             speaker_id, speaker_name, is_new = "unknown", "Unknown", False
             if fingerprint:
                 speaker_id, speaker_name, is_new = self.voice_profile_service.identify_speaker(fingerprint)
 
-            return {
+            result = {
                 "text": full_text,
                 "language": info.language,
                 "duration": duration,
@@ -520,38 +970,179 @@ class AudioService:
                 "top_emotion": top_emotion,
                 "features": features,
                 "fingerprint": fingerprint,
-                "speaker_id": speaker_id,
-                "speaker_name": speaker_name,
-                "is_new_speaker": is_new
             }
+            self._put_cached_transcription(cache_key, result)
+            return {**result, "speaker_id": speaker_id, "speaker_name": speaker_name, "is_new_speaker": is_new}
         except Exception as e:
-            error_str = str(e)
             logger.error(f"Transcription error: {e}")
-            
-            # Automatic Fallback for CUDA/DLL errors
-            if ("dll" in error_str.lower() or "library" in error_str.lower() or "cuda" in error_str.lower()) and self.device != "cpu":
-                logger.warning(f"CUDA/DLL error detected ({e}). Switching to CPU mode and retrying...")
-                self.device = "cpu"
-                self.compute_type = "int8"
-                self._stt_model = None # Force reload
-                return self.transcribe(audio_path) # Recursive retry
-            
             return {"text": "", "error": str(e)}
 
-    async def synthesize(self, text: str, voice: str = "zh-CN-XiaoxiaoNeural", output_file: str = "output.mp3") -> Optional[str]:
+    async def transcribe_async(self, audio_path: str) -> Dict[str, Any]:
+        """transcribe() on the bounded STT pool, without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._stt_pool, self.transcribe, audio_path)
+
+    async def transcribe_with_diarization_async(self, audio_path: str) -> Dict[str, Any]:
+        """transcribe_with_diarization() on the bounded STT pool, without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._stt_pool, self.transcribe_with_diarization, audio_path)
+
+    async def transcribe_stream(self, audio_path: str) -> AsyncIterator[Dict[str, Any]]:
         """
-        Synthesize text to audio file.
+        Streaming transcribe(): yields {"type": "segment", "text", "start", "end"} as Whisper decodes each
+        segment, then one {"type": "final", ...} event with the transcribe() result fields
+        (or {"type": "error", "error"} on failure).
+        """
+        if not HAS_WHISPER:
+            yield {"type": "error", "error": "STT module not installed"}
+            return
+
+        loop = asyncio.get_running_loop()
+        model = await loop.run_in_executor(self._stt_pool, self._load_stt_model)
+        if not model:
+            yield {"type": "error", "error": "Model failed to load"}
+            return
+
+        start_time = time.time()
+        try:
+            y16, sr16 = await loop.run_in_executor(self._stt_pool, self._load_audio, audio_path, 16000)
+        except Exception as e:
+            logger.error(f"Transcription error: {e}")
+            yield {"type": "error", "error": str(e)}
+            return
+
+        # Same overlap as transcribe(): helpers run while Whisper decodes
+        emotions_f = self._post_pool.submit(self.detect_emotion, audio_path, y=y16, sr=sr16)
+        features_f = self._post_pool.submit(self.extract_paralinguistic_features, audio_path, y=y16, sr=sr16)
+        fingerprint_f = self._post_pool.submit(self.get_voice_fingerprint, y_data=y16, sr_rate=sr16)
+
+        # Whisper's generator is consumed on the STT pool; each segment is handed to the loop as it lands
+        events: asyncio.Queue = asyncio.Queue()
+        done = object()
+        info_box = {}
+        stop = threading.Event() # consumer went away (client disconnect): stop decoding early
+
+        def _decode():
+            try:
+                segments, info_box["info"] = self._whisper_segments(model, y16)
+                for s in segments:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(events.put_nowait, {"type": "segment", "text": s.text, "start": s.start, "end": s.end})
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        decode_f = loop.run_in_executor(self._stt_pool, _decode)
+        texts = []
+        try:
+            while (item := await events.get()) is not done:
+                if isinstance(item, Exception):
+                    logger.error(f"Transcription error: {item}")
+                    yield {"type": "error", "error": str(item)}
+                    return
+                texts.append(item["text"])
+                yield item
+        finally:
+            stop.set()
+            await decode_f
+
+        info = info_box["info"]
+        emotions = await asyncio.wrap_future(emotions_f)
+        features = await asyncio.wrap_future(features_f)
+        fingerprint = await asyncio.wrap_future(fingerprint_f)
+        speaker_id, speaker_name, is_new = "unknown", "Unknown", False
+        if fingerprint:
+            speaker_id, speaker_name, is_new = await loop.run_in_executor(
+                None, self.voice_profile_service.identify_speaker, fingerprint
+            )
+
+        yield {
+            "type": "final",
+            "text": " ".join(texts).strip(),
+            "language": info.language,
+            "duration": time.time() - start_time,
+            "confidence": info.language_probability,
+            "emotions": emotions,
+            "top_emotion": max(emotions, key=emotions.get) if emotions else "neutral",
+            "features": features,
+            "fingerprint": fingerprint,
+            "speaker_id": speaker_id,
+            "speaker_name": speaker_name,
+            "is_new_speaker": is_new
+        }
+
+    def _tts_cache_path(self, text: str, voice: str) -> Path:
+        """tts_cache/<blake2b(voice|text)>.mp3: repeated prompts skip the edge-tts round-trip."""
+        key = hashlib.blake2b(f"{voice}|{text}".encode("utf-8"), digest_size=16).hexdigest()
+        return self.tts_cache_dir / f"{key}.mp3"
+
+    def _prune_tts_cache(self, keep: int = TTS_CACHE_SIZE):
+        """Drop the least recently used cached clips beyond `keep`."""
+        files = sorted(self.tts_cache_dir.glob("*.mp3"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in files[keep:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    async def synthesize_stream(self, text: str, voice: str = "zh-CN-XiaoxiaoNeural") -> AsyncIterator[bytes]:
+        """
+        Synthesize text and yield MP3 chunks as edge-tts produces them (playback can start at first byte).
+        Cached clips are replayed from disk.
+        """
+        if not HAS_TTS:
+            logger.warning("TTS module not installed")
+            return
+
+        voice = voice or settings.AUDIO_TTS_DEFAULT_VOICE
+        cached = self._tts_cache_path(text, voice)
+        if cached.exists():
+            os.utime(cached) # LRU touch
+            with open(cached, "rb") as f:
+                while data := f.read(64 * 1024):
+                    yield data
+            return
+
+        async with self._tts_semaphore:
+            communicate = edge_tts.Communicate(text, voice)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    yield chunk["data"]
+
+    async def synthesize(self, text: str, voice: str = "zh-CN-XiaoxiaoNeural", output_file: str = None) -> Optional[str]:
+        """
+        Synthesize text to audio file (chunks are written as they arrive).
+        Results are cached by (text, voice); pass output_file to also get a copy under audio_dir.
         """
         if not HAS_TTS:
             logger.warning("TTS module not installed")
             return None
-            
-        output_path = self.audio_dir / output_file
+
+        voice = voice or settings.AUDIO_TTS_DEFAULT_VOICE
+        cached = self._tts_cache_path(text, voice)
         
         try:
-            communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(str(output_path))
-            return str(output_path)
+            if cached.exists():
+                os.utime(cached) # LRU touch
+            else:
+                # Write aside and publish atomically: concurrent readers never see a partial clip
+                with tempfile.NamedTemporaryFile(dir=self.tts_cache_dir, suffix=".part", delete=False) as f:
+                    tmp_path = f.name
+                    try:
+                        async for data in self.synthesize_stream(text, voice):
+                            f.write(data)
+                    except BaseException:
+                        f.close()
+                        os.unlink(tmp_path)
+                        raise
+                os.replace(tmp_path, cached)
+                self._prune_tts_cache()
+
+            if output_file:
+                output_path = self.audio_dir / output_file
+                shutil.copyfile(cached, output_path)
+                return str(output_path)
+            return str(cached)
         except Exception as e:
             logger.error(f"TTS synthesis error: {e}")
             return None
@@ -0,0 +1,98 @@
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.sql_models import Character
+
+class CharacterSnapshot(BaseModel):
+    """
+    Immutable, session-independent copy of the Character columns read on every dialogue turn.
+    Duck-types the ORM object for read-only consumers (context builder, profile formatter).
+    """
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    name: Optional[str] = None
+    version: int = 1
+    attributes: Dict[str, Any] = {}
+    traits: Dict[str, Any] = {}
+    dynamic_profile: Dict[str, Any] = {}
+
+class CharacterCache:
+    """
+    Process-local TTL cache of CharacterSnapshot, keyed by character id.
+    Writes in this process invalidate explicitly; the TTL bounds staleness of writes made by other workers.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # TTLCache is not thread-safe; sync endpoints run on the threadpool
+        self._lock = Lock()
+
+    def get_many(self, db: Session, ids: Iterable[int]) -> Dict[int, CharacterSnapshot]:
+        """Return snapshots for `ids`; all misses are loaded with a single `WHERE id IN (...)` query."""
+        found: Dict[int, CharacterSnapshot] = {}
+        missing = []
+        with self._lock:
+            for char_id in {i for i in ids if i is not None}:
+                snapshot = self._cache.get(char_id)
+                if snapshot is None:
+                    missing.append(char_id)
+                else:
+                    found[char_id] = snapshot
+
+        if missing:
+            rows = db.query(
+                Character.id, Character.name, Character.version,
+                Character.attributes, Character.traits, Character.dynamic_profile,
+            ).filter(Character.id.in_(missing)).all()
+            loaded = {
+                row.id: CharacterSnapshot(
+                    id=row.id,
+                    name=row.name,
+                    version=row.version or 1,
+                    attributes=row.attributes or {},
+                    traits=row.traits or {},
+                    dynamic_profile=row.dynamic_profile or {},
+                )
+                for row in rows
+            }
+            with self._lock:
+                self._cache.update(loaded)
+            found.update(loaded)
+        return found
+
+    def get(self, db: Session, char_id: int) -> Optional[CharacterSnapshot]:
+        return self.get_many(db, [char_id]).get(char_id)
+
+    def invalidate(self, *char_ids: int):
+        with self._lock:
+            for char_id in char_ids:
+                self._cache.pop(char_id, None)
+
+    def invalidate_on_commit(self, db: Session, *char_ids: int):
+        """
+        Invalidate `char_ids` once `db` commits (dropped on rollback). Invalidating before the commit
+        lets a concurrent reader re-cache the pre-commit row for a full TTL.
+        """
+        db.info.setdefault(_PENDING_KEY, set()).update(char_ids)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+character_cache = CharacterCache()
+
+_PENDING_KEY = "character_cache_pending"
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        character_cache.invalidate(*pending)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
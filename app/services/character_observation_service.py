@@ -9,33 +9,41 @@ class CharacterObservationService:
     Service for managing active character observations (suggestions).
     """
 
-    def add_observations(self, db: Session, session_id: str, observations: List[Dict[str, Any]]):
+    def add_observations(self, db: Session, session_id: str, observations: List[Dict[str, Any]]) -> List[int]:
         """
         Batch add observations from dialogue analysis.
+        Returns the ids of the created observations.
         """
-        created_objs = []
+        # Resolve every referenced character in one IN query instead of one lookup per observation
+        char_names = {obs.get("character_name") for obs in observations if obs.get("character_name")}
+        if not char_names:
+            return []
+        # name is indexed but not unique: descending id so the oldest character wins, like the old .first()
+        name_to_id = {
+            name: char_id
+            for char_id, name in db.query(Character.id, Character.name)
+            .filter(Character.name.in_(char_names))
+            .order_by(Character.id.desc())
+        }
+
+        rows = []
         for obs in observations:
-            char_name = obs.get("character_name")
-            if not char_name:
-                continue
-            
-            # Find character by name
-            character = db.query(Character).filter(Character.name == char_name).first()
-            if not character:
+            character_id = name_to_id.get(obs.get("character_name"))
+            if character_id is None:
                 continue
 
-            new_obs = CharacterObservation(
-                character_id=character.id,
-                session_id=session_id,
-                content=obs, # Store the full observation JSON
-                confidence=0.8, # Default confidence, could come from LLM
-                status="pending"
-            )
-            db.add(new_obs)
-            created_objs.append(new_obs)
+            rows.append({
+                "character_id": character_id,
+                "session_id": session_id,
+                "content": obs, # Store the full observation JSON
+                "confidence": 0.8, # Default confidence, could come from LLM
+                "status": "pending"
+            })
         
+        # One multi-row INSERT ... RETURNING instead of an ORM add() per observation
+        created_ids = CharacterObservation.bulk_create(db, rows)
         db.commit()
-        return created_objs
+        return created_ids
 
     def get_pending_observations(self, db: Session, character_id: int = None):
         """
@@ -54,43 +62,63 @@ class CharacterObservationService:
         if not obs:
             return False
 
-        character = db.query(Character).filter(Character.id == obs.character_id).first()
-        if not character:
-            return False
-
         # Merge logic
-        # For now, we append to a list or update keys in dynamic_profile
-        # Assuming dynamic_profile has a "observations" list or similar structure
-        profile = dict(character.dynamic_profile or {})
-        
-        # 1. Update Core Traits if category matches
-        category = obs.content.get("category")
-        observation_text = obs.content.get("observation")
-        
-        # Add to a structured "collected_observations" list in profile
-        if "collected_observations" not in profile:
-            profile["collected_observations"] = []
-        
-        profile["collected_observations"].append({
-            "category": category,
-            "text": observation_text,
-            "source_session": obs.session_id,
-            "date": str(obs.created_at)
-        })
-
-        # Update character profile
-        character.dynamic_profile = profile
+        # Append to the structured "collected_observations" list in dynamic_profile with SQL JSON operators:
+        # one UPDATE, the profile is never loaded, and concurrent approvals can't drop each other's entries
+        if not Character.append_profile_items(db, obs.character_id, "collected_observations", [self._collected_entry(obs)]):
+            db.rollback()
+            return False # character no longer exists
         
         # Mark observation as approved
         obs.status = "approved"
         
-        # Versioning handled by direct update here, or we should use character_service.update_character
-        # But for simplicity, we do direct commit here, maybe trigger version bump later if needed
-        character.version += 1
-        
         db.commit()
         return True
 
+    def approve_observations(self, db: Session, observation_ids: List[int]) -> Dict[str, List[int]]:
+        """
+        Bulk approve: all observations come from one IN query, each character gets a single
+        SQL-side append UPDATE, and the whole batch commits once.
+        Returns {"approved": [...], "skipped": [...]} (skipped = unknown id or missing character).
+        """
+        ids = set(observation_ids)
+        if not ids:
+            return {"approved": [], "skipped": []}
+
+        observations = (
+            db.query(CharacterObservation)
+            .filter(CharacterObservation.id.in_(ids))
+            .order_by(CharacterObservation.created_at, CharacterObservation.id)
+            .all()
+        )
+
+        # Group per character so each profile is patched once, in observation order
+        by_character: Dict[int, List[CharacterObservation]] = {}
+        for obs in observations:
+            by_character.setdefault(obs.character_id, []).append(obs)
+
+        approved = []
+        for character_id, char_obs in by_character.items():
+            entries = [self._collected_entry(obs) for obs in char_obs]
+            if not Character.append_profile_items(db, character_id, "collected_observations", entries):
+                continue # character no longer exists
+            for obs in char_obs:
+                obs.status = "approved"
+                approved.append(obs.id)
+
+        db.commit()
+        return {"approved": approved, "skipped": sorted(ids - set(approved))}
+
+    @staticmethod
+    def _collected_entry(obs: CharacterObservation) -> Dict[str, Any]:
+        """dynamic_profile["collected_observations"] entry for an approved observation."""
+        return {
+            "category": obs.content.get("category"),
+            "text": obs.content.get("observation"),
+            "source_session": obs.session_id,
+            "date": str(obs.created_at)
+        }
+
     def reject_observation(self, db: Session, observation_id: int):
         """
         Reject an observation.
@@ -1,3 +1,4 @@
+from string import Formatter
 from typing import Any, Dict
 from app.core.config import settings
 
@@ -14,6 +15,38 @@ class CharacterProfileFormatter:
             "no_habits": "- (暂无特定行为习惯)",
             "no_catchphrases": "- (暂无特定口头禅)"
         })
+        # 默认文案只解析一次
+        self.unknown_text = self.defaults.get("unknown", "未知")
+        self.no_habits = self.defaults.get("no_habits", "- (暂无特定行为习惯)")
+        self.no_catchphrases = self.defaults.get("no_catchphrases", "- (暂无特定口头禅)")
+
+        # 模板预解析: (literal, field, spec, conversion) 列表, 渲染时不再重复解析格式串
+        self._parts = list(Formatter().parse(self.template)) if self.template else []
+        self._fields = {field for _, field, _, _ in self._parts if field is not None}
+        # 含属性/下标访问或嵌套格式的字段交给 str.format_map 处理
+        self._simple = all(
+            field is None or (field.isidentifier() and "{" not in (spec or ""))
+            for _, field, spec, _ in self._parts
+        )
+
+    def _render(self, mapping: Dict[str, Any]) -> str:
+        """按预解析的模板片段拼接输出, 等价于 self.template.format_map(mapping)。"""
+        if not self._simple:
+            return self.template.format_map(mapping)
+        out = []
+        for literal, field, spec, conversion in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            value = mapping[field]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            elif conversion == "s":
+                value = str(value)
+            out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
 
     def format(self, character: Any) -> str:
         """
@@ -22,56 +55,37 @@ class CharacterProfileFormatter:
         attrs = character.attributes or {}
         profile = character.dynamic_profile or {}
         traits = character.traits or {}
-        
-        unknown_text = self.defaults.get("unknown", "未知")
-
-        # 提取关键字段
-        personality = profile.get('personality') or traits.get('personality', unknown_text)
-        tone = profile.get('tone') or traits.get('tone', unknown_text)
-        background = profile.get('background') or traits.get('background', unknown_text)
-        weakness = profile.get('weakness') or traits.get('weakness', unknown_text)
-        
-        behavior_habits = profile.get('behavior_habits') or traits.get('behavior_habits', [])
-        catchphrases = profile.get('catchphrase') or traits.get('catchphrase', [])
-        
-        # 列表处理
-        if isinstance(behavior_habits, str): behavior_habits = [behavior_habits]
-        if isinstance(catchphrases, str): catchphrases = [catchphrases]
-
-        # 构建 habits 文本
-        habits_lines = []
-        if behavior_habits:
-            for habit in behavior_habits:
-                habits_lines.append(f"- {habit}")
-        else:
-            habits_lines.append(self.defaults.get("no_habits"))
-        habits_str = "\n".join(habits_lines)
-
-        # 构建 catchphrases 文本
-        catchphrases_lines = []
-        if catchphrases:
-            for phrase in catchphrases:
-                catchphrases_lines.append(f"- 常说：“{phrase}”")
-        else:
-            catchphrases_lines.append(self.defaults.get("no_catchphrases"))
-        catchphrases_str = "\n".join(catchphrases_lines)
 
         # 如果模板为空（配置加载失败），使用默认硬编码逻辑（这里略去，假设配置存在，或者提供一个简单的fallback）
         if not self.template:
              # Fallback simple format
              return f"Name: {character.name}\nAttributes: {attrs}\nProfile: {profile}"
+        
+        unknown_text = self.unknown_text
 
-        return self.template.format(
-            name=character.name,
-            age=attrs.get('age', unknown_text),
-            occupation=attrs.get('occupation', unknown_text),
-            role=attrs.get('role', unknown_text),
-            personality=personality,
-            tone=tone,
-            background=background,
-            weakness=weakness,
-            habits=habits_str,
-            catchphrases=catchphrases_str
-        )
+        # 提取关键字段
+        mapping = {
+            "name": character.name,
+            "age": attrs.get('age', unknown_text),
+            "occupation": attrs.get('occupation', unknown_text),
+            "role": attrs.get('role', unknown_text),
+            "personality": profile.get('personality') or traits.get('personality', unknown_text),
+            "tone": profile.get('tone') or traits.get('tone', unknown_text),
+            "background": profile.get('background') or traits.get('background', unknown_text),
+            "weakness": profile.get('weakness') or traits.get('weakness', unknown_text),
+        }
+
+        # 列表字段仅在模板引用时才构建
+        if "habits" in self._fields:
+            behavior_habits = profile.get('behavior_habits') or traits.get('behavior_habits', [])
+            if isinstance(behavior_habits, str): behavior_habits = [behavior_habits]
+            mapping["habits"] = "\n".join(f"- {habit}" for habit in behavior_habits) or self.no_habits
+
+        if "catchphrases" in self._fields:
+            catchphrases = profile.get('catchphrase') or traits.get('catchphrase', [])
+            if isinstance(catchphrases, str): catchphrases = [catchphrases]
+            mapping["catchphrases"] = "\n".join(f"- 常说：“{phrase}”" for phrase in catchphrases) or self.no_catchphrases
+
+        return self._render(mapping)
 
 character_formatter = CharacterProfileFormatter()
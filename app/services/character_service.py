@@ -1,7 +1,31 @@
-from sqlalchemy.orm import Session
+import threading
+import time
+from typing import Tuple
+from sqlalchemy import bindparam, case, insert, select, update
+from sqlalchemy.orm import Session, aliased, selectinload
 from sqlalchemy.sql import func
 from app.models.sql_models import Character, CharacterVersion, Relationship
 from app.models.domain_schemas import CharacterCreate, CharacterUpdate, RelationshipCreate
+from app.services.character_cache import character_cache
+
+class CharacterVersionConflict(Exception):
+    """The character changed (version bumped) between read and write; the caller should re-read and retry."""
+
+# Lightweight (id, name) roster, memoized on a counter every roster-changing write in this process bumps;
+# the TTL bounds staleness of writes made by other workers (same policy as character_cache)
+ROSTER_TTL = 300
+_roster_lock = threading.Lock()
+_roster_version = 0
+_roster_cache: Tuple[int, float, Tuple[Tuple[int, str], ...]] = (-1, 0.0, ())
+
+def _clamp(expr, low: int, high: int):
+    """Portable SQL clamp (GREATEST/LEAST are PostgreSQL-only; SQLite spells them max/min)."""
+    return case((expr < low, low), (expr > high, high), else_=expr)
+
+def _bump_roster_version():
+    global _roster_version
+    with _roster_lock:
+        _roster_version += 1
 
 class CharacterService:
     """
@@ -13,19 +37,52 @@ class CharacterService:
     3. 关系管理 (Relationship Management): 管理角色之间的社交关系图谱。
     """
 
-    def get_character(self, db: Session, character_id: int):
-        """根据ID获取角色对象"""
-        return db.query(Character).filter(Character.id == character_id).first()
+    # One "WHERE ... IN (...)" batch per collection, regardless of how many characters are loaded
+    _RELATION_LOADERS = (
+        selectinload(Character.events),
+        selectinload(Character.relationships_as_source),
+        selectinload(Character.relationships_as_target),
+    )
+
+    def get_character(self, db: Session, character_id: int, with_relations: bool = False):
+        """根据ID获取角色对象 (with_relations=True 时一并预加载事件与关系)"""
+        query = db.query(Character)
+        if with_relations:
+            query = query.options(*self._RELATION_LOADERS)
+        return query.filter(Character.id == character_id).first()
+
+    def get_characters(self, db: Session, skip: int = 0, limit: int = 100, with_relations: bool = False):
+        """分页获取角色列表 (with_relations=True 时用 selectin 批量预加载，避免逐个角色懒加载的 N+1 查询)"""
+        query = db.query(Character)
+        if with_relations:
+            query = query.options(*self._RELATION_LOADERS)
+        return query.offset(skip).limit(limit).all()
 
-    def get_characters(self, db: Session, skip: int = 0, limit: int = 100):
-        """分页获取角色列表"""
-        return db.query(Character).offset(skip).limit(limit).all()
+    def get_roster_lite(self, db: Session) -> Tuple[Tuple[int, str], ...]:
+        """
+        所有角色的 (id, name) 列表, 按 id 排序。
+        只查两列 (不做 ORM 实例化, 不传输/解析 JSON 列), 结果在角色增删改之前一直复用;
+        未变化时返回同一个对象, 调用方可按身份判断是否需要重建派生索引。
+        """
+        global _roster_cache
+        with _roster_lock:
+            version = _roster_version
+            cached_version, loaded_at, roster = _roster_cache
+        if cached_version == version and time.monotonic() - loaded_at < ROSTER_TTL:
+            return roster
+
+        roster = tuple((row.id, row.name) for row in db.query(Character.id, Character.name).order_by(Character.id))
+        with _roster_lock:
+            if _roster_version == version: # a write during the query makes this result stale; don't keep it
+                _roster_cache = (version, time.monotonic(), roster)
+        return roster
 
     def create_character(self, db: Session, character: CharacterCreate):
         """创建新角色"""
         db_character = Character(**character.dict())
         db.add(db_character)
         db.commit()
+        _bump_roster_version()
         db.refresh(db_character)
         return db_character
 
@@ -40,10 +97,14 @@ class CharacterService:
             
         Returns:
             Character: 更新后的角色对象，版本号+1
+
+        Raises:
+            CharacterVersionConflict: 读取后角色已被其他写入者更新 (乐观锁校验失败)
         """
         db_character = self.get_character(db, character_id)
         if not db_character:
             return None
+        expected_version = db_character.version
         
         # 归档当前版本 (Archive current version)
         version_entry = CharacterVersion(
@@ -55,14 +116,21 @@ class CharacterService:
         )
         db.add(version_entry)
         
-        # 更新字段 (Update fields)
+        # 更新字段 + 版本号在同一条 UPDATE 中完成 (SQL-side version = version + 1, optimistic check on the read version)
         update_data = character.dict(exclude_unset=True, exclude={'version_note'})
-        for key, value in update_data.items():
-            setattr(db_character, key, value)
-        
-        db_character.version += 1
+        update_data[Character.version] = Character.version + 1
+        updated = db.query(Character).filter(
+            Character.id == character_id,
+            Character.version == expected_version if expected_version is not None else Character.version.is_(None),
+        ).update(update_data, synchronize_session=False)
+        if not updated:
+            db.rollback()
+            raise CharacterVersionConflict(f"Character {character_id} was modified concurrently")
         
         db.commit()
+        character_cache.invalidate(character_id)
+        if "name" in update_data:
+            _bump_roster_version()
         db.refresh(db_character)
         return db_character
 
@@ -73,13 +141,15 @@ class CharacterService:
             return False
         
         # 1. 删除关联关系 (Delete Relationships - Cascading)
-        db.query(Relationship).filter(
-            (Relationship.source_id == character_id) | (Relationship.target_id == character_id)
-        ).delete(synchronize_session=False)
+        # Two index-backed deletes in the same transaction instead of one OR predicate (table scan)
+        db.query(Relationship).filter(Relationship.source_id == character_id).delete(synchronize_session=False)
+        db.query(Relationship).filter(Relationship.target_id == character_id).delete(synchronize_session=False)
         
         # 2. 删除角色本体 (Delete Character)
         db.delete(db_character)
         db.commit()
+        character_cache.invalidate(character_id)
+        _bump_roster_version()
         return True
 
     def create_relationship(self, db: Session, relation: RelationshipCreate):
@@ -92,10 +162,42 @@ class CharacterService:
 
     def get_relationships(self, db: Session, character_id: int):
         """获取某角色的所有关系（作为源或目标）"""
-        # Naive implementation, could be optimized
-        return db.query(Relationship).filter(
-            (Relationship.source_id == character_id) | (Relationship.target_id == character_id)
+        # UNION ALL of two index seeks; the second half skips self-loops already returned by the first
+        as_source = db.query(Relationship).filter(Relationship.source_id == character_id)
+        as_target = db.query(Relationship).filter(
+            Relationship.target_id == character_id, Relationship.source_id != character_id
+        )
+        return as_source.union_all(as_target).all()
+
+    def get_relationships_with_names(self, db: Session, character_ids) -> dict:
+        """
+        批量获取多个角色的关系及对端角色名: {character_id: [(Relationship, other_name), ...]}。
+        一次查询 (两段索引 IN + UNION ALL, 双向 JOIN 角色名) 代替逐角色、逐关系查询。
+        """
+        ids = set(character_ids)
+        grouped = {char_id: [] for char_id in ids}
+        if not ids:
+            return grouped
+
+        src, tgt = aliased(Character), aliased(Character)
+        def query(*criteria):
+            return (
+                db.query(Relationship, src.name, tgt.name)
+                .outerjoin(src, Relationship.source_id == src.id)
+                .outerjoin(tgt, Relationship.target_id == tgt.id)
+                .filter(*criteria)
+            )
+        # Second half only returns edges the first half missed, so no row comes back twice
+        rows = query(Relationship.source_id.in_(ids)).union_all(
+            query(Relationship.target_id.in_(ids), Relationship.source_id.not_in(ids))
         ).all()
+
+        for rel, src_name, tgt_name in rows:
+            if rel.source_id in ids:
+                grouped[rel.source_id].append((rel, tgt_name))
+            if rel.target_id in ids and rel.target_id != rel.source_id:
+                grouped[rel.target_id].append((rel, src_name))
+        return grouped
     
     def get_all_relationships(self, db: Session):
         """获取系统内所有关系"""
@@ -134,45 +236,45 @@ class CharacterService:
         Dynamically update relationship strength and sentiment based on names.
         Creates relationship if it doesn't exist.
         """
-        # 1. Find characters
-        source = db.query(Character).filter(Character.name == source_name).first()
-        target = db.query(Character).filter(Character.name == target_name).first()
+        # 1. Find characters (both names in one IN query)
+        ids = self._ids_by_name(db, {source_name, target_name})
+        source_id, target_id = ids.get(source_name), ids.get(target_name)
         
-        if not source or not target:
+        if not source_id or not target_id:
             return None
             
-        # 2. Find Relationship
-        # Check both directions or just one? Usually relationships are directed graph edges here?
-        # Model has source_id and target_id.
-        rel = db.query(Relationship).filter(
-            Relationship.source_id == source.id,
-            Relationship.target_id == target.id
-        ).first()
-        
-        if not rel:
-            # Create new if not exists
-            rel = Relationship(
-                source_id=source.id,
-                target_id=target.id,
-                relation_type="Unknown",
-                strength=5,
-                sentiment=0
-            )
-            db.add(rel)
-        
-        # 3. Update values
-        # Clamp values: Strength 1-10, Sentiment -5 to 5
+        # 2. Update in place: one atomic UPDATE ... RETURNING, clamped SQL-side
+        # (Strength 1-10, Sentiment -5 to 5), so concurrent deltas can't overwrite each other.
+        # No unique (source_id, target_id) constraint to ON CONFLICT against: like the old .first(),
+        # only the oldest edge of the pair is touched.
+        values = {Relationship.last_updated: func.now()}
         if strength_delta:
-            new_strength = (rel.strength or 5) + strength_delta
-            rel.strength = max(1, min(10, new_strength))
-            
+            values[Relationship.strength] = _clamp(func.coalesce(Relationship.strength, 5) + strength_delta, 1, 10)
         if sentiment_delta:
-            new_sentiment = (rel.sentiment or 0) + sentiment_delta
-            rel.sentiment = max(-5, min(5, new_sentiment))
-            
-        rel.last_updated = func.now()
+            values[Relationship.sentiment] = _clamp(func.coalesce(Relationship.sentiment, 0) + sentiment_delta, -5, 5)
+        oldest = (
+            select(func.min(Relationship.id))
+            .where(Relationship.source_id == source_id, Relationship.target_id == target_id)
+            .scalar_subquery()
+        )
+        rel = db.scalars(
+            update(Relationship).where(Relationship.id == oldest).values(values).returning(Relationship),
+            execution_options={"synchronize_session": False},
+        ).first()
+        
+        if rel is None:
+            # 3. Create new if not exists
+            rel = db.scalars(
+                insert(Relationship).values(
+                    source_id=source_id,
+                    target_id=target_id,
+                    relation_type="Unknown",
+                    strength=max(1, min(10, 5 + (strength_delta or 0))),
+                    sentiment=max(-5, min(5, 0 + (sentiment_delta or 0))),
+                    last_updated=func.now(),
+                ).returning(Relationship)
+            ).one()
         db.commit()
-        db.refresh(rel)
         return rel
 
     def import_data(self, db: Session, data: dict):
@@ -186,106 +288,120 @@ class CharacterService:
         }
         """
         results = {"characters": 0, "relationships": 0, "errors": []}
-        char_name_to_id = {}
-        
-        # 1. Import Characters
-        chars = data.get("characters", [])
+
+        # 1. Validate input rows (per-row errors are reported, the row is skipped)
         # Support pure list format for backward compatibility or simple character list import
         if isinstance(data, list):
-            chars = data
-            
+            chars, rels = data, []
+        else:
+            chars, rels = data.get("characters", []), data.get("relationships", [])
+
+        char_rows = {} # name -> fields; a later entry for the same name wins, as with sequential updates
         for char_data in chars:
             try:
                 name = char_data.get("name")
                 if not name: continue
-                
-                # Check if exists
-                existing = db.query(Character).filter(Character.name == name).first()
-                
-                # Prepare data fields
-                update_data = {
+                char_rows[name] = {
                     "attributes": char_data.get("attributes", {}),
                     "traits": char_data.get("traits", {}),
                     "dynamic_profile": char_data.get("dynamic_profile", {})
                 }
-                
-                if existing:
-                    # Update existing
-                    for k, v in update_data.items():
-                        setattr(existing, k, v)
-                    db.commit()
-                    char_name_to_id[name] = existing.id
-                else:
-                    # Create new
-                    new_char = Character(
-                        name=name,
-                        **update_data
-                    )
-                    db.add(new_char)
-                    db.commit()
-                    db.refresh(new_char)
-                    char_name_to_id[name] = new_char.id
                 results["characters"] += 1
             except Exception as e:
-                db.rollback()
-                results["errors"].append(f"Character {char_data.get('name')}: {str(e)}")
-        
-        # 2. Import Relationships
-        rels = data.get("relationships", [])
+                results["errors"].append(f"Character {char_data}: {str(e)}")
+
+        rel_rows = []
         for rel_data in rels:
             try:
-                src_name = rel_data.get("source")
-                tgt_name = rel_data.get("target")
-                
-                # Resolve IDs (Prioritize current import, then DB lookup)
-                src_id = char_name_to_id.get(src_name)
-                if not src_id:
-                    c = db.query(Character).filter(Character.name == src_name).first()
-                    if c: src_id = c.id
-                
-                tgt_id = char_name_to_id.get(tgt_name)
-                if not tgt_id:
-                    c = db.query(Character).filter(Character.name == tgt_name).first()
-                    if c: tgt_id = c.id
-                    
+                # Exports of the nullable columns carry explicit nulls: treat them as the defaults
+                strength, sentiment = rel_data.get("strength"), rel_data.get("sentiment")
+                rel_rows.append({
+                    "source": rel_data.get("source"),
+                    "target": rel_data.get("target"),
+                    "relation_type": rel_data.get("relation") or rel_data.get("relation_type") or "Unknown",
+                    "details": rel_data.get("details", {}),
+                    # Clamp to the column CHECK ranges: Strength 1-10, Sentiment -5 to 5
+                    "strength": max(1, min(10, int(5 if strength is None else strength))),
+                    "sentiment": max(-5, min(5, int(0 if sentiment is None else sentiment))),
+                })
+            except Exception as e:
+                results["errors"].append(f"Relationship {rel_data}: {str(e)}")
+
+        # 2. Characters: one IN lookup, then one executemany UPDATE and one INSERT ... RETURNING
+        try:
+            char_name_to_id = self._ids_by_name(db, set(char_rows) | {r[k] for r in rel_rows for k in ("source", "target")})
+
+            table = Character.__table__
+            to_update = [
+                {"b_id": char_name_to_id[name], **fields} for name, fields in char_rows.items() if name in char_name_to_id
+            ]
+            if to_update:
+                db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"))
+                    .values(version=table.c.version + 1), # keeps (id, version)-keyed caches honest
+                    to_update,
+                )
+                character_cache.invalidate_on_commit(db, *(row["b_id"] for row in to_update))
+
+            to_insert = [{"name": name, **fields} for name, fields in char_rows.items() if name not in char_name_to_id]
+            if to_insert:
+                created = db.execute(
+                    insert(Character).returning(Character.id, Character.name, sort_by_parameter_order=True), to_insert
+                )
+                char_name_to_id.update({name: char_id for char_id, name in created})
+
+            # 3. Relationships: resolve ids in memory, fetch existing edges in one query, bulk update + bulk insert
+            edges = {} # (src_id, tgt_id) -> fields; later duplicates win
+            for row in rel_rows:
+                src_id = char_name_to_id.get(row["source"])
+                tgt_id = char_name_to_id.get(row["target"])
                 if not src_id or not tgt_id:
-                    results["errors"].append(f"Relationship {src_name}->{tgt_name}: Character not found")
+                    results["errors"].append(f"Relationship {row['source']}->{row['target']}: Character not found")
                     continue
-                
-                # Check existing relationship
-                existing_rel = db.query(Relationship).filter(
-                    Relationship.source_id == src_id,
-                    Relationship.target_id == tgt_id
-                ).first()
-                
-                relation_type = rel_data.get("relation") or rel_data.get("relation_type") or "Unknown"
-                details = rel_data.get("details", {})
-                strength = rel_data.get("strength", 5)
-                sentiment = rel_data.get("sentiment", 0)
-                
-                if existing_rel:
-                    existing_rel.relation_type = relation_type
-                    existing_rel.details = details
-                    existing_rel.strength = strength
-                    existing_rel.sentiment = sentiment
-                else:
-                    new_rel = Relationship(
-                        source_id=src_id,
-                        target_id=tgt_id,
-                        relation_type=relation_type,
-                        details=details,
-                        strength=strength,
-                        sentiment=sentiment
-                    )
-                    db.add(new_rel)
-                
-                db.commit()
+                edges[(src_id, tgt_id)] = {k: row[k] for k in ("relation_type", "details", "strength", "sentiment")}
                 results["relationships"] += 1
-            except Exception as e:
-                 db.rollback()
-                 results["errors"].append(f"Relationship {rel_data}: {str(e)}")
-                 
+
+            existing_rel_ids = {}
+            if edges:
+                # No unique (source_id, target_id) constraint to upsert against; like the old .first(), the oldest edge is updated
+                for rel_id, src_id, tgt_id in (
+                    db.query(Relationship.id, Relationship.source_id, Relationship.target_id)
+                    .filter(Relationship.source_id.in_({src for src, _ in edges}))
+                    .order_by(Relationship.id.desc())
+                ):
+                    if (src_id, tgt_id) in edges:
+                        existing_rel_ids[(src_id, tgt_id)] = rel_id
+
+            rel_updates = [{"id": existing_rel_ids[pair], **fields} for pair, fields in edges.items() if pair in existing_rel_ids]
+            if rel_updates:
+                db.execute(update(Relationship), rel_updates) # ORM bulk UPDATE by primary key
+            rel_inserts = [
+                {"source_id": src, "target_id": tgt, **fields} for (src, tgt), fields in edges.items() if (src, tgt) not in existing_rel_ids
+            ]
+            if rel_inserts:
+                db.execute(insert(Relationship), rel_inserts)
+
+            db.commit()
+            if to_insert:
+                _bump_roster_version()
+        except Exception as e:
+            db.rollback()
+            results["characters"] = results["relationships"] = 0
+            results["errors"].append(f"Import failed, nothing was written: {str(e)}")
+
         return results
 
+    @staticmethod
+    def _ids_by_name(db: Session, names: set) -> dict:
+        """name -> id for existing characters in one IN query (oldest wins for duplicate names, like .first())."""
+        if not names:
+            return {}
+        return {
+            name: char_id
+            for char_id, name in db.query(Character.id, Character.name)
+            .filter(Character.name.in_(names))
+            .order_by(Character.id.desc())
+        }
 
 character_service = CharacterService()
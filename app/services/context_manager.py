@@ -4,12 +4,56 @@ from typing import List, Dict, Any
 from sqlalchemy.orm import Session
 from app.models.sql_models import ConversationSession, Relationship, DialogueLog, Scenario
 from app.services.character_service import character_service
+from app.services.character_cache import character_cache
 from app.services.scenario_service import scenario_service
 from app.services.knowledge import knowledge_service
 from app.core.config import settings
 from app.utils.logger import logger
 
-from app.services.character_profile_formatter import character_formatter
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# 标准输入格式 "【Speaker】说：Content", 模块加载时编译一次
+# [^】]* 不会越过第一个 】, 匹配无回溯, 对任意输入都是线性时间
+_SPEAKER_RE = re.compile(r"^【([^】]*)】说：(.*)$", re.DOTALL)
+
+# Standalone numbers in the text, matched against character ids (same as re.search(rf"\b{id}\b"))
+_ID_TOKEN_RE = re.compile(r"\b(\d+)\b")
+
+class CharacterNameMatcher:
+    """
+    Finds every character mentioned in a text (by name substring or standalone id) in one pass:
+    an Aho-Corasick automaton over all names reports overlapping hits in O(len(text) + matches).
+    Without pyahocorasick it falls back to one substring test per distinct name.
+    """
+
+    def __init__(self, roster):
+        # roster: [(id, name), ...]; result order follows it
+        self.order = {char_id: pos for pos, (char_id, _) in enumerate(roster)}
+        self.ids_by_name: Dict[str, List[int]] = {}
+        for char_id, name in roster:
+            if name and name.strip():
+                self.ids_by_name.setdefault(name, []).append(char_id)
+
+        self.automaton = None
+        if HAS_AHOCORASICK and self.ids_by_name:
+            self.automaton = ahocorasick.Automaton()
+            for name in self.ids_by_name:
+                self.automaton.add_word(name, name)
+            self.automaton.make_automaton()
+
+    def find(self, text: str) -> List[int]:
+        if self.automaton is not None:
+            names = {name for _, name in self.automaton.iter(text)}
+        else:
+            names = {name for name in self.ids_by_name if name in text}
+        hits = {char_id for name in names for char_id in self.ids_by_name[name]}
+        hits.update(int(token) for token in _ID_TOKEN_RE.findall(text) if int(token) in self.order)
+        return sorted(hits, key=self.order.__getitem__)
 
 class ContextManager:
     """
@@ -22,6 +66,17 @@ class ContextManager:
     4. 提示词组装 (Prompt Assembly): 为LLM构建最终的系统提示词和上下文。
     """
 
+    def __init__(self):
+        # 角色名匹配器只在角色名单变化时重建 (get_roster_lite 未变化时返回同一对象)
+        self._name_matcher: CharacterNameMatcher = None
+        self._name_matcher_roster: tuple = None
+
+    def _get_name_matcher(self, roster) -> CharacterNameMatcher:
+        if roster is not self._name_matcher_roster:
+            self._name_matcher = CharacterNameMatcher(roster)
+            self._name_matcher_roster = roster
+        return self._name_matcher
+
     def parse_speaker_and_content(self, input_text: str) -> tuple[str, str]:
         """
         解析标准输入格式 "【Speaker】说：Content"
@@ -32,7 +87,7 @@ class ContextManager:
         Returns:
             tuple[str, str]: (说话人姓名, 实际说话内容)。如果未匹配，返回 (None, 原始文本)
         """
-        match = re.match(r"^【(.*?)】说：(.*)$", input_text, re.DOTALL)
+        match = _SPEAKER_RE.match(input_text)
         if match:
             return match.group(1), match.group(2)
         return None, input_text
@@ -73,37 +128,46 @@ class ContextManager:
         # (A) 用户显式选中的对话对象
         # (B) 当前正在说话的角色 (如果是角色扮演模式)
         # (C) 文本中提到的其他角色 (被动提及)
-        all_chars = character_service.get_characters(db, limit=1000)
+        # 只取 (id, name) 名单 (进程内缓存); 命中的角色再从 character_cache 批量取快照
+        roster = character_service.get_roster_lite(db)
         mentioned_chars = []
         
         # (A) 显式选中的角色 (Frontend selection)
         selected_char = None
         if session.character_id:
-            selected_char = character_service.get_character(db, session.character_id)
+            # Read-only snapshot from the process-local cache (saves a SELECT per turn)
+            selected_char = character_cache.get(db, session.character_id)
             if selected_char:
                 mentioned_chars.append(selected_char)
 
         # (B) 识别说话者角色对象 (Identify Speaker Character Object)
         current_speaker_char = None
+        speaker_id = None
         if speaker_name:
-            # 根据名字查找角色对象
-            for c in all_chars:
-                if c.name == speaker_name:
-                    current_speaker_char = c
-                    # 如果尚未添加，则加入提及列表
-                    if not any(mc.id == c.id for mc in mentioned_chars):
-                        mentioned_chars.append(c)
-                    break
+            # 根据名字查找角色 ID
+            speaker_id = next((char_id for char_id, name in roster if name == speaker_name), None)
         
         # (C) 动态提取提及的角色 (Dynamically extracted characters from text)
         # 简单的关键词匹配：如果名字出现在文本中，认为该角色在场或被提及
         # 例如: "飞飞飞" in "飞飞飞是谁" -> True
-        for c in all_chars:
-            if any(mc.id == c.id for mc in mentioned_chars):
+        # 所有角色名一次扫描 (Aho-Corasick), 不再逐角色做子串查找和正则编译
+        mentioned_ids = self._get_name_matcher(roster).find(actual_content)
+        # (B) 的说话者与 (C) 的提及角色一次批量取快照
+        snapshots = character_cache.get_many(db, [speaker_id, *mentioned_ids])
+
+        if speaker_id is not None:
+            current_speaker_char = snapshots.get(speaker_id)
+            # 如果尚未添加，则加入提及列表
+            if current_speaker_char and not any(mc.id == speaker_id for mc in mentioned_chars):
+                mentioned_chars.append(current_speaker_char)
+
+        already = {mc.id for mc in mentioned_chars}
+        for char_id in mentioned_ids:
+            c = snapshots.get(char_id)
+            if c is None or char_id in already:
                 continue
-            if (c.name and c.name.strip() and c.name in actual_content) or re.search(rf"\b{c.id}\b", actual_content):
-                mentioned_chars.append(c)
-                logger.info(f"ContextManager: Detected character '{c.name}' (ID: {c.id}) in user input.")
+            mentioned_chars.append(c)
+            logger.info(f"ContextManager: Detected character '{c.name}' (ID: {c.id}) in user input.")
 
         # 3. 构建“对话舞台”状态 (Build Dialogue Stage State)
         # 这一步是为了让LLM理解“刚才发生了什么”以及“谁在场”。
@@ -114,7 +178,8 @@ class ContextManager:
         if session.id and session.id != "ephemeral":
             # 获取最近的对话日志，用于分析活跃角色
             # 增加limit以确保能捕捉到较早之前的参与者
-            recent_logs = db.query(DialogueLog).filter(
+            # 只取 user_input 一列 (ix_dlg_session_created 反向扫描), 不实例化整行 ORM 对象
+            recent_logs = db.query(DialogueLog.user_input).filter(
                 DialogueLog.session_id == session.id
             ).order_by(DialogueLog.created_at.desc()).limit(30).all()
             
@@ -165,7 +230,8 @@ class ContextManager:
         rel_context = []
         
         # (A) 角色档案上下文 (Character Context)
-        # 为所有相关角色生成详细的档案描述
+        # 为所有相关角色生成详细的档案描述; 所有角色的关系及对端姓名一次查询取回
+        relationships = character_service.get_relationships_with_names(db, [c.id for c in mentioned_chars])
         for char in mentioned_chars:
             # 基础信息
             char_info = f"【角色档案 (ID:{char.id})】\n姓名: {char.name}\n性格: {char.attributes.get('personality', '未知')}\n特征: {char.traits}"
@@ -177,14 +243,12 @@ class ContextManager:
             char_info_context.append(char_info)
             
             # 关系网络 (Relationships): 该角色与其他角色的关系
-            rels = character_service.get_relationships(db, char.id)
+            rels = relationships.get(char.id)
             if rels:
-                rel_strs = []
-                for r in rels:
-                    target_id = r.target_id if r.source_id == char.id else r.source_id
-                    target = character_service.get_character(db, target_id)
-                    target_name = target.name if target else "Unknown"
-                    rel_strs.append(f"- 与 {target_name}: {r.relation_type} ({r.details})")
+                rel_strs = [
+                    f"- 与 {target_name or 'Unknown'}: {r.relation_type} ({r.details})"
+                    for r, target_name in rels
+                ]
                 rel_context.append(f"【{char.name} 的社会关系】\n" + "\n".join(rel_strs))
 
         # (B) RAG 知识检索 (Knowledge Retrieval)
@@ -95,18 +95,32 @@ class FeedbackService:
         if event_date:
             try:
                 event_payload["event_date"] = datetime.datetime.fromisoformat(event_date)
-            except Exception:
-                event_payload["event_date"] = event_date
+            except ValueError:
+                # Unparseable dates would be stored as text and break range scans; keep the server default instead
+                logger.warning(f"Ignoring invalid event_date: {event_date}")
         event = CharacterEvent(**event_payload)
         db.add(event)
         db.commit()
         db.refresh(event)
         return event
     
-    def get_character_timeline(self, db: Session, character_id: int, limit: int = 50) -> list[CharacterEvent]:
+    def get_character_timeline(
+        self,
+        db: Session,
+        character_id: int,
+        limit: int = 50,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> list[CharacterEvent]:
         """
         Get events for a character, ordered by date desc.
+        Optional [start, end) bounds are served as a range scan on ix_evt_char_date (character_id, event_date).
         """
-        return db.query(CharacterEvent).filter(CharacterEvent.character_id == character_id).order_by(CharacterEvent.event_date.desc()).limit(limit).all()
+        query = db.query(CharacterEvent).filter(CharacterEvent.character_id == character_id)
+        if start is not None:
+            query = query.filter(CharacterEvent.event_date >= start)
+        if end is not None:
+            query = query.filter(CharacterEvent.event_date < end)
+        return query.order_by(CharacterEvent.event_date.desc()).limit(limit).all()
 
 feedback_service = FeedbackService()
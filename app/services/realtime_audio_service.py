@@ -15,7 +15,7 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 from concurrent.futures import ThreadPoolExecutor
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer_group
 from app.core.database import SessionLocal
 from app.models.sql_models import ConversationSegment, Character
 from app.services.audio_service import AudioService
@@ -187,12 +187,8 @@ class RealtimeAudioService:
             await loop.run_in_executor(None, save_wav)
             
             # 2. STT & Diarization (Blocking CPU/GPU)
-            # Use run_in_executor to avoid blocking the event loop
-            stt_result = await loop.run_in_executor(
-                None, 
-                self.audio_service.transcribe_with_diarization, 
-                str(temp_path)
-            )
+            # Runs on AudioService's bounded STT pool to avoid blocking the event loop
+            stt_result = await self.audio_service.transcribe_with_diarization_async(str(temp_path))
             
             if "error" in stt_result and stt_result["text"] == "":
                  logger.warning(f"STT failed: {stt_result['error']}")
@@ -296,7 +292,7 @@ class RealtimeAudioService:
         """
         db: Session = SessionLocal()
         try:
-            seg = db.query(ConversationSegment).filter(ConversationSegment.id == segment_id).first()
+            seg = db.query(ConversationSegment).options(undefer_group("payload")).filter(ConversationSegment.id == segment_id).first()
             if not seg:
                 return False, "Segment not found"
             
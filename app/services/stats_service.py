@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.core.database import engine
+from app.models.sql_models import DialogueLog, character_stats_view
+from app.utils.logger import logger
+
+class StatsService:
+    """
+    Per-character / per-scenario dialogue rollups (turn count, avg rating, avg latency, token totals).
+    On PostgreSQL reads the mv_character_stats materialized view (bounded staleness);
+    other backends aggregate dialogue_logs live.
+    """
+
+    def _live_stats(self, db: Session) -> List[Dict[str, Any]]:
+        rows = db.execute(
+            select(
+                DialogueLog.character_id,
+                DialogueLog.scenario_id,
+                func.count().label("n"),
+                func.avg(DialogueLog.rating).label("avg_rating"),
+                func.avg(DialogueLog.latency_ms).label("avg_latency"),
+                func.sum(DialogueLog.tokens_used).label("tokens"),
+            ).group_by(DialogueLog.character_id, DialogueLog.scenario_id)
+        ).mappings().all()
+        return [dict(r) for r in rows]
+
+    def get_character_stats(self, db: Session) -> Dict[str, Any]:
+        if db.bind.dialect.name == "postgresql":
+            try:
+                rows = db.execute(select(character_stats_view)).mappings().all()
+                refreshed = max((r["refreshed_at"] for r in rows if r["refreshed_at"]), default=None)
+                staleness = (datetime.now(timezone.utc) - refreshed).total_seconds() if refreshed else None
+                return {
+                    "staleness_seconds": staleness,
+                    "stats": [{k: v for k, v in r.items() if k != "refreshed_at"} for r in rows],
+                }
+            except Exception as e:
+                # View not created yet (scripts/migrate_v10.py) -> fall back to a live aggregate
+                logger.warning("mv_character_stats unavailable, aggregating live: {}", e)
+                db.rollback()
+
+        return {"staleness_seconds": 0.0, "stats": self._live_stats(db)}
+
+    def refresh(self):
+        """REFRESH ... CONCURRENTLY keeps the view readable while it rebuilds (needs its unique index)."""
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_character_stats"))
+
+    async def refresh_loop(self, interval: float):
+        """Background refresher started from app startup (PostgreSQL only)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+                logger.debug("Refreshed mv_character_stats")
+            except Exception as e:
+                logger.error("Failed to refresh mv_character_stats: {}", e)
+
+stats_service = StatsService()
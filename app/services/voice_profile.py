@@ -5,6 +5,12 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from app.utils.logger import logger
 
+try:
+    import faiss
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
 class VoiceProfileService:
     """
     Service for managing voice profiles (Speaker ID).
@@ -14,6 +20,8 @@ class VoiceProfileService:
     def __init__(self, data_path: str = "data/voice_profiles.json"):
         self.data_path = Path(data_path)
         self.profiles: Dict[str, Dict] = {}  # { "uuid": { "name": "User", "fingerprint": [0.1, ...] } }
+        # dim -> (profile ids, (N, dim) float32 unit-norm fingerprint matrix); rebuilt lazily after any change
+        self._fp_matrices: Dict[int, Tuple[List[str], np.ndarray]] = {}
         self._load_profiles()
 
     def _load_profiles(self):
@@ -23,6 +31,7 @@ class VoiceProfileService:
             self._save_profiles()  # Create empty file
             return
 
+        self._fp_matrices.clear()
         try:
             with open(self.data_path, "r", encoding="utf-8") as f:
                 self.profiles = json.load(f)
@@ -33,12 +42,34 @@ class VoiceProfileService:
 
     def _save_profiles(self):
         """Save profiles to JSON file."""
+        self._fp_matrices.clear() # every mutation goes through here
         try:
             with open(self.data_path, "w", encoding="utf-8") as f:
                 json.dump(self.profiles, f, ensure_ascii=False, indent=2)
         except Exception as e:
             logger.error(f"Failed to save voice profiles: {e}")
 
+    def _profile_matrix(self, dim: int) -> Tuple[List[str], np.ndarray]:
+        """Ids and L2-normalized fingerprints of every profile with `dim` dimensions (zero vectors stay zero)."""
+        cached = self._fp_matrices.get(dim)
+        if cached is None:
+            ids = [pid for pid, data in self.profiles.items() if len(data.get("fingerprint") or []) == dim]
+            matrix = np.asarray([self.profiles[pid]["fingerprint"] for pid in ids], dtype=np.float32).reshape(len(ids), dim)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            cached = self._fp_matrices[dim] = (ids, matrix)
+        return cached
+
+    def _best_match(self, fingerprint: List[float]) -> Tuple[Optional[str], float]:
+        """Closest profile by cosine similarity: one GEMV over the cached matrix. (None, -1.0) if nothing comparable."""
+        query = np.asarray(fingerprint, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        ids, matrix = self._profile_matrix(query.shape[0])
+        if not ids or norm == 0 or not np.isfinite(norm):
+            return None, -1.0
+        sims = matrix @ (query / norm)
+        best = int(sims.argmax())
+        return ids[best], float(sims[best])
+
     def identify_speaker(self, fingerprint: List[float], threshold: float = 0.85) -> Tuple[str, str, bool]:
         """
         Identify speaker from fingerprint.
@@ -47,27 +78,8 @@ class VoiceProfileService:
         if not fingerprint or len(fingerprint) == 0:
             return "unknown", "Unknown", False
 
-        query_vec = np.array(fingerprint)
-        best_score = -1.0
-        best_id = None
-        
-        # 1. Compare with existing profiles (Cosine Similarity)
-        for pid, data in self.profiles.items():
-            stored_vec = np.array(data["fingerprint"])
-            if stored_vec.shape != query_vec.shape:
-                continue
-                
-            # Cosine Similarity: (A . B) / (||A|| * ||B||)
-            norm_q = np.linalg.norm(query_vec)
-            norm_s = np.linalg.norm(stored_vec)
-            if norm_q == 0 or norm_s == 0:
-                continue
-                
-            score = np.dot(query_vec, stored_vec) / (norm_q * norm_s)
-            
-            if score > best_score:
-                best_score = score
-                best_id = pid
+        # 1. Compare with existing profiles (Cosine Similarity, vectorized)
+        best_id, best_score = self._best_match(fingerprint)
 
         # 2. Check threshold
         if best_score >= threshold and best_id:
@@ -98,31 +110,65 @@ class VoiceProfileService:
         if not fingerprint or len(fingerprint) == 0:
             return None
 
-        query_vec = np.array(fingerprint)
-        best_score = -1.0
-        best_id = None
-        
-        for pid, data in self.profiles.items():
-            stored_vec = np.array(data["fingerprint"])
-            if stored_vec.shape != query_vec.shape:
-                continue
-                
-            norm_q = np.linalg.norm(query_vec)
-            norm_s = np.linalg.norm(stored_vec)
-            if norm_q == 0 or norm_s == 0:
-                continue
-                
-            score = np.dot(query_vec, stored_vec) / (norm_q * norm_s)
-            
-            if score > best_score:
-                best_score = score
-                best_id = pid
+        best_id, best_score = self._best_match(fingerprint)
         
         if best_score >= threshold and best_id:
             return best_id, self.profiles[best_id]["name"], float(best_score)
             
         return None
 
+    def match_embeddings(self, embeddings, threshold: float = 0.85) -> List[Optional[Tuple[str, str, float]]]:
+        """
+        Batch version of match_speaker: all query vectors vs. every same-dimension profile in one GEMM.
+        Returns one (speaker_id, speaker_name, score) or None per row. Non-finite rows never match.
+        """
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        ids, profiles = self._profile_matrix(queries.shape[1])
+        if not ids or queries.size == 0:
+            return [None] * len(queries)
+
+        valid = np.isfinite(queries).all(axis=1)
+        queries = np.where(valid[:, None], queries, 0.0)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        sims = (queries / np.maximum(norms, 1e-12)) @ profiles.T # (N, K) cosine similarities
+
+        best = sims.argmax(axis=1)
+        results = []
+        for i, j in enumerate(best):
+            score = float(sims[i, j])
+            if valid[i] and norms[i, 0] > 0 and score >= threshold:
+                results.append((ids[j], self.profiles[ids[j]]["name"], score))
+            else:
+                results.append(None)
+        return results
+
+    def match_speakers_batch(self, centroids, threshold: float = 0.85) -> List[Optional[Tuple[str, str, float]]]:
+        """
+        Match a stack of cluster centroids in one query: faiss IndexFlatIP over L2-normalized
+        fingerprints (inner product == cosine). Same result format as match_embeddings, which it
+        falls back to when faiss is not installed.
+        """
+        if not HAS_FAISS:
+            return self.match_embeddings(centroids, threshold=threshold)
+
+        C = np.array(np.atleast_2d(np.asarray(centroids, dtype=np.float32)), order="C") # own copy: normalized in place
+        ids, profiles = self._profile_matrix(C.shape[1])
+        if not ids or C.size == 0:
+            return [None] * len(C)
+
+        index = faiss.IndexFlatIP(profiles.shape[1])
+        index.add(profiles)
+
+        valid = np.isfinite(C).all(axis=1) & (np.linalg.norm(C, axis=1) > 0)
+        C[~valid] = 0.0
+        faiss.normalize_L2(C)
+        D, I = index.search(C, 1)
+
+        return [
+            (ids[j], self.profiles[ids[j]]["name"], float(d)) if ok and j >= 0 and d >= threshold else None
+            for ok, d, j in zip(valid, D[:, 0], I[:, 0])
+        ]
+
     def create_profile(self, fingerprint: List[float], name_hint: str = None) -> Tuple[str, str]:
         """Manually create a profile."""
         new_id = f"speaker_{len(self.profiles) + 1}"
@@ -23,12 +23,17 @@ try:
         
 except ImportError:
     # Standard logging fallback
+    # Accepts loguru-style lazy "{}" args; the message is only formatted if the level is enabled.
     class LoggerWrapper:
-        def debug(self, msg): logging.debug(msg)
-        def info(self, msg): logging.info(msg)
-        def warning(self, msg): logging.warning(msg)
-        def error(self, msg): logging.error(msg)
-        def critical(self, msg): logging.critical(msg)
+        def _log(self, level, msg, *args, **kwargs):
+            root = logging.getLogger()
+            if root.isEnabledFor(level):
+                root.log(level, msg.format(*args, **kwargs) if (args or kwargs) else msg)
+        def debug(self, msg, *args, **kwargs): self._log(logging.DEBUG, msg, *args, **kwargs)
+        def info(self, msg, *args, **kwargs): self._log(logging.INFO, msg, *args, **kwargs)
+        def warning(self, msg, *args, **kwargs): self._log(logging.WARNING, msg, *args, **kwargs)
+        def error(self, msg, *args, **kwargs): self._log(logging.ERROR, msg, *args, **kwargs)
+        def critical(self, msg, *args, **kwargs): self._log(logging.CRITICAL, msg, *args, **kwargs)
     
     logger = LoggerWrapper()
     
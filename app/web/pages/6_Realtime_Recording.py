@@ -4,6 +4,7 @@ import uuid
 import time
 import requests
 import pandas as pd
+from sqlalchemy.orm import undefer_group
 from app.core.database import SessionLocal
 from app.models.sql_models import ConversationSegment, Character, AnalysisLog
 from app.core.config import settings
@@ -220,7 +221,7 @@ with st.sidebar:
             try:
                 # Fetch segments
                 db = SessionLocal()
-                segments = db.query(ConversationSegment).filter(ConversationSegment.session_id == session_id).order_by(ConversationSegment.created_at).all()
+                segments = db.query(ConversationSegment).options(undefer_group("payload")).filter(ConversationSegment.session_id == session_id).order_by(ConversationSegment.created_at).all()
                 
                 if segments:
                     # Construct Transcript
@@ -289,7 +290,7 @@ others = [c for c in char_names if c not in active and c != "Unknown"]
 dropdown_options = ["Unknown"] + active + others
 
 db = SessionLocal()
-segments = db.query(ConversationSegment).filter(ConversationSegment.session_id == session_id).order_by(ConversationSegment.created_at.desc()).all()
+segments = db.query(ConversationSegment).options(undefer_group("payload")).filter(ConversationSegment.session_id == session_id).order_by(ConversationSegment.created_at.desc()).all()
 db.close()
 
 if segments:
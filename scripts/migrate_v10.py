@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# Pre-aggregated per-character/scenario rollup of dialogue_logs (PostgreSQL only).
+# The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY.
+CREATE_STATEMENTS = [
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_character_stats AS
+    SELECT character_id, scenario_id,
+           count(*) AS n,
+           avg(rating) AS avg_rating,
+           avg(latency_ms) AS avg_latency,
+           sum(tokens_used) AS tokens,
+           now() AS refreshed_at
+    FROM dialogue_logs
+    GROUP BY 1, 2
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_character_stats ON mv_character_stats (character_id, scenario_id)",
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("Materialized views are PostgreSQL only; /stats/characters aggregates live on this backend.")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for stmt in CREATE_STATEMENTS:
+            try:
+                conn.execute(text(stmt))
+                print(f"OK: {' '.join(stmt.split())[:80]}")
+            except Exception as e:
+                print(f"Error: {e}")
+
+    print("Migration V10 completed.")
+
+if __name__ == "__main__":
+    migrate()
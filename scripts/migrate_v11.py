@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# Bulky conversation_segments payload columns: keep them out-of-line (EXTENDED) and,
+# on PostgreSQL 14+, compress with LZ4 (faster detoast than the default pglz).
+PAYLOAD_COLUMNS = ["text", "emotion", "metrics", "analysis", "feedback"]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("TOAST storage settings are PostgreSQL only; nothing to do.")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        server_version = conn.dialect.server_version_info or (0,)
+        for column in PAYLOAD_COLUMNS:
+            try:
+                conn.execute(text(f"ALTER TABLE conversation_segments ALTER COLUMN {column} SET STORAGE EXTENDED"))
+                if server_version >= (14,):
+                    conn.execute(text(f"ALTER TABLE conversation_segments ALTER COLUMN {column} SET COMPRESSION lz4"))
+                print(f"Updated storage for conversation_segments.{column}")
+            except Exception as e:
+                print(f"Error updating conversation_segments.{column}: {e}")
+
+    print("Migration V11 completed.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# JSON columns whose empty default now lives in the schema (server_default) instead of being sent on every INSERT
+JSON_DEFAULT_COLUMNS = [
+    ("scenarios", "rules", "{}"),
+    ("scenarios", "processing_steps", "{}"),
+    ("scenarios", "eval_criteria", "{}"),
+    ("analysis_logs", "character_names", "[]"),
+    ("analysis_logs", "structured_data", "{}"),
+    ("conversation_segments", "emotion", "{}"),
+    ("conversation_segments", "metrics", "{}"),
+    ("conversation_segments", "analysis", "{}"),
+    ("characters", "attributes", "{}"),
+    ("characters", "traits", "{}"),
+    ("characters", "dynamic_profile", "{}"),
+    ("relationships", "details", "{}"),
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, column, empty in JSON_DEFAULT_COLUMNS:
+            try:
+                # Rows written before the server default existed
+                conn.execute(text(f"UPDATE {table} SET {column} = '{empty}' WHERE {column} IS NULL"))
+                # SQLite cannot change a column default in place; tables created by create_all() already carry it
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{empty}'"))
+                print(f"Updated default for {table}.{column}")
+            except Exception as e:
+                print(f"Error updating {table}.{column}: {e}")
+
+    print("Migration V12 completed.")
+
+if __name__ == "__main__":
+    migrate()
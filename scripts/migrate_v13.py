@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from datetime import date
+from sqlalchemy import text
+from app.core.database import engine, dependent_views_dropped
+from app.models.sql_models import DialogueLog, ConversationSegment
+
+# Append-only, time-ranged tables converted to monthly RANGE (created_at) partitions (PostgreSQL only).
+# PG requires the partition key in the primary key, so the table PK becomes (id, created_at);
+# the ORM keeps mapping `id` (still unique, fed by the same sequence).
+PARTITIONED_MODELS = [DialogueLog, ConversationSegment]
+MONTHS_AHEAD = 3
+
+def _month_start(d: date, offset: int = 0) -> date:
+    month = d.month - 1 + offset
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+def _exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+def ensure_partitions(conn, table: str, start: date, months_ahead: int = MONTHS_AHEAD):
+    """
+    Create monthly children (e.g. dialogue_logs_2025_01) from `start` up to `months_ahead` past today.
+    PG refuses to create a partition over rows the DEFAULT partition already holds, so for such a month
+    the child is built standalone, those rows are moved into it, and it is then attached.
+    """
+    has_default = _exists(conn, f"{table}_default")
+    month = _month_start(start)
+    end = _month_start(date.today(), months_ahead)
+    while month <= end:
+        upper = _month_start(month, 1)
+        child = f"{table}_{month:%Y_%m}"
+        bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        if not _exists(conn, child):
+            range_args = {"lo": month, "hi": upper}
+            stray = has_default and conn.execute(
+                text(f"SELECT 1 FROM {table}_default WHERE created_at >= :lo AND created_at < :hi LIMIT 1"), range_args
+            ).first()
+            if stray:
+                conn.execute(text(f"CREATE TABLE {child} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+                moved = conn.execute(text(
+                    f"WITH moved AS (DELETE FROM {table}_default WHERE created_at >= :lo AND created_at < :hi RETURNING *) "
+                    f"INSERT INTO {child} SELECT * FROM moved"
+                ), range_args).rowcount
+                # ATTACH clones the parent's indexes and FKs onto the child
+                conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {child} {bounds}"))
+                print(f"Created {child} and moved {moved} rows out of {table}_default.")
+            else:
+                conn.execute(text(f"CREATE TABLE {child} PARTITION OF {table} {bounds}"))
+        month = upper
+
+def partition_table(model):
+    table = model.__tablename__
+    with engine.begin() as conn:
+        is_partitioned = conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"),
+            {"t": table},
+        ).first()
+        if is_partitioned:
+            print(f"{table} is already partitioned.")
+            return
+
+        conn.execute(text(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL"))
+        first = conn.execute(text(f"SELECT min(created_at) FROM {table}")).scalar()
+        # LIKE never copies foreign keys: remember them and re-add them on the new parent
+        foreign_keys = conn.execute(text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:t AS regclass) AND contype = 'f'"
+        ), {"t": table}).all()
+        # Views over the table (mv_character_stats, scripts/migrate_v10.py) would follow the rename to
+        # {table}_old and block its DROP: recreate them on the new partitioned parent instead
+        with dependent_views_dropped(conn, table):
+            conn.execute(text(f"ALTER TABLE {table} RENAME TO {table}_old"))
+            conn.execute(text(
+                f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+                f"PARTITION BY RANGE (created_at)"
+            ))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL"))
+            conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)"))
+            # Rows outside every monthly range (e.g. clock skew) land here instead of failing the INSERT
+            conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+            ensure_partitions(conn, table, first.date() if first else date.today())
+
+            conn.execute(text(f"INSERT INTO {table} SELECT * FROM {table}_old"))
+            conn.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"))
+            conn.execute(text(f"DROP TABLE {table}_old"))
+
+            # FKs on partitioned tables: PG 11+; added after the copy so rows are validated once, in bulk
+            for name, definition in foreign_keys:
+                conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'))
+
+            # Recreate the model's indexes on the parent; PG propagates them to every partition
+            for index in model.__table__.indexes:
+                index.create(conn)
+    print(f"Partitioned {table} by month.")
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("Declarative partitioning is PostgreSQL only; nothing to do.")
+        return
+
+    failed = []
+    for model in PARTITIONED_MODELS:
+        try:
+            partition_table(model)
+        except Exception as e:
+            print(f"Error partitioning {model.__tablename__}: {e}")
+            failed.append(model.__tablename__)
+    if failed:
+        raise SystemExit(f"Migration V13 failed for {', '.join(failed)} (rolled back, tables left unpartitioned).")
+
+    print("Migration V13 completed.")
+
+def maintain():
+    """Pre-create upcoming monthly partitions; run monthly from cron: python scripts/migrate_v13.py --maintain"""
+    with engine.begin() as conn:
+        for model in PARTITIONED_MODELS:
+            ensure_partitions(conn, model.__tablename__, date.today())
+    print("Partitions ensured.")
+
+if __name__ == "__main__":
+    if "--maintain" in sys.argv:
+        maintain()
+    else:
+        migrate()
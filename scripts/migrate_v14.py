@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine, dependent_views_dropped
+
+# Small bounded integers -> SMALLINT with CHECK constraints (PostgreSQL only;
+# SQLite has a single INTEGER storage class and cannot add constraints to existing tables).
+BOUNDED_COLUMNS = [
+    ("dialogue_logs", "rating", "ck_dialogue_logs_rating", "rating BETWEEN 1 AND 5"),
+    ("conversation_segments", "rating", "ck_conversation_segments_rating", "rating BETWEEN 0 AND 5"),
+    ("feedback_logs", "rating", "ck_feedback_logs_rating", "rating BETWEEN 1 AND 5"),
+    ("relationships", "strength", "ck_relationships_strength", "strength BETWEEN 1 AND 10"),
+    ("relationships", "sentiment", "ck_relationships_sentiment", "sentiment BETWEEN -5 AND 5"),
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("SMALLINT / CHECK migration is PostgreSQL only; new SQLite tables get the constraints from create_all().")
+        return
+
+    failed = []
+    for table, column, name, check in BOUNDED_COLUMNS:
+        try:
+            with engine.connect() as conn:
+                done = conn.execute(text("SELECT 1 FROM pg_constraint WHERE conname = :n"), {"n": name}).first()
+            if done:
+                print(f"{table}.{column} already has {name}.")
+                continue
+            # PG refuses ALTER ... TYPE under a dependent view (dialogue_logs.rating feeds mv_character_stats):
+            # drop and recreate such views around the type change, in one transaction
+            with engine.begin() as conn, dependent_views_dropped(conn, table):
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE smallint"))
+                conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({check}) NOT VALID"))
+            # NOT VALID + VALIDATE (own transaction) avoids holding the ACCESS EXCLUSIVE lock during the full-table check
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+            print(f"Converted {table}.{column} to smallint with {name}.")
+        except Exception as e:
+            print(f"Error converting {table}.{column}: {e}")
+            failed.append(f"{table}.{column}")
+    if failed:
+        raise SystemExit(f"Migration V14 failed for {', '.join(failed)}.")
+
+    print("Migration V14 completed.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+from app.models.sql_models import SESSION_UUID_PATTERN
+
+# Session id columns -> native uuid (PostgreSQL only). Non-UUID legacy values keep their grouping
+# via md5(value)::uuid, matching SessionIdType.process_bind_param (both use SESSION_UUID_PATTERN).
+UUID_COLUMNS = [
+    ("conversation_sessions", "id"),
+    ("dialogue_logs", "session_id"),
+    ("conversation_segments", "session_id"),
+]
+UUID_PATTERN = SESSION_UUID_PATTERN
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("Native UUID columns are PostgreSQL only; SQLite keeps text ids.")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, column in UUID_COLUMNS:
+            try:
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE uuid USING "
+                    f"CASE WHEN {column} ~ '{UUID_PATTERN}' THEN {column}::uuid ELSE md5({column})::uuid END"
+                ))
+                print(f"Converted {table}.{column} to uuid.")
+            except Exception as e:
+                print(f"Error converting {table}.{column}: {e}")
+
+    print("Migration V15 completed.")
+
+if __name__ == "__main__":
+    migrate()
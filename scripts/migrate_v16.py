@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# BRIN indexes on created_at for append-only log tables (PostgreSQL only)
+BRIN_TABLES = ["dialogue_logs", "analysis_logs", "conversation_segments", "feedback_logs", "character_events"]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    if engine.dialect.name != "postgresql":
+        print("BRIN indexes are PostgreSQL only; nothing to do.")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in BRIN_TABLES:
+            # CONCURRENTLY is not supported on partitioned parents (dialogue_logs / conversation_segments after V13)
+            partitioned = conn.execute(
+                text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"),
+                {"t": table},
+            ).first()
+            concurrently = "" if partitioned else "CONCURRENTLY "
+            stmt = (
+                f"CREATE INDEX {concurrently}IF NOT EXISTS ix_{table}_created_at_brin "
+                f"ON {table} USING brin (created_at) WITH (pages_per_range = 32)"
+            )
+            try:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+            except Exception as e:
+                print(f"Error: {stmt}: {e}")
+
+    print("Migration V16 completed.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# Per-endpoint indexes for relationship lookups (source-or-target queries run as UNION ALL of two seeks)
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_rel_source_target ON relationships (source_id, target_id)",
+    "CREATE INDEX IF NOT EXISTS ix_rel_target ON relationships (target_id)",
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for stmt in CREATE_INDEXES:
+            try:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+            except Exception as e:
+                print(f"Error: {stmt}: {e}")
+
+    print("Migration V17 completed.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,40 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# JSON columns converted to JSONB, each served by a GIN (jsonb_path_ops) index for @> containment queries.
+JSONB_COLUMNS = {
+    "characters": ["attributes", "traits", "dynamic_profile"],
+    "dialogue_logs": ["nlu_result"],
+    "analysis_logs": ["character_names", "structured_data"],
+    "conversation_segments": ["emotion", "metrics", "analysis"],
+    "character_observations": ["content"],
+}
+
+def migrate():
+    if engine.dialect.name != "postgresql":
+        print("Skipping JSONB/GIN migration for non-PostgreSQL database.")
+        return
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table, columns in JSONB_COLUMNS.items():
+            for column in columns:
+                try:
+                    print(f"Converting {table}.{column} to JSONB...")
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb"))
+                    print(f"Creating GIN index on {table}.{column}...")
+                    conn.execute(text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{column}_gin "
+                        f"ON {table} USING GIN ({column} jsonb_path_ops)"
+                    ))
+                except Exception as e:
+                    print(f"Error migrating {table}.{column}: {e}")
+
+    print("Migration V7 completed.")
+
+if __name__ == "__main__":
+    migrate()
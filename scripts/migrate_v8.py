@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# Composite indexes for the hot (key, time) access paths
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_dlg_session_created ON dialogue_logs (session_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_dlg_user_created ON dialogue_logs (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_seg_session_time ON conversation_segments (session_id, start_time)",
+    "CREATE INDEX IF NOT EXISTS ix_obs_char_status ON character_observations (character_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_evt_char_date ON character_events (character_id, event_date)",
+]
+
+# PostgreSQL can answer timeline queries index-only when rating/tokens ride along in the leaf
+PG_CREATE_INDEXES = [
+    "DROP INDEX IF EXISTS ix_dlg_session_created",
+    "CREATE INDEX IF NOT EXISTS ix_dlg_session_created ON dialogue_logs (session_id, created_at) INCLUDE (rating, tokens_used)",
+]
+
+# Single-column indexes now covered by the leading column of a composite index
+DROP_INDEXES = [
+    "DROP INDEX IF EXISTS ix_dialogue_logs_session_id",
+    "DROP INDEX IF EXISTS ix_dialogue_logs_user_id",
+    "DROP INDEX IF EXISTS ix_conversation_segments_session_id",
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    statements = CREATE_INDEXES
+    if engine.dialect.name == "postgresql":
+        statements = statements + PG_CREATE_INDEXES
+    statements = statements + DROP_INDEXES
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for stmt in statements:
+            try:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+            except Exception as e:
+                print(f"Error: {stmt}: {e}")
+
+    print("Migration V8 completed.")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,45 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from app.core.database import engine
+
+# 0/1 integer flags converted to native BOOLEAN (PostgreSQL only; SQLite stores Boolean as 0/1 already)
+PG_BOOLEAN_COLUMNS = [
+    ("conversation_sessions", "is_active", "TRUE"),
+    ("dialogue_logs", "is_archived_for_tuning", "FALSE"),
+    ("character_feedback", "is_accurate", None),
+]
+
+# Partial indexes (supported by both PostgreSQL and SQLite)
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_sessions_active ON conversation_sessions (user_id) WHERE is_active",
+    "CREATE INDEX IF NOT EXISTS ix_dlg_archived ON dialogue_logs (id) WHERE is_archived_for_tuning",
+]
+
+def migrate():
+    print(f"Migrating database ({engine.dialect.name})...")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            for table, column, default in PG_BOOLEAN_COLUMNS:
+                try:
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT"))
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE boolean USING {column}::boolean"))
+                    if default:
+                        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT {default}"))
+                    print(f"Converted {table}.{column} to boolean.")
+                except Exception as e:
+                    print(f"Error converting {table}.{column}: {e}")
+
+        for stmt in CREATE_INDEXES:
+            try:
+                conn.execute(text(stmt))
+                print(f"OK: {stmt}")
+            except Exception as e:
+                print(f"Error: {stmt}: {e}")
+
+    print("Migration V9 completed.")
+
+if __name__ == "__main__":
+    migrate()
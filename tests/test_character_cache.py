@@ -0,0 +1,27 @@
+from app.models.sql_models import Character
+from app.services.character_cache import character_cache
+
+def _cached_character(db_session, name="Alice"):
+    char = Character(name=name, dynamic_profile={})
+    db_session.add(char)
+    db_session.commit()
+    character_cache.clear()
+    assert character_cache.get(db_session, char.id).version == 1
+    return char.id
+
+def test_append_invalidates_only_after_commit(db_session):
+    char_id = _cached_character(db_session)
+    assert Character.append_profile_items(db_session, char_id, "collected_observations", [{"content": "x"}])
+    # Not committed yet: the cached snapshot must survive (other readers still see the committed row)
+    assert character_cache.get(db_session, char_id).version == 1
+    db_session.commit()
+    snapshot = character_cache.get(db_session, char_id)
+    assert snapshot.version == 2
+    assert snapshot.dynamic_profile["collected_observations"] == [{"content": "x"}]
+
+def test_rollback_keeps_cached_snapshot(db_session):
+    char_id = _cached_character(db_session)
+    Character.append_profile_items(db_session, char_id, "collected_observations", [{"content": "x"}])
+    db_session.rollback()
+    assert not db_session.info.get("character_cache_pending")
+    assert character_cache.get(db_session, char_id).version == 1
@@ -0,0 +1,146 @@
+import pytest
+from sqlalchemy import null
+from app.models.sql_models import Character, Relationship
+from app.services.character_service import character_service
+
+def _add_character(db, name, **fields):
+    char = Character(name=name, **fields)
+    db.add(char)
+    db.commit()
+    return char.id
+
+# --- Character.append_profile_items (json_insert '$[#]' on SQLite, jsonb_set/|| on PostgreSQL) ---
+
+def test_append_profile_items_creates_and_extends_list(any_db_session):
+    db = any_db_session
+    char_id = _add_character(db, "Alice", dynamic_profile={"mood": "calm"})
+
+    assert Character.append_profile_items(db, char_id, "collected_observations", [{"content": "a"}])
+    assert Character.append_profile_items(db, char_id, "collected_observations", [{"content": "b"}, {"content": "c"}])
+    db.commit()
+
+    row = db.query(Character.dynamic_profile, Character.version).filter(Character.id == char_id).one()
+    assert row.dynamic_profile == {
+        "mood": "calm",
+        "collected_observations": [{"content": "a"}, {"content": "b"}, {"content": "c"}],
+    }
+    assert row.version == 3
+
+@pytest.mark.parametrize("empty", [None, null()], ids=["json_null", "sql_null"])
+def test_append_profile_items_null_profile_and_missing_character(any_db_session, empty):
+    db = any_db_session
+    char_id = _add_character(db, "Bob")
+    db.query(Character).filter(Character.id == char_id).update({Character.dynamic_profile: empty})
+    db.commit()
+
+    assert Character.append_profile_items(db, char_id, "notes", ["中文"])
+    assert not Character.append_profile_items(db, char_id + 1, "notes", ["x"])
+    db.commit()
+    assert db.query(Character.dynamic_profile).filter(Character.id == char_id).scalar() == {"notes": ["中文"]}
+
+def test_append_profile_items_rejects_quoted_key_on_sqlite(db_session):
+    char_id = _add_character(db_session, "Carol")
+    with pytest.raises(ValueError):
+        Character.append_profile_items(db_session, char_id, 'a"b', ["x"])
+
+# --- CharacterService.update_relationship_state (clamped UPDATE ... RETURNING) ---
+
+def test_update_relationship_state_creates_then_clamps(any_db_session):
+    db = any_db_session
+    _add_character(db, "Alice")
+    _add_character(db, "Bob")
+
+    rel = character_service.update_relationship_state(db, "Alice", "Bob", 2, -1)
+    assert (rel.strength, rel.sentiment) == (7, -1)
+
+    rel = character_service.update_relationship_state(db, "Alice", "Bob", 10, -10)
+    assert (rel.strength, rel.sentiment) == (10, -5)
+    assert db.query(Relationship).count() == 1
+
+def test_update_relationship_state_touches_oldest_edge_only(any_db_session):
+    db = any_db_session
+    alice, bob = _add_character(db, "Alice"), _add_character(db, "Bob")
+    db.add_all([
+        Relationship(source_id=alice, target_id=bob, relation_type="Friend", strength=5, sentiment=0),
+        Relationship(source_id=alice, target_id=bob, relation_type="Colleague", strength=5, sentiment=0),
+    ])
+    db.commit()
+
+    rel = character_service.update_relationship_state(db, "Alice", "Bob", -10, 0)
+    assert (rel.relation_type, rel.strength, rel.sentiment) == ("Friend", 1, 0)
+    other = db.query(Relationship).filter(Relationship.relation_type == "Colleague").one()
+    assert other.strength == 5
+
+def test_update_relationship_state_unknown_name(any_db_session):
+    _add_character(any_db_session, "Alice")
+    assert character_service.update_relationship_state(any_db_session, "Alice", "Nobody", 1, 1) is None
+
+# --- CharacterService.import_data (executemany UPDATE with the data columns as extra SET keys) ---
+
+def test_import_data_updates_inserts_and_links(any_db_session):
+    db = any_db_session
+    alice = _add_character(db, "Alice", attributes={"age": 20}, traits={}, dynamic_profile={})
+
+    results = character_service.import_data(db, {
+        "characters": [
+            {"name": "Alice", "attributes": {"age": 21}, "traits": {"brave": True}},
+            {"name": "Bob", "attributes": {"role": "doctor"}},
+        ],
+        "relationships": [
+            {"source": "Alice", "target": "Bob", "relation": "Friend", "strength": 42, "sentiment": 1},
+        ],
+    })
+
+    assert results == {"characters": 2, "relationships": 1, "errors": []}
+    updated = db.query(Character).filter(Character.id == alice).one()
+    assert (updated.attributes, updated.traits, updated.version) == ({"age": 21}, {"brave": True}, 2)
+    bob = db.query(Character).filter(Character.name == "Bob").one()
+    assert bob.attributes == {"role": "doctor"}
+    rel = db.query(Relationship).one()
+    assert (rel.source_id, rel.target_id, rel.relation_type, rel.strength) == (alice, bob.id, "Friend", 10)
+
+def test_import_data_updates_existing_edge(any_db_session):
+    db = any_db_session
+    alice, bob = _add_character(db, "Alice"), _add_character(db, "Bob")
+    db.add(Relationship(source_id=alice, target_id=bob, relation_type="Friend", strength=5, sentiment=0))
+    db.commit()
+
+    results = character_service.import_data(db, {
+        "relationships": [{"source": "Alice", "target": "Bob", "relation": "Rival", "sentiment": -3}],
+    })
+
+    assert results["relationships"] == 1
+    rel = db.query(Relationship).one()
+    assert (rel.relation_type, rel.sentiment) == ("Rival", -3)
+
+def test_import_data_is_all_or_nothing(any_db_session):
+    db = any_db_session
+    alice = _add_character(db, "Alice", attributes={"age": 20})
+
+    results = character_service.import_data(db, {
+        "characters": [{"name": "Alice", "attributes": {"age": 99}}, {"name": "Bob"}],
+        # Not JSON-serializable: fails inside the relationship INSERT, after the character writes
+        "relationships": [{"source": "Alice", "target": "Bob", "details": {"tags": {1, 2}}}],
+    })
+
+    assert (results["characters"], results["relationships"]) == (0, 0)
+    assert results["errors"][-1].startswith("Import failed, nothing was written")
+    assert db.query(Character.attributes).filter(Character.id == alice).scalar() == {"age": 20}
+    assert db.query(Character).filter(Character.name == "Bob").count() == 0
+    assert db.query(Relationship).count() == 0
+
+def test_import_data_reports_bad_rows_and_keeps_going(any_db_session):
+    db = any_db_session
+
+    results = character_service.import_data(db, {
+        "characters": ["not a dict", {"name": "Alice"}, {"name": "Bob"}],
+        "relationships": [
+            "not a dict",
+            {"source": "Alice", "target": "Bob", "strength": None, "sentiment": None},
+        ],
+    })
+
+    assert (results["characters"], results["relationships"]) == (2, 1)
+    assert len(results["errors"]) == 2
+    rel = db.query(Relationship).one()
+    assert (rel.strength, rel.sentiment) == (5, 0)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from app.services.advanced_audio_service import AdvancedAudioService, _peak_normalize, _spectral_gate
+
+SR = 16000
+
+def _noisy_tone(n):
+    t = np.arange(n) / SR
+    rng = np.random.default_rng(0)
+    return (0.05 * rng.standard_normal(n) + np.where(t > 1, 0.5 * np.sin(2 * np.pi * 220 * t), 0)).astype(np.float32)
+
+@pytest.mark.parametrize("n", [3 * SR, 3 * SR + 77])
+@pytest.mark.parametrize("stereo", [False, True])
+def test_torch_gate_matches_cpu_gate(n, stereo):
+    pytest.importorskip("torch")
+    data = _noisy_tone(n)
+    if stereo:
+        data = np.stack([data, 0.8 * data], axis=1)
+    service = AdvancedAudioService(warmup=False)
+
+    torch_out = service._preprocess_torch(data, SR, device="cpu", denoise=True, bandpass=False)
+    cpu_out = _peak_normalize(_spectral_gate(data, SR))
+
+    assert torch_out.shape == data.shape
+    np.testing.assert_allclose(torch_out, cpu_out, atol=1e-5)
+
+def test_processed_cache_key_names_the_path(tmp_path):
+    src = tmp_path / "in.wav"
+    sf.write(src, _noisy_tone(SR), SR)
+    service = AdvancedAudioService(warmup=False)
+    service.temp_dir = tmp_path
+
+    out = service.preprocess_audio(str(src))
+
+    assert out.endswith("_cpu.wav") or out.endswith("_cuda.wav")
+    assert service.preprocess_audio(str(src)) == out
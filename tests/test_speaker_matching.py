@@ -0,0 +1,60 @@
+from collections import namedtuple
+import numpy as np
+from app.services.advanced_audio_service import AdvancedAudioService
+from app.services.audio_service import audio_service
+from app.services.voice_profile import VoiceProfileService
+
+SR = 16000
+Turn = namedtuple("Turn", "start end")
+
+class FakeDiarization:
+    """The slice of pyannote's Annotation that iter_diarize uses."""
+
+    def __init__(self, tracks):
+        self._tracks = tracks # [(start, end, label), ...]
+
+    def labels(self):
+        return sorted({label for _, _, label in self._tracks})
+
+    def itertracks(self, yield_label=False):
+        for i, (start, end, label) in enumerate(self._tracks):
+            yield Turn(start, end), i, label
+
+def _voice(seconds, f0, seed):
+    """Harmonic 'voice' at f0 with a little noise."""
+    t = np.arange(int(seconds * SR)) / SR
+    y = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+    y += 0.05 * np.random.default_rng(seed).standard_normal(len(t))
+    return (0.3 * y / np.abs(y).max()).astype(np.float32)
+
+def _noise(seconds, seed):
+    return (0.3 * np.random.default_rng(seed).standard_normal(int(seconds * SR))).astype(np.float32)
+
+def test_diarized_speaker_matches_enrolled_profile(tmp_path):
+    profiles = VoiceProfileService(data_path=str(tmp_path / "voice_profiles.json"))
+    enrolled = audio_service.get_voice_fingerprint(y_data=_voice(3.0, 150.0, seed=1), sr_rate=SR)
+    speaker_id, _ = profiles.create_profile(enrolled, name_hint="Alice")
+
+    service = AdvancedAudioService(warmup=False)
+    service.voice_profile_service = profiles
+
+    # SPEAKER_00 = the enrolled voice (new recording), SPEAKER_01 = someone/something else
+    audio = np.concatenate([_voice(2.0, 150.0, seed=2), _noise(2.0, seed=3), _voice(2.0, 150.0, seed=4)])
+    diarization = FakeDiarization([(0.0, 2.0, "SPEAKER_00"), (2.0, 4.0, "SPEAKER_01"), (4.0, 6.0, "SPEAKER_00")])
+    waveform = {"waveform": audio[None, :], "sample_rate": SR}
+
+    speaker_map = service._match_speakers(waveform, diarization)
+
+    assert speaker_map["SPEAKER_00"] == (speaker_id, "Alice")
+    assert "SPEAKER_01" not in speaker_map
+
+def test_speaker_with_only_short_turns_is_not_matched(tmp_path):
+    profiles = VoiceProfileService(data_path=str(tmp_path / "voice_profiles.json"))
+    profiles.create_profile(audio_service.get_voice_fingerprint(y_data=_voice(3.0, 150.0, seed=1), sr_rate=SR))
+    service = AdvancedAudioService(warmup=False)
+    service.voice_profile_service = profiles
+
+    diarization = FakeDiarization([(0.0, 0.05, "SPEAKER_00")]) # < 4 MFCC frames
+    waveform = {"waveform": _voice(1.0, 150.0, seed=2)[None, :], "sample_rate": SR}
+
+    assert service._match_speakers(waveform, diarization) == {}
@@ -0,0 +1,39 @@
+import hashlib
+import uuid
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.sql_models import SessionIdType, character_stats_view
+
+def _md5_uuid(value: str) -> str:
+    # What scripts/migrate_v15.py stores for non-UUID ids: md5(value)::uuid
+    return str(uuid.UUID(hashlib.md5(value.encode("utf-8")).hexdigest()))
+
+def test_session_id_dashed_uuid_is_kept():
+    bound = SessionIdType().process_bind_param("123E4567-E89B-12D3-A456-426614174000", postgresql.dialect())
+    assert bound == "123e4567-e89b-12d3-a456-426614174000"
+
+def test_session_id_other_uuid_spellings_match_migration():
+    # uuid.UUID() parses these, but the migration's regex only accepts the dashed form
+    for legacy in (
+        "123e4567e89b12d3a456426614174000",
+        "{123e4567-e89b-12d3-a456-426614174000}",
+        "urn:uuid:123e4567-e89b-12d3-a456-426614174000",
+        "session_unknown",
+    ):
+        assert SessionIdType().process_bind_param(legacy, postgresql.dialect()) == _md5_uuid(legacy)
+
+def test_session_id_untouched_on_sqlite():
+    assert SessionIdType().process_bind_param("session_unknown", sqlite.dialect()) == "session_unknown"
+
+def test_character_stats_rows_with_null_keys_are_kept():
+    # Stand-in table with the view's columns: NULL character/scenario groups must each come back as a row
+    engine = create_engine("sqlite://")
+    character_stats_view.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(character_stats_view), [
+            {"character_id": 1, "scenario_id": None, "n": 3},
+            {"character_id": None, "scenario_id": None, "n": 2},
+            {"character_id": 1, "scenario_id": 7, "n": 1},
+        ])
+        rows = conn.execute(select(character_stats_view)).mappings().all()
+    assert sorted(r["n"] for r in rows) == [1, 2, 3]